@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from services.job_service import JobValidationError
+from services.async_service import AsyncService, service_dependency
+from services.factories import create_job_service
+from middleware.profiling import InstrumentedRoute
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"], route_class=InstrumentedRoute)
+
+# DTOs (Data Transfer Objects)
+class JobResponse(BaseModel):
+    id: int
+    type: str
+    status: str
+    progress: int
+    total: Optional[int] = None
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    result: Optional[dict] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+# Reads go to the primary too: a job polled right after it was queued must not 404 on replica lag
+get_job_service = service_dependency(create_job_service)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, service: AsyncService = Depends(get_job_service)):
+    """Status, progress and (once finished) result of a background job"""
+    try:
+        return await service.get_job(job_id)
+    except JobValidationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,56 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+import orjson
+from fastapi.responses import ORJSONResponse
+from database.instrumentation import serialization_timer
+from events.broker import Event
+
+def rows_response(fields: Sequence[str], rows: Iterable[Sequence], next_cursor: Optional[str] = None) -> ORJSONResponse:
+    """Serialize column tuples straight to JSON objects, skipping per-row Pydantic validation"""
+    # zip() stops at the shortest, so trailing columns that only feed the cursor are dropped
+    with serialization_timer():
+        response = ORJSONResponse([dict(zip(fields, row)) for row in rows])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+async def ndjson_stream(fields: Sequence[str], batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[bytes]:
+    """Encode batches of column tuples as NDJSON, one chunk per batch"""
+    async for rows in batches:
+        yield b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+async def csv_stream(fields: Sequence[str], batches: AsyncIterator[List[Sequence]]) -> AsyncIterator[str]:
+    """Encode batches of column tuples as CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for rows in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row[:len(fields)]]
+            for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# Browsers reconnect this many milliseconds after a dropped event stream
+SSE_RETRY_MS = 3000
+
+def event_message(event: Event) -> dict:
+    """JSON shape of a change feed event, shared by SSE and WebSocket subscribers"""
+    return {"id": event.id, "type": event.type, "user_id": event.user_id, "data": event.data}
+
+async def sse_stream(events: AsyncIterator[Optional[Event]]) -> AsyncIterator[bytes]:
+    """Encode change feed events as server-sent events; idle heartbeats become comments"""
+    yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+    async for event in events:
+        if event is None:
+            yield b": keepalive\n\n"
+            continue
+        yield b"id: %s\nevent: %s\ndata: %s\n\n" % (
+            event.id.encode(), event.type.encode(), orjson.dumps(event_message(event))
+        )
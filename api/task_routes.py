@@ -1,13 +1,22 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from database.connection import get_db
-from repositories.task_repository import TaskRepository
-from repositories.user_repository import UserRepository
-from services.task_service import TaskService, TaskValidationError
+import asyncio
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from events import EventBroker, get_broker
+from services.task_service import BULK_CHUNK_SIZE, TaskValidationError
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.async_service import AsyncService, service_dependency
+from services.factories import create_task_service
+from config import get_settings
+from api.conditional import is_not_modified, make_etag, not_modified, set_validators
+from api.responses import csv_stream, event_message, ndjson_stream, rows_response, sse_stream
+from middleware.profiling import InstrumentedRoute
+from api.job_routes import JobResponse, get_job_service
 
-router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+router = APIRouter(prefix="/api/tasks", tags=["tasks"], route_class=InstrumentedRoute)
 
 # DTOs (Data Transfer Objects)
 class TaskCreate(BaseModel):
@@ -18,55 +27,386 @@ class TaskCreate(BaseModel):
 class TaskResponse(BaseModel):
     id: int
     title: str
-    description: str
+    description: Optional[str] = None
     is_completed: bool
     user_id: int
     
     class Config:
         from_attributes = True
 
-def get_task_service(db: Session = Depends(get_db)) -> TaskService:
-    """Dependency injection for task service"""
-    task_repository = TaskRepository(db)
-    user_repository = UserRepository(db)
-    return TaskService(task_repository, user_repository)
+# TaskResponse fields, in TASK_ROW_COLUMNS order, for the fast list path
+TASK_RESPONSE_FIELDS = ("id", "title", "description", "is_completed", "user_id")
+# Export columns, all of TASK_ROW_COLUMNS
+TASK_EXPORT_FIELDS = TASK_RESPONSE_FIELDS + ("created_at",)
+
+class TaskStatsResponse(BaseModel):
+    task_count: int
+    completed_count: int
+    open_count: int
+
+class TaskBatchRequest(BaseModel):
+    user_id: int
+    task_ids: List[int] = Field(..., max_length=10000)
+
+class TaskBatchResult(BaseModel):
+    id: int
+    error: Optional[str] = None
+
+class TaskBatchResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[TaskBatchResult]
+
+class BulkTaskResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkTaskResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkTaskResult]
+
+get_task_service = service_dependency(create_task_service)
+get_task_read_service = service_dependency(create_task_service, read_only=True)
 
 @router.post("/", response_model=TaskResponse)
-def create_task(task_data: TaskCreate, service: TaskService = Depends(get_task_service)):
+async def create_task(task_data: TaskCreate, service: AsyncService = Depends(get_task_service)):
     """Create a new task"""
     try:
-        task = service.create_task(task_data.title, task_data.user_id, task_data.description)
+        task = await service.create_task(task_data.title, task_data.user_id, task_data.description)
         return task
     except TaskValidationError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next-page cursor as a header so the list body stays unchanged"""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+_MALFORMED_LINE = object()
+
+async def _limit_body(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass a request body through, refusing it (413) as soon as it grows past `max_bytes`"""
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body is limited to {max_bytes} bytes")
+        yield chunk
+
+async def _read_bulk_items(request: Request) -> AsyncIterator[object]:
+    """Yield raw items from a JSON array body or, for application/x-ndjson, line by line as they stream in.
+
+    Bodies over BULK_MAX_BYTES or BULK_MAX_ITEMS are refused with a 413.
+    """
+    settings = get_settings()
+    count = 0
+    async for item in _parse_bulk_body(request, _limit_body(request.stream(), settings.bulk_max_bytes)):
+        count += 1
+        if count > settings.bulk_max_items:
+            raise HTTPException(status_code=413, detail=f"A bulk import is limited to {settings.bulk_max_items} items")
+        yield item
+
+async def _parse_bulk_body(request: Request, chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """Raw items of a JSON array body, or of an NDJSON body line by line"""
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        buffer = b""
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_ndjson_line(line)
+        if buffer.strip():
+            yield _parse_ndjson_line(buffer)
+        return
+    
+    try:
+        items = json.loads(b"".join([chunk async for chunk in chunks]))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+    for item in items:
+        yield item
+
+def _parse_ndjson_line(line: bytes) -> object:
+    """Parse one NDJSON line, keeping malformed lines as per-item errors"""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return _MALFORMED_LINE
+
+def _validate_bulk_item(item: object) -> TaskCreate:
+    """Validate one bulk item against the TaskCreate DTO"""
+    if item is _MALFORMED_LINE:
+        raise TaskValidationError("Invalid JSON")
+    try:
+        return TaskCreate.model_validate(item)
+    except ValidationError as e:
+        raise TaskValidationError(
+            "; ".join(f"{'.'.join(map(str, error['loc'])) or 'item'}: {error['msg']}" for error in e.errors())
+        )
+
+@router.post("/bulk", response_model=BulkTaskResponse)
+async def create_tasks_bulk(request: Request, service: AsyncService = Depends(get_task_service)):
+    """Create many tasks from a JSON array or an NDJSON stream, reporting errors per item"""
+    results: List[BulkTaskResult] = []
+    valid: List[tuple] = []
+    
+    # The whole (bounded) body is validated first, so a body refused as too large has created nothing
+    index = 0
+    async for item in _read_bulk_items(request):
+        try:
+            valid.append((index, _validate_bulk_item(item)))
+        except TaskValidationError as e:
+            results.append(BulkTaskResult(index=index, error=str(e)))
+        index += 1
+    
+    # Each chunk is its own unit of work, so long imports never hold one write lock throughout
+    for start in range(0, len(valid), BULK_CHUNK_SIZE):
+        chunk = valid[start:start + BULK_CHUNK_SIZE]
+        outcomes = await service.create_tasks_bulk([(task.title, task.user_id, task.description) for _, task in chunk])
+        for (index, _), (task_id, error) in zip(chunk, outcomes):
+            results.append(BulkTaskResult(index=index, id=task_id, error=error))
+    
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.error is None)
+    return BulkTaskResponse(created=created, failed=len(results) - created, results=results)
+
+@router.post("/bulk/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_tasks_bulk_job(request: Request, service: AsyncService = Depends(get_job_service)):
+    """Queue a bulk import (JSON array or NDJSON, like /bulk) as a background job; poll GET /api/jobs/{id}"""
+    # The queued items are stored in the job's row; _read_bulk_items bounds their size
+    items, errors = [], []
+    index = 0
+    async for item in _read_bulk_items(request):
+        try:
+            task = _validate_bulk_item(item)
+            items.append((index, task.title, task.user_id, task.description))
+        except TaskValidationError as e:
+            errors.append((index, str(e)))
+        index += 1
+    return await service.enqueue_bulk_import(items, errors)
+
 @router.get("/", response_model=List[TaskResponse])
-def get_all_tasks(service: TaskService = Depends(get_task_service)):
-    """Get all tasks (admin function)"""
-    return service.get_all_tasks()
+async def get_all_tasks(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user_id: Optional[int] = None,
+    is_completed: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_archived: bool = False,
+    service: AsyncService = Depends(get_task_read_service),
+):
+    """Get one page of tasks (admin function); follow X-Next-Cursor for the next page"""
+    try:
+        # Opt-in fast path: column tuples encoded by orjson, no ORM objects or Pydantic models
+        fast = get_settings().fast_json
+        tasks, next_cursor = await getattr(service, "list_task_rows" if fast else "list_tasks")(
+            user_id=user_id,
+            is_completed=is_completed,
+            created_after=created_after,
+            created_before=created_before,
+            cursor=cursor,
+            limit=limit,
+            include_archived=include_archived,
+        )
+    except TaskValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fast:
+        return rows_response(TASK_RESPONSE_FIELDS, tasks, next_cursor)
+    set_next_cursor(response, next_cursor)
+    return tasks
 
 @router.get("/user/{user_id}", response_model=List[TaskResponse])
-def get_user_tasks(user_id: int, service: TaskService = Depends(get_task_service)):
-    """Get all tasks for a specific user"""
+async def get_user_tasks(
+    user_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    is_completed: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_archived: bool = False,
+    service: AsyncService = Depends(get_task_read_service),
+):
+    """Get one page of tasks for a specific user; follow X-Next-Cursor for the next page.
+
+    Archived tasks are left out unless `include_archived` is set.
+    Supports If-None-Match / If-Modified-Since: an unchanged page costs one primary-key lookup.
+    """
+    try:
+        # Stamped before the page is read: a write in between only makes the tag stale, never wrongly current
+        version, last_modified, user_created = await service.get_user_tasks_version(user_id)
+    except TaskValidationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # The user's creation time too: a deleted user's counters (and version) go with them
+    etag = make_etag("tasks", user_id, user_created, version, request.url.query)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    
     try:
-        return service.get_tasks_by_user(user_id)
+        # Opt-in fast path: column tuples encoded by orjson, no ORM objects or Pydantic models
+        fast = get_settings().fast_json
+        tasks, next_cursor = await getattr(service, "list_user_task_rows" if fast else "list_user_tasks")(
+            user_id,
+            is_completed=is_completed,
+            created_after=created_after,
+            created_before=created_before,
+            cursor=cursor,
+            limit=limit,
+            include_archived=include_archived,
+            # The body is cached under the version the ETag names, so neither can run ahead of the other
+            version=version,
+        )
     except TaskValidationError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    if fast:
+        response = rows_response(TASK_RESPONSE_FIELDS, tasks, next_cursor)
+        set_validators(response, etag, last_modified)
+        return response
+    set_next_cursor(response, next_cursor)
+    set_validators(response, etag, last_modified)
+    return tasks
+
+@router.get("/export")
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user_id: Optional[int] = None,
+    is_completed: Optional[bool] = None,
+    include_archived: bool = False,
+    service: AsyncService = Depends(get_task_read_service),
+):
+    """Stream all matching tasks as NDJSON or CSV without loading them into memory"""
+    try:
+        batches = await service.stream(
+            "export_task_rows", user_id=user_id, is_completed=is_completed, include_archived=include_archived
+        )
+    except TaskValidationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if format == "csv":
+        return StreamingResponse(
+            csv_stream(TASK_EXPORT_FIELDS, batches),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="tasks.csv"'},
+        )
+    return StreamingResponse(ndjson_stream(TASK_EXPORT_FIELDS, batches), media_type="application/x-ndjson")
+
+@router.get("/stats", response_model=TaskStatsResponse)
+async def get_task_stats(service: AsyncService = Depends(get_task_read_service)):
+    """Task counts over all users, served from the maintained counters"""
+    task_count, completed_count = await service.get_task_stats()
+    return TaskStatsResponse(task_count=task_count, completed_count=completed_count, open_count=task_count - completed_count)
+
+@router.post("/stats/rebuild", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_task_stats(service: AsyncService = Depends(get_job_service)):
+    """Queue recounting every user's task counters from the tasks, repairing any drift"""
+    return await service.enqueue_stats_rebuild()
+
+@router.get("/stream")
+async def stream_task_changes(
+    request: Request,
+    user_id: Optional[int] = None,
+    after: Optional[str] = None,
+    service: AsyncService = Depends(get_task_read_service),
+    broker: EventBroker = Depends(get_broker),
+):
+    """Server-sent events for task changes, optionally of one user.
+
+    Resumes after the event ID in Last-Event-ID (sent by browsers on reconnect) or `after`; a `reset`
+    event means events were missed and the client should reload before applying further changes.
+    """
+    if user_id is not None:
+        try:
+            await service.check_user(user_id)
+        except TaskValidationError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    events = broker.listen(user_id, request.headers.get("last-event-id") or after)
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def task_changes_socket(
+    websocket: WebSocket,
+    user_id: Optional[int] = None,
+    after: Optional[str] = None,
+    service: AsyncService = Depends(get_task_read_service),
+    broker: EventBroker = Depends(get_broker),
+):
+    """The task change feed of /stream over a WebSocket, as JSON messages"""
+    if user_id is not None:
+        try:
+            await service.check_user(user_id)
+        except TaskValidationError as e:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+            return
+    await websocket.accept()
+    
+    async def forward() -> None:
+        async for event in broker.listen(user_id, after):
+            await websocket.send_json(event_message(event) if event else {"type": "heartbeat"})
+    
+    # The client only ever sends a close; watching for it ends the feed as soon as it leaves
+    sender = asyncio.create_task(forward())
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+
+@router.get("/search", response_model=List[TaskResponse])
+async def search_tasks(
+    q: str = Query(..., max_length=200),
+    user_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    service: AsyncService = Depends(get_task_read_service),
+):
+    """Full-text search over live (not archived) tasks' title and description; end a word with * to match it as a prefix"""
+    try:
+        return await service.search_tasks(q, user_id=user_id, limit=limit, offset=offset)
+    except TaskValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def batch_response(outcomes: List[tuple]) -> TaskBatchResponse:
+    """Per-ID outcomes of a batch operation"""
+    results = [TaskBatchResult(id=task_id, error=error) for task_id, error in outcomes]
+    succeeded = sum(1 for result in results if result.error is None)
+    return TaskBatchResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+@router.post("/complete", response_model=TaskBatchResponse)
+async def complete_tasks(batch: TaskBatchRequest, service: AsyncService = Depends(get_task_service)):
+    """Mark many tasks of a user as completed in one transaction, reporting the outcome per ID"""
+    return batch_response(await service.complete_tasks(batch.task_ids, batch.user_id))
+
+@router.post("/delete", response_model=TaskBatchResponse)
+async def delete_tasks(batch: TaskBatchRequest, service: AsyncService = Depends(get_task_service)):
+    """Delete many tasks of a user in one transaction, reporting the outcome per ID"""
+    return batch_response(await service.delete_tasks(batch.task_ids, batch.user_id))
 
 @router.put("/{task_id}/complete", response_model=TaskResponse)
-def complete_task(task_id: int, user_id: int, service: TaskService = Depends(get_task_service)):
+async def complete_task(task_id: int, user_id: int, service: AsyncService = Depends(get_task_service)):
     """Mark task as completed for specific user"""
     try:
-        task = service.complete_task(task_id, user_id)
+        task = await service.complete_task(task_id, user_id)
         return task
     except TaskValidationError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{task_id}")
-def delete_task(task_id: int, user_id: int, service: TaskService = Depends(get_task_service)):
+async def delete_task(task_id: int, user_id: int, service: AsyncService = Depends(get_task_service)):
     """Delete a task for specific user"""
     try:
-        service.delete_task(task_id, user_id)
+        await service.delete_task(task_id, user_id)
         return {"message": "Task deleted successfully"}
     except TaskValidationError as e:
         raise HTTPException(status_code=400, detail=str(e))
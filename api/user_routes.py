@@ -1,12 +1,18 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
-from database.connection import get_db
-from repositories.user_repository import UserRepository
-from services.user_service import UserService, UserValidationError
+from services.user_service import UserValidationError
+from services.job_service import JobValidationError
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.async_service import AsyncService, service_dependency
+from services.factories import create_user_service
+from config import get_settings
+from api.conditional import is_not_modified, make_etag, not_modified, set_validators
+from api.responses import rows_response
+from middleware.profiling import InstrumentedRoute
+from api.job_routes import JobResponse, get_job_service
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=InstrumentedRoute)
 
 # DTOs (Data Transfer Objects)
 class UserCreate(BaseModel):
@@ -26,45 +32,115 @@ class UserWithTasksResponse(BaseModel):
     username: str
     email: str
     task_count: int
+    completed_count: int
+    open_count: int
     
     class Config:
         from_attributes = True
 
-def get_user_service(db: Session = Depends(get_db)) -> UserService:
-    """Dependency injection for user service"""
-    repository = UserRepository(db)
-    return UserService(repository)
+class UserStatsResponse(BaseModel):
+    user_id: int
+    task_count: int
+    completed_count: int
+    open_count: int
+
+# UserWithTasksResponse fields, in fast-path row order
+USER_WITH_TASKS_FIELDS = ("id", "username", "email", "task_count", "completed_count", "open_count")
+
+get_user_service = service_dependency(create_user_service)
+get_user_read_service = service_dependency(create_user_service, read_only=True)
 
 @router.post("/", response_model=UserResponse)
 # Dependency relationship example
-def create_user(user_data: UserCreate, service: UserService = Depends(get_user_service)): #UserRoutes DEPENDS ON UserService
+async def create_user(user_data: UserCreate, service: AsyncService = Depends(get_user_service)): #UserRoutes DEPENDS ON UserService
     """Create a new user"""
     try:
-        user = service.create_user(user_data.username, user_data.email) ##  UserRoutes USES UserService method
+        user = await service.create_user(user_data.username, user_data.email) ##  UserRoutes USES UserService method
         return user
     except UserValidationError as e:
         ##  UserRoutes knows about UserService except
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[UserWithTasksResponse])
-def get_all_users(service: UserService = Depends(get_user_service)):
-    """Get all users with task count"""
-    users = service.get_all_users()
+async def get_all_users(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    service: AsyncService = Depends(get_user_read_service),
+):
+    """Get one page of users with task counts; follow X-Next-Cursor for the next page.
+
+    Supports If-None-Match / If-Modified-Since: an unchanged page is answered without counting tasks.
+    """
+    try:
+        # Stamped before the page is read: a write in between only makes the tag stale, never wrongly current
+        stamp, last_modified = await service.get_users_page_version(cursor=cursor, limit=limit)
+        etag = make_etag("users", *stamp, request.url.query)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        
+        if get_settings().fast_json:
+            rows, next_cursor = await service.list_user_rows_with_task_counts(cursor=cursor, limit=limit)
+            fast_response = rows_response(
+                USER_WITH_TASKS_FIELDS,
+                ((*row, row[3] - row[4]) for row in rows),
+                next_cursor,
+            )
+            set_validators(fast_response, etag, last_modified)
+            return fast_response
+        rows, next_cursor = await service.list_users_with_task_counts(cursor=cursor, limit=limit)
+    except UserValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    set_validators(response, etag, last_modified)
     return [
         UserWithTasksResponse(
             id=user.id,
             username=user.username,
             email=user.email,
-            task_count=len(user.tasks)
+            task_count=task_count,
+            completed_count=completed_count,
+            open_count=task_count - completed_count,
         )
-        for user in users
+        for user, task_count, completed_count in rows
     ]
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, service: UserService = Depends(get_user_service)):
-    """Get user by ID"""
+async def get_user(
+    user_id: int, request: Request, response: Response, service: AsyncService = Depends(get_user_read_service)
+):
+    """Get user by ID; supports If-None-Match / If-Modified-Since"""
     try:
-        user = service.get_user_by_id(user_id)
-        return user
+        user = await service.get_user_by_id(user_id)
+    except UserValidationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    last_modified = user.updated_at or user.created_at
+    etag = make_etag("user", user.id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return user
+
+@router.delete("/{user_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def delete_user(user_id: int, service: AsyncService = Depends(get_job_service)):
+    """Queue deleting a user and all their tasks as a background job; poll GET /api/jobs/{id}"""
+    try:
+        return await service.enqueue_user_deletion(user_id)
+    except JobValidationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{user_id}/stats", response_model=UserStatsResponse)
+async def get_user_stats(user_id: int, service: AsyncService = Depends(get_user_read_service)):
+    """Task counts of a user, served from the maintained counters"""
+    try:
+        task_count, completed_count = await service.get_user_stats(user_id)
     except UserValidationError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    return UserStatsResponse(
+        user_id=user_id,
+        task_count=task_count,
+        completed_count=completed_count,
+        open_count=task_count - completed_count,
+    )
@@ -0,0 +1,171 @@
+"""Benchmark suite: seed a dataset, time service methods and endpoints, compare against a baseline.
+
+    python -m benchmarks run --users 10000 --tasks 1000000 --database bench.db --output results.json
+    python -m benchmarks run --database bench.db --baseline baseline.json --threshold 0.2
+    python -m benchmarks compare results.json --baseline baseline.json
+    python -m benchmarks scaling --database bench.db --workers 1 2 4 8 --only "GET /api/tasks/user"
+    python -m benchmarks compression --database bench.db --bandwidth 20
+"""
+import argparse
+import os
+import platform
+import sys
+import tempfile
+import time
+from benchmarks.results import compare, load, save
+
+def prepare(args) -> dict:
+    """Point the app at the benchmark database, seed it unless it holds data, and sample IDs"""
+    # Configure before the app (and its engine) are imported; server subprocesses inherit it too
+    database = args.database or os.path.join(tempfile.mkdtemp(), "bench.db")
+    if "://" not in database:
+        database = f"sqlite:///{os.path.abspath(database)}"
+    os.environ["DATABASE_URL"] = database
+    os.environ["CACHE_BACKEND"] = args.cache
+    from benchmarks.seed import sample_ids, seed
+
+    started = time.perf_counter()
+    seeded = seed(args.users, args.tasks)
+    print(f"{'Seeded' if seeded else 'Reused'} {database} in {time.perf_counter() - started:.1f}s")
+    return sample_ids()
+
+def meta(args) -> dict:
+    """Run conditions recorded with the results"""
+    from config import get_settings
+
+    settings = get_settings()
+    return {
+        "users": args.users,
+        "tasks": args.tasks,
+        "concurrency": args.concurrency,
+        "cache_backend": args.cache,
+        "async_mode": settings.async_mode,
+        "fast_json": settings.fast_json,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def run(args) -> int:
+    """Seed (or reuse) a database, run the micro and load benchmarks and store the results"""
+    ids = prepare(args)
+    results = {"meta": meta(args)}
+    if not args.skip_micro:
+        from benchmarks.micro import run_micro
+        results["micro"] = run_micro(ids, args.iterations, args.only)
+        print_section("micro", results["micro"])
+    if not args.skip_load:
+        from benchmarks.load import run_load
+        results["load"] = run_load(ids, args.concurrency, args.requests, args.only)
+        print_section(f"load (concurrency {args.concurrency})", results["load"])
+
+    return finish(args, results)
+
+def scaling(args) -> int:
+    """Seed (or reuse) a database and measure throughput of gunicorn servers with each worker count"""
+    ids = prepare(args)
+    from benchmarks.scaling import run_scaling, speedups
+
+    results = {"meta": {**meta(args), "workers": args.workers, "clients": args.clients}}
+    results["scaling"] = run_scaling(ids, args.workers, args.clients, args.concurrency, args.requests, args.only)
+    print_section(f"scaling (concurrency {args.concurrency}, {args.clients} client processes)", results["scaling"])
+    print("\nthroughput relative to the fewest workers")
+    for name, relative in speedups(results["scaling"]).items():
+        print(f"{name:<45} " + "  ".join(f"{workers}w: {speedup:.2f}x" for workers, speedup in relative.items()))
+    return finish(args, results)
+
+def compression(args) -> int:
+    """Seed (or reuse) a database and compare response sizes and latency of the list endpoints per encoding"""
+    ids = prepare(args)
+    from benchmarks.compression import run_compression, savings
+
+    results = {"meta": {**meta(args), "bandwidth_mbps": args.bandwidth}}
+    results["compression"] = run_compression(ids, args.iterations, args.bandwidth, args.only)
+    print_section("compression (in process, sequential)", results["compression"])
+    print(f"\nbytes and estimated p50 client latency at {args.bandwidth:g} Mbit/s, relative to identity")
+    print(f"{'benchmark':<45} {'encoding':>9} {'bytes':>10} {'ratio':>7} {'ms saved':>9}")
+    for name, encodings in savings(results["compression"]).items():
+        identity = results["compression"][f"{name} [identity]"]["bytes"]
+        for encoding, saved in encodings.items():
+            print(f"{name:<45} {encoding:>9} {identity - saved['bytes_saved']:>10} {saved['ratio']:>7.3f} {saved['ms_saved']:>9.2f}")
+    return finish(args, results)
+
+def finish(args, results: dict) -> int:
+    """Store the results and compare them against the baseline, if given"""
+    if args.output:
+        save(args.output, results)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        return report_regressions(results, load(args.baseline), args.threshold, args.metric)
+    return 0
+
+def compare_results(args) -> int:
+    """Compare a results file against a baseline; exit status 1 on regression"""
+    return report_regressions(load(args.results), load(args.baseline), args.threshold, args.metric)
+
+def print_section(title: str, section: dict) -> None:
+    print(f"\n{title}")
+    print(f"{'benchmark':<45} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for name, result in section.items():
+        throughput = result.get("throughput_rps", "")
+        print(
+            f"{name:<45} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+            f" {throughput:>9} {result['errors']:>7}"
+        )
+
+def report_regressions(current: dict, baseline: dict, threshold: float, metric: str) -> int:
+    regressions = compare(current, baseline, threshold, metric)
+    if not regressions:
+        print(f"\nNo {metric} regressions beyond {threshold:.0%} of the baseline")
+        return 0
+    print(f"\n{len(regressions)} {metric} regression(s) beyond {threshold:.0%} of the baseline:")
+    for regression in regressions:
+        print(f"  {regression.name:<55} {regression.baseline:>9.2f} -> {regression.current:>9.2f} ({regression.change:+.0%})")
+    return 1
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help=run.__doc__)
+    run_parser.add_argument("--iterations", type=int, default=200, help="calls per micro-benchmark")
+    run_parser.add_argument("--skip-micro", action="store_true")
+    run_parser.add_argument("--skip-load", action="store_true")
+    run_parser.set_defaults(handler=run)
+
+    scaling_parser = commands.add_parser("scaling", help=scaling.__doc__)
+    scaling_parser.add_argument(
+        "--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}), help="worker counts to compare"
+    )
+    scaling_parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="load generator processes")
+    scaling_parser.set_defaults(handler=scaling)
+
+    compression_parser = commands.add_parser("compression", help=compression.__doc__)
+    compression_parser.add_argument("--iterations", type=int, default=50, help="requests per endpoint and encoding")
+    compression_parser.add_argument("--bandwidth", type=float, default=20.0, help="client link in Mbit/s for the estimate")
+    compression_parser.set_defaults(handler=compression)
+
+    for command in (run_parser, scaling_parser, compression_parser):
+        command.add_argument("--users", type=int, default=10000)
+        command.add_argument("--tasks", type=int, default=1000000)
+        command.add_argument("--database", help="SQLite file or database URL; reused if it already holds data")
+        command.add_argument("--cache", default="none", help="CACHE_BACKEND to run with (default: none)")
+        command.add_argument("--concurrency", type=int, default=16, help="concurrent clients in the load test")
+        command.add_argument("--requests", type=int, default=1000, help="requests per endpoint in the load test")
+        command.add_argument("--only", nargs="*", help="run only benchmarks whose name contains one of these")
+        command.add_argument("--output", help="write results as JSON")
+
+    compare_parser = commands.add_parser("compare", help=compare_results.__doc__)
+    compare_parser.add_argument("results")
+    compare_parser.set_defaults(handler=compare_results)
+
+    for command in (run_parser, scaling_parser, compression_parser, compare_parser):
+        command.add_argument("--baseline", required=command is compare_parser, help="results JSON to compare against")
+        command.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+        command.add_argument("--metric", default="p95_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == "__main__":
+    main()
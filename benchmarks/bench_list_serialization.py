@@ -0,0 +1,50 @@
+"""Compare list endpoint latency on the default Pydantic path and the FAST_JSON path.
+
+    python -m benchmarks.bench_list_serialization --tasks 20000 --limit 1000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.seed import seed
+
+def measure(client, path: str, repeat: int) -> float:
+    """Median wall time of GET `path` in milliseconds"""
+    client.get(path)  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+    return statistics.median(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Configure before the app (and its engine) are imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.testclient import TestClient
+    from config import get_settings
+    from main import app
+
+    seed(args.users, args.tasks)
+    paths = [f"/api/tasks/?limit={args.limit}", f"/api/tasks/user/1?limit={args.limit}", f"/api/users/?limit={args.users}"]
+    with TestClient(app) as client:
+        print(f"{'endpoint':<40} {'default ms':>11} {'fast ms':>9} {'speedup':>8}")
+        for path in paths:
+            get_settings().fast_json = False
+            default = measure(client, path, args.repeat)
+            get_settings().fast_json = True
+            fast = measure(client, path, args.repeat)
+            print(f"{path:<40} {default:>11.2f} {fast:>9.2f} {default / fast:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
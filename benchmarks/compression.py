@@ -0,0 +1,75 @@
+"""Response compression: bytes on the wire and latency per encoding for the large list endpoints.
+
+Requests go through the ASGI app in process, so the measured latency includes the compression
+work but no network; the transfer time at `bandwidth_mbps` is added to show what a client on
+that link would wait in total.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+from benchmarks.results import summarize
+
+def paths(ids: dict) -> Dict[str, str]:
+    """Benchmark name -> path of a large list response"""
+    user = ids["users"][0]
+    return {
+        "GET /api/tasks/?limit=100": "/api/tasks/?limit=100",
+        "GET /api/tasks/?limit=1000": "/api/tasks/?limit=1000",
+        "GET /api/tasks/user/{id}?limit=1000": f"/api/tasks/user/{user}?limit=1000",
+        "GET /api/users/?limit=1000": "/api/users/?limit=1000",
+    }
+
+async def measure(client, path: str, encoding: str, iterations: int, bandwidth_mbps: float) -> dict:
+    """Latency of `iterations` sequential requests, the response size and the estimated time on the link"""
+    latencies: List[float] = []
+    size = errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        request_started = time.perf_counter()
+        async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            size = sum([len(chunk) async for chunk in response.aiter_raw()])
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    result = summarize(latencies, time.perf_counter() - started, errors)
+    transfer_ms = size * 8 / (bandwidth_mbps * 1000)
+    result.update(bytes=size, transfer_ms=round(transfer_ms, 3), total_p50_ms=round(result["p50_ms"] + transfer_ms, 3))
+    return result
+
+async def _run_compression(ids: dict, iterations: int, bandwidth_mbps: float, only: Optional[List[str]]) -> Dict[str, dict]:
+    import httpx
+    from main import app
+    from middleware.compression import brotli, zstandard
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli else []) + (["zstd"] if zstandard else [])
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for name, path in paths(ids).items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            for encoding in encodings:
+                await measure(client, path, encoding, max(1, iterations // 10), bandwidth_mbps)  # warm up
+                results[f"{name} [{encoding}]"] = await measure(client, path, encoding, iterations, bandwidth_mbps)
+    return results
+
+def run_compression(ids: dict, iterations: int, bandwidth_mbps: float, only: Optional[List[str]] = None) -> Dict[str, dict]:
+    """Bytes, server latency and estimated client latency of each list endpoint per encoding"""
+    return asyncio.run(_run_compression(ids, iterations, bandwidth_mbps, only))
+
+def savings(results: Dict[str, dict]) -> Dict[str, Dict[str, dict]]:
+    """Per endpoint and encoding: bytes and estimated client milliseconds saved against identity"""
+    by_endpoint: Dict[str, Dict[str, dict]] = {}
+    for key, result in results.items():
+        name, _, encoding = key.rpartition(" [")
+        by_endpoint.setdefault(name, {})[encoding.rstrip("]")] = result
+    return {
+        name: {
+            encoding: {
+                "bytes_saved": encodings["identity"]["bytes"] - result["bytes"],
+                "ratio": round(result["bytes"] / encodings["identity"]["bytes"], 3) if encodings["identity"]["bytes"] else 1.0,
+                "ms_saved": round(encodings["identity"]["total_p50_ms"] - result["total_p50_ms"], 3),
+            }
+            for encoding, result in encodings.items() if encoding != "identity"
+        }
+        for name, encodings in by_endpoint.items() if "identity" in encodings
+    }
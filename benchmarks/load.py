@@ -0,0 +1,71 @@
+"""In-process load test: drive the ASGI app at a fixed concurrency and record latency per endpoint"""
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from benchmarks.results import summarize
+
+class Endpoint(NamedTuple):
+    method: str
+    path: Callable[[random.Random], str]
+    body: Optional[Callable[[random.Random], dict]] = None
+
+def endpoints(ids: dict) -> Dict[str, Endpoint]:
+    """Benchmark name -> request factory"""
+    users = ids["users"]
+    return {
+        "GET /api/tasks/": Endpoint("GET", lambda rng: "/api/tasks/?limit=100"),
+        "GET /api/tasks/user/{id}": Endpoint("GET", lambda rng: f"/api/tasks/user/{rng.choice(users)}?limit=100"),
+        "GET /api/tasks/search": Endpoint("GET", lambda rng: "/api/tasks/search?q=budget%20rev*&limit=20"),
+        "GET /api/tasks/stats": Endpoint("GET", lambda rng: "/api/tasks/stats"),
+        "GET /api/users/": Endpoint("GET", lambda rng: "/api/users/?limit=100"),
+        "GET /api/users/{id}": Endpoint("GET", lambda rng: f"/api/users/{rng.choice(users)}"),
+        "GET /api/users/{id}/stats": Endpoint("GET", lambda rng: f"/api/users/{rng.choice(users)}/stats"),
+        "POST /api/tasks/": Endpoint(
+            "POST", lambda rng: "/api/tasks/", lambda rng: {"title": "Benchmark task", "user_id": rng.choice(users)}
+        ),
+    }
+
+async def drive(client, endpoint: Endpoint, concurrency: int, requests: int, rng: random.Random) -> dict:
+    """Send `requests` requests from `concurrency` concurrent clients"""
+    started = time.perf_counter()
+    latencies, errors = await send(client, endpoint, concurrency, requests, rng)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+async def send(client, endpoint: Endpoint, concurrency: int, requests: int, rng: random.Random) -> Tuple[List[float], int]:
+    """Latencies (ms) and error count of `requests` requests from `concurrency` concurrent clients"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client_loop():
+        nonlocal errors
+        for _ in remaining:
+            body = endpoint.body(rng) if endpoint.body else None
+            started = time.perf_counter()
+            response = await client.request(endpoint.method, endpoint.path(rng), json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies, errors
+
+async def _run_load(ids: dict, concurrency: int, requests: int, only: List[str]) -> Dict[str, dict]:
+    import httpx
+    from main import app
+
+    rng = random.Random(0)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, endpoint in endpoints(ids).items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            await drive(client, endpoint, concurrency, concurrency * 2, rng)  # warm up
+            results[name] = await drive(client, endpoint, concurrency, requests, rng)
+    return results
+
+def run_load(ids: dict, concurrency: int, requests: int, only: List[str] = None) -> Dict[str, dict]:
+    """p50/p95/p99 latency and throughput of each endpoint at a fixed concurrency"""
+    return asyncio.run(_run_load(ids, concurrency, requests, only))
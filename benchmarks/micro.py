@@ -0,0 +1,43 @@
+"""Micro-benchmarks of service and repository methods, one fresh session per call"""
+import random
+import time
+from typing import Callable, Dict, List
+from benchmarks.results import summarize
+
+def cases(ids: dict) -> Dict[str, Callable]:
+    """Benchmark name -> fn(task_service, user_service, rng)"""
+    users, tasks = ids["users"], ids["tasks"]
+    return {
+        "TaskService.list_tasks": lambda ts, us, rng: ts.list_tasks(limit=100),
+        "TaskService.list_user_tasks": lambda ts, us, rng: ts.list_user_tasks(rng.choice(users), limit=100),
+        "TaskService.list_task_rows": lambda ts, us, rng: ts.list_task_rows(limit=100),
+        "TaskService.search_tasks": lambda ts, us, rng: ts.search_tasks("budget rev*", limit=20),
+        "TaskService.get_task_stats": lambda ts, us, rng: ts.get_task_stats(),
+        "TaskService.create_task": lambda ts, us, rng: ts.create_task("Benchmark task", rng.choice(users)),
+        "UserService.list_users_with_task_counts": lambda ts, us, rng: us.list_users_with_task_counts(limit=100),
+        "UserService.get_user_by_id": lambda ts, us, rng: us.get_user_by_id(rng.choice(users)),
+        "UserService.get_user_stats": lambda ts, us, rng: us.get_user_stats(rng.choice(users)),
+        "TaskRepository.get_task_by_id": lambda ts, us, rng: ts.task_repository.get_task_by_id(rng.choice(tasks)),
+        "TaskRepository.get_tasks_page": lambda ts, us, rng: ts.task_repository.get_tasks_page(101),
+    }
+
+def run_micro(ids: dict, iterations: int, only: List[str] = None) -> Dict[str, dict]:
+    """Time each case `iterations` times; writes are rolled back so the dataset stays put"""
+    from services.factories import create_task_service, create_user_service
+    from database.connection import SessionLocal
+
+    rng = random.Random(0)
+    results = {}
+    for name, case in cases(ids).items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        timings = []
+        for _ in range(iterations):
+            with SessionLocal() as db:
+                task_service, user_service = create_task_service(db), create_user_service(db)
+                started = time.perf_counter()
+                case(task_service, user_service, rng)
+                timings.append((time.perf_counter() - started) * 1000)
+                db.rollback()
+        results[name] = summarize(timings)
+    return results
@@ -0,0 +1,55 @@
+"""Latency summaries, JSON result files and baseline comparison"""
+import json
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(latencies_ms: Sequence[float], elapsed_s: Optional[float] = None, errors: int = 0) -> Dict[str, float]:
+    """p50/p95/p99/mean latency and, given the wall time, throughput"""
+    summary = {
+        "count": len(latencies_ms),
+        "errors": errors,
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = round(len(latencies_ms) / elapsed_s, 1)
+    return summary
+
+def save(path: str, results: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+class Regression(NamedTuple):
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1 if self.baseline else math.inf
+
+def compare(current: dict, baseline: dict, threshold: float, metric: str = "p95_ms") -> List[Regression]:
+    """Benchmarks whose `metric` got worse than the baseline by more than `threshold` (0.2 = 20%)"""
+    regressions = []
+    for section in ("micro", "load"):
+        for name, result in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or metric not in previous or metric not in result:
+                continue
+            if result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(Regression(f"{section}: {name}", previous[metric], result[metric]))
+    return regressions
@@ -0,0 +1,114 @@
+"""Multi-process scaling: throughput of real gunicorn servers as the worker count grows.
+
+Each worker count gets a fresh server on the benchmark database; the load comes from
+several client processes over TCP, so the generator is not the first thing to saturate.
+Run it on a machine with spare cores (or a separate load host) for meaningful numbers.
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from benchmarks.results import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT_SECONDS = 60
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """gunicorn with `workers` workers on the current environment's database and cache settings"""
+    env = {**os.environ, "WORKERS": str(workers), "BIND": f"127.0.0.1:{port}", "METRICS_ENABLED": "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn_conf.py"), "main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    wait_until_ready(server, port, workers)
+    return server
+
+def wait_until_ready(server: subprocess.Popen, port: int, workers: int) -> None:
+    import httpx
+
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited: {server.stderr.read().decode()[-2000:]}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            # Answering doesn't mean every worker has booted; give the rest a moment
+            time.sleep(0.2 * workers)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+def _client_process(job: Tuple[str, str, dict, int, int, int]) -> Tuple[List[float], int]:
+    """One load generator process: `concurrency` connections sending `requests` requests"""
+    base_url, name, ids, concurrency, requests, seed = job
+    import httpx
+    from benchmarks.load import endpoints, send
+
+    async def run():
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            return await send(client, endpoints(ids)[name], concurrency, requests, random.Random(seed))
+    return asyncio.run(run())
+
+def drive_processes(pool, base_url: str, name: str, ids: dict, clients: int, concurrency: int, requests: int) -> dict:
+    """Split `requests` over `clients` processes and summarize them together"""
+    per_client = max(1, requests // clients)
+    jobs = [(base_url, name, ids, max(1, concurrency // clients), per_client, seed) for seed in range(clients)]
+    started = time.perf_counter()
+    outcomes = pool.map(_client_process, jobs)
+    elapsed = time.perf_counter() - started
+    latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+    return summarize(latencies, elapsed, sum(errors for _, errors in outcomes))
+
+def run_scaling(
+    ids: dict, worker_counts: List[int], clients: int, concurrency: int, requests: int, only: Optional[List[str]] = None
+) -> Dict[str, dict]:
+    """Latency and throughput of each endpoint per worker count, keyed "<endpoint> [workers=N]" """
+    from benchmarks.load import endpoints
+
+    names = [name for name in endpoints(ids) if not only or any(pattern in name for pattern in only)]
+    results = {}
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        for workers in worker_counts:
+            port = free_port()
+            server = start_server(workers, port)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                for name in names:
+                    drive_processes(pool, base_url, name, ids, clients, concurrency, concurrency * 2)  # warm up
+                    results[f"{name} [workers={workers}]"] = drive_processes(
+                        pool, base_url, name, ids, clients, concurrency, requests
+                    )
+            finally:
+                stop_server(server)
+    return results
+
+def speedups(results: Dict[str, dict]) -> Dict[str, Dict[int, float]]:
+    """Throughput relative to the smallest worker count, per endpoint"""
+    by_endpoint: Dict[str, Dict[int, float]] = {}
+    for key, result in results.items():
+        name, _, workers = key.rpartition(" [workers=")
+        by_endpoint.setdefault(name, {})[int(workers.rstrip("]"))] = result.get("throughput_rps", 0.0)
+    return {
+        name: {workers: round(rps / throughputs[min(throughputs)], 2) if throughputs[min(throughputs)] else 0.0
+               for workers, rps in sorted(throughputs.items())}
+        for name, throughputs in by_endpoint.items()
+    }
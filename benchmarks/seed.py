@@ -0,0 +1,72 @@
+"""Seed a benchmark database with a realistic dataset"""
+import random
+from datetime import datetime, timedelta, timezone
+
+WORDS = (
+    "buy milk bread call mom dentist report review budget invoice email meeting plan sprint deploy fix bug "
+    "write docs update design refactor test release backup server renew passport book flight hotel clean "
+    "garage water plants pay rent gym run laundry groceries prepare slides schedule interview onboard"
+).split()
+
+CHUNK_SIZE = 10000
+
+def seed(users: int, tasks: int, completed_ratio: float = 0.3, random_seed: int = 42) -> bool:
+    """Migrate the configured database and fill it; returns False if it already held data and was reused"""
+    from sqlalchemy import func, insert, select
+    from database.connection import SessionLocal, engine
+    from database.migrations import run_migrations
+    from database.unit_of_work import UnitOfWork
+    from models.task import Task
+    from models.user import User
+    from repositories.stats_repository import StatsRepository
+
+    run_migrations(engine)
+    rng = random.Random(random_seed)
+    with SessionLocal() as db:
+        if db.scalar(select(func.count(User.id))):
+            return False
+
+        with UnitOfWork(db):
+            db.execute(insert(User), [{"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(users)])
+        user_ids = list(db.scalars(select(User.id).order_by(User.id)))
+        # A few heavy users and a long tail, roughly Zipf-shaped like real task lists
+        cumulative, total = [], 0.0
+        for rank in range(len(user_ids)):
+            total += 1 / (rank + 1) ** 0.8
+            cumulative.append(total)
+
+        # created_at grows with id over the last year, as it does in production
+        started = datetime.now(timezone.utc) - timedelta(days=365)
+        step = timedelta(days=365) / max(tasks, 1)
+        for offset in range(0, tasks, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, tasks - offset)
+            owners = rng.choices(user_ids, cum_weights=cumulative, k=count)
+            rows = [
+                {
+                    "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 6))).capitalize(),
+                    "description": " ".join(rng.choices(WORDS, k=rng.randint(8, 20))) if rng.random() < 0.5 else None,
+                    "is_completed": rng.random() < completed_ratio,
+                    "user_id": owner,
+                    "created_at": started + step * (offset + i),
+                }
+                for i, owner in enumerate(owners)
+            ]
+            with UnitOfWork(db):
+                db.execute(insert(Task), rows)
+
+        with UnitOfWork(db):
+            StatsRepository(db).rebuild()
+    return True
+
+def sample_ids(limit: int = 1000) -> dict:
+    """User and task IDs for benchmarks to pick from"""
+    from sqlalchemy import select
+    from database.connection import SessionLocal
+    from models.task import Task
+    from models.user import User
+
+    with SessionLocal() as db:
+        return {
+            "users": list(db.scalars(select(User.id).order_by(User.id).limit(limit))),
+            "tasks": list(db.scalars(select(Task.id).order_by(Task.id).limit(limit))),
+        }
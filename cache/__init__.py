@@ -0,0 +1,16 @@
+from functools import lru_cache
+from config import get_settings
+from cache.backends import CacheBackend, MemoryCache, NullCache, RedisCache
+
+@lru_cache()
+def get_cache() -> CacheBackend:
+    """The process-wide cache configured by CACHE_BACKEND (memory, redis or none)"""
+    settings = get_settings()
+    if settings.cache_backend == "redis":
+        import redis
+
+        client = redis.Redis.from_url(settings.redis_url)
+        return RedisCache(client, ttl_seconds=settings.cache_ttl_seconds)
+    if settings.cache_backend == "memory":
+        return MemoryCache(max_entries=settings.cache_max_entries, ttl_seconds=settings.cache_ttl_seconds)
+    return NullCache()
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+class CacheBackend:
+    """Key/value cache storing JSON-compatible values, with hit/miss/eviction counters"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Guards the counters (and, in MemoryCache, the entries), as gets run on many threadpool threads
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get(key)
+        with self._lock:
+            self._count(value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _count(self, value: Optional[Any]) -> None:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def _get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+class NullCache(CacheBackend):
+    """Caching disabled: every lookup misses"""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def _get(self, key: str) -> Optional[Any]:
+        return None
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache bounded by entry count and per-entry TTL"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        # Lookup and counting under one lock, so the counters agree with what was served
+        with self._lock:
+            value = self._get(key)
+            self._count(value)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "size": len(self._entries)}
+
+    def _get(self, key: str) -> Optional[Any]:
+        # Called with the lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+class RedisCache(CacheBackend):
+    """Cache shared between workers, on any client with Redis get/set(ex=)/delete semantics"""
+
+    def __init__(self, client, ttl_seconds: int = 60, prefix: str = "task_tracker:"):
+        super().__init__()
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def set(self, key: str, value: Any) -> None:
+        # Bounded by TTL here; size bounds and eviction are the Redis server's maxmemory policy
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl_seconds)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def _get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Any, Dict, Type
+from sqlalchemy import DateTime, inspect
+
+def model_to_dict(obj: Any) -> Dict[str, Any]:
+    """JSON-compatible snapshot of a model's column values"""
+    data = {}
+    for column in inspect(type(obj)).columns:
+        value = getattr(obj, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+def model_from_dict(model: Type, data: Dict[str, Any]) -> Any:
+    """Rebuild a detached (transient) model instance from a cached snapshot"""
+    values = dict(data)
+    for column in inspect(model).columns:
+        if isinstance(column.type, DateTime) and values.get(column.key) is not None:
+            values[column.key] = datetime.fromisoformat(values[column.key])
+    return model(**values)
@@ -0,0 +1,161 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer from the environment"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def env_float(name: str, default: float) -> float:
+    """Read a float from the environment"""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a string from the environment, treating empty values as unset"""
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+class Settings:
+    """Application settings read from environment variables"""
+
+    def __init__(self):
+        # Serve requests with async routes on an AsyncSession instead of threadpool + Session
+        self.async_mode = env_bool("ASYNC_MODE")
+
+        # List endpoints select bare columns and encode them with orjson, skipping per-row Pydantic models
+        self.fast_json = env_bool("FAST_JSON")
+
+        # Database: primary (read-write) URL and an optional separate URL for GET routes
+        self.database_url = env_str("DATABASE_URL", "sqlite:///./tasks.db")
+        self.database_read_url = env_str("DATABASE_READ_URL")
+
+        # Connection pool
+        self.db_pool_size = env_int("DB_POOL_SIZE", 5)
+        self.db_max_overflow = env_int("DB_MAX_OVERFLOW", 10)
+        self.db_pool_timeout = env_int("DB_POOL_TIMEOUT", 30)
+        self.db_pool_recycle = env_int("DB_POOL_RECYCLE", 1800)
+        self.db_pool_pre_ping = env_bool("DB_POOL_PRE_PING", True)
+
+        # SQLite profile applied to every new connection
+        self.sqlite_journal_mode = env_str("SQLITE_JOURNAL_MODE", "WAL")
+        self.sqlite_synchronous = env_str("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.sqlite_busy_timeout_ms = env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+        self.sqlite_mmap_size = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+        # Negative values are KiB, as in PRAGMA cache_size
+        self.sqlite_cache_size = env_int("SQLITE_CACHE_SIZE", -64 * 1024)
+
+        # Read-through cache for user lookups and per-user task lists: memory, redis or none
+        self.cache_backend = env_str("CACHE_BACKEND", "memory").lower()
+        self.cache_ttl_seconds = env_int("CACHE_TTL_SECONDS", 60)
+        self.cache_max_entries = env_int("CACHE_MAX_ENTRIES", 10000)
+        self.redis_url = env_str("REDIS_URL", "redis://localhost:6379/0")
+
+        # Multi-process serving (gunicorn_conf.py): worker processes, preloading and timeouts.
+        # Unset, one per core - but only once no per-process backend is in use (see shares_state)
+        self.workers = env_int("WORKERS", env_int("WEB_CONCURRENCY", 0))
+        self.preload_app = env_bool("PRELOAD_APP", True)
+        self.bind = env_str("BIND", "0.0.0.0:8000")
+        self.worker_timeout = env_int("WORKER_TIMEOUT", 60)
+        self.graceful_timeout = env_int("GRACEFUL_TIMEOUT", 30)
+        # Recycle each worker after this many requests (plus jitter); 0 never recycles
+        self.max_requests = env_int("MAX_REQUESTS", 0)
+        # Apply pending migrations when the app starts; gunicorn runs them once in the master instead
+        self.migrate_on_startup = env_bool("MIGRATE_ON_STARTUP", True)
+
+        # Task change feed (SSE / WebSocket): memory (single process), redis (shared by workers) or none
+        self.events_backend = env_str("EVENTS_BACKEND", "memory").lower()
+        # Recent events kept per process for subscribers resuming with Last-Event-ID
+        self.events_buffer_size = env_int("EVENTS_BUFFER_SIZE", 10000)
+        self.events_heartbeat_seconds = env_float("EVENTS_HEARTBEAT_SECONDS", 15.0)
+        self.events_stream = env_str("EVENTS_STREAM", "task_tracker:events")
+        self.events_stream_max_length = env_int("EVENTS_STREAM_MAX_LENGTH", 100000)
+
+        # Admission control: per-client token buckets (429), then at most MAX_CONCURRENT_REQUESTS in
+        # flight per process - by default one per pooled connection - with a bounded wait queue (503)
+        self.rate_limit_backend = env_str("RATE_LIMIT_BACKEND", "memory").lower()
+        # Sustained requests per second per client; 0 disables rate limiting
+        self.rate_limit_per_second = env_float("RATE_LIMIT_PER_SECOND", 0.0)
+        self.rate_limit_burst = env_int("RATE_LIMIT_BURST", 50)
+        self.rate_limit_max_clients = env_int("RATE_LIMIT_MAX_CLIENTS", 10000)
+        # Identify clients by this header (e.g. X-Forwarded-For behind a trusted proxy) instead of the peer address
+        self.rate_limit_client_header = env_str("RATE_LIMIT_CLIENT_HEADER")
+        self.max_concurrent_requests = env_int("MAX_CONCURRENT_REQUESTS", self.db_pool_size + self.db_max_overflow)
+        self.admission_queue_size = env_int("ADMISSION_QUEUE_SIZE", 2 * self.max_concurrent_requests)
+        # Well under DB_POOL_TIMEOUT, so requests are turned away before they would time out on the pool
+        self.admission_queue_timeout_seconds = env_float("ADMISSION_QUEUE_TIMEOUT_SECONDS", 2.0)
+        self.admission_retry_after_seconds = env_int("ADMISSION_RETRY_AFTER_SECONDS", 1)
+
+        # Archival: completed tasks older than ARCHIVE_AFTER_DAYS move to tasks_archive in short batches,
+        # every ARCHIVE_INTERVAL_SECONDS in the app (0 leaves it to `python manage.py archive-tasks`)
+        self.archive_after_days = env_float("ARCHIVE_AFTER_DAYS", 30.0)
+        self.archive_batch_size = env_int("ARCHIVE_BATCH_SIZE", 500)
+        self.archive_batch_pause_seconds = env_float("ARCHIVE_BATCH_PAUSE_SECONDS", 0.05)
+        self.archive_interval_seconds = env_float("ARCHIVE_INTERVAL_SECONDS", 0.0)
+
+        # Background jobs (bulk imports, user deletion, recounts): JOB_CONCURRENCY worker threads per process
+        # claim queued jobs from the jobs table; failed attempts are retried with exponential backoff
+        self.jobs_enabled = env_bool("JOBS_ENABLED", True)
+        self.job_concurrency = env_int("JOB_CONCURRENCY", 2)
+        self.job_poll_seconds = env_float("JOB_POLL_SECONDS", 1.0)
+        self.job_max_attempts = env_int("JOB_MAX_ATTEMPTS", 5)
+        self.job_retry_base_seconds = env_float("JOB_RETRY_BASE_SECONDS", 2.0)
+        self.job_retry_max_seconds = env_float("JOB_RETRY_MAX_SECONDS", 300.0)
+        # A running job's worker bumps its heartbeat every JOB_HEARTBEAT_SECONDS, however long a step takes;
+        # one not heartbeating for JOB_STALE_SECONDS is assumed lost and claimed again
+        self.job_heartbeat_seconds = env_float("JOB_HEARTBEAT_SECONDS", 30.0)
+        self.job_stale_seconds = env_float("JOB_STALE_SECONDS", 300.0)
+        # Bulk imports, inline or queued (and then stored in the jobs table), are read whole before any
+        # task is written: larger bodies are refused (413)
+        self.bulk_max_items = env_int("BULK_MAX_ITEMS", 100000)
+        self.bulk_max_bytes = env_int("BULK_MAX_BYTES", 32 * 1024 * 1024)
+
+        # Response compression: the first of COMPRESSION_ENCODINGS the client accepts (br and zstd only when
+        # the brotli / zstandard packages are installed) for text bodies of at least COMPRESSION_MIN_SIZE bytes
+        self.compression_encodings = env_str("COMPRESSION_ENCODINGS", "br,zstd,gzip") or ""
+        self.compression_min_size = env_int("COMPRESSION_MIN_SIZE", 1024)
+        # Moderate levels: most of the ratio on large list pages for a fraction of the CPU of the maximum ones
+        self.compression_gzip_level = env_int("COMPRESSION_GZIP_LEVEL", 6)
+        self.compression_brotli_quality = env_int("COMPRESSION_BROTLI_QUALITY", 4)
+        self.compression_zstd_level = env_int("COMPRESSION_ZSTD_LEVEL", 3)
+
+        # HTTP server (gunicorn_conf.py): idle keep-alive connections are kept this long - longer than
+        # any load balancer in front, or it will reuse connections the server already closed
+        self.keepalive_seconds = env_int("KEEPALIVE_SECONDS", 5)
+        self.backlog = env_int("BACKLOG", 2048)
+        # auto picks httptools and uvloop when installed (uvicorn[standard]), else h11 and asyncio
+        self.http_protocol = env_str("HTTP_PROTOCOL", "auto").lower()
+        self.event_loop = env_str("EVENT_LOOP", "auto").lower()
+
+        if not self.workers:
+            self.workers = (os.cpu_count() or 1) if self.shares_state() else 1
+
+        # Per-request SQL/ORM/serialization instrumentation: Server-Timing headers and /metrics
+        self.metrics_enabled = env_bool("METRICS_ENABLED", True)
+        self.slow_request_ms = env_int("SLOW_REQUEST_MS", 500)
+        # Profile a sampled fraction of requests, and any request sending "X-Profile: <PROFILE_TOKEN>"
+        self.profile_sample_rate = env_float("PROFILE_SAMPLE_RATE", 0.0)
+        self.profile_token = env_str("PROFILE_TOKEN")
+        self.profiler = env_str("PROFILER", "cprofile").lower()
+        self.profile_dir = env_str("PROFILE_DIR", "profiles")
+
+    def shares_state(self) -> bool:
+        """Whether cache, change feed and rate limits are shared by all worker processes (Redis or off)"""
+        return (
+            self.cache_backend != "memory"
+            and self.events_backend != "memory"
+            and (self.rate_limit_per_second <= 0 or self.rate_limit_backend != "memory")
+        )
+
+@lru_cache()
+def get_settings() -> Settings:
+    """Settings are read once per process"""
+    return Settings()
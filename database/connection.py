@@ -1,14 +1,143 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from config import Settings, get_settings
+from database.instrumentation import current_request_stats
 
-DATABASE_URL = "sqlite:///./tasks.db"
+settings = get_settings()
+DATABASE_URL = settings.database_url
+
+# Async drivers used when the app runs in async mode
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+# Execution option asking the SQLite profile to open transactions with BEGIN IMMEDIATE
+BEGIN_IMMEDIATE = "sqlite_begin_immediate"
+
+def is_sqlite(url: str) -> bool:
+    """Whether the URL points at a SQLite database"""
+    return make_url(url).get_backend_name() == "sqlite"
+
+def engine_options(url: str, settings: Settings, is_async: bool = False) -> dict:
+    """Pool and driver options for an engine on the given URL"""
+    options = {}
+    database = make_url(url).database
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if not database or database == ":memory:":
+            # In-memory databases live in a single connection; there is nothing to pool
+            return options
+        if is_async:
+            # aiosqlite defaults to NullPool, which reopens the file on every request
+            from sqlalchemy.pool import AsyncAdaptedQueuePool
+            options["poolclass"] = AsyncAdaptedQueuePool
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+def apply_sqlite_profile(engine: Engine, settings: Settings, read_only: bool = False) -> None:
+    """Tune every new SQLite connection: WAL so readers don't block behind writers, and friends"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    
+    # pysqlite begins transactions lazily and on its own terms, which breaks SAVEPOINTs
+    # (releasing one can commit the whole unit of work). Take over: the driver never
+    # issues BEGIN itself and SQLAlchemy emits it when a transaction actually starts.
+    @event.listens_for(engine, "checkout")
+    def disable_driver_transactions(dbapi_connection, connection_record, connection_proxy):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def begin_transaction(conn):
+        options = conn.get_execution_options()
+        if options.get("isolation_level") != "AUTOCOMMIT":
+            conn.exec_driver_sql("BEGIN IMMEDIATE" if options.get(BEGIN_IMMEDIATE) else "BEGIN")
+
+def for_writes(bind):
+    """The engine as used by read-write sessions: on SQLite their transactions take the write lock up front"""
+    # A deferred transaction that reads before it writes cannot wait for the write lock:
+    # once another writer commits, SQLite fails the upgrade at once with "database is locked".
+    # BEGIN IMMEDIATE waits for the lock (up to busy_timeout) instead. Ignored off SQLite.
+    return bind.execution_options(**{BEGIN_IMMEDIATE: True})
+
+def create_db_engine(url: str, settings: Settings, read_only: bool = False) -> Engine:
+    """Create a configured engine; read-only engines refuse writes at the connection level"""
+    options = engine_options(url, settings)
+    if read_only and make_url(url).get_backend_name() == "postgresql":
+        options.setdefault("connect_args", {})["options"] = "-c default_transaction_read_only=on"
+    db_engine = create_engine(url, **options)
+    if is_sqlite(url):
+        apply_sqlite_profile(db_engine, settings, read_only)
+    return db_engine
+
+engine = create_db_engine(DATABASE_URL, settings)
+# Rows returned by INSERT/UPDATE ... RETURNING stay loaded after commit instead of being re-SELECTed
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=for_writes(engine))
+
+# GET routes read through a separate engine (and pool) when DATABASE_READ_URL is set
+read_engine = create_db_engine(settings.database_read_url, settings, read_only=True) if settings.database_read_url else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def instrument_queries() -> None:
+    """Count queries, SQL time and hydrated ORM rows into the current request's stats"""
+    # Registered on the Engine class, so the read engine and async engines are covered too
+    @event.listens_for(Engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if current_request_stats.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @event.listens_for(Engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request_stats.get()
+        started = conn.info.get("query_started")
+        if stats is not None and started:
+            stats.record_query(statement, time.perf_counter() - started.pop())
+    
+    @event.listens_for(Base, "load", propagate=True)
+    def count_hydrated_row(target, context):
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.rows_hydrated += 1
+
+if settings.metrics_enabled:
+    instrument_queries()
+
+# Created on first use so the async driver is only required in async mode
+async_engines = {}
+async_sessionmakers = {}
+
+def dispose_after_fork() -> None:
+    """In a forked worker: start with empty pools instead of sharing the parent's connections"""
+    # close=False leaves the inherited sockets/file handles to the parent that opened them
+    for db_engine in {engine, read_engine}:
+        db_engine.dispose(close=False)
+    for async_engine in async_engines.values():
+        async_engine.sync_engine.dispose(close=False)
+    # Async engines bind to the event loop they first ran on; workers create their own
+    async_engines.clear()
+    async_sessionmakers.clear()
+
 def get_db():
     """Database dependency for FastAPI"""
     db = SessionLocal()
@@ -17,9 +146,55 @@ def get_db():
     finally:
         db.close()
 
-def create_tables():
-    """Create all tables - drops existing ones to handle schema changes"""
-    # For development, we'll drop and recreate tables to handle schema changes
-    # In production, you'd use Alembic migrations instead
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+def get_read_db():
+    """Database dependency for FastAPI read-only routes"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return f"{ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+def get_async_engine(read_only: bool = False):
+    """Create the async engine on first use; reads share the primary engine without DATABASE_READ_URL"""
+    read_only = read_only and bool(settings.database_read_url)
+    if read_only not in async_engines:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = settings.database_read_url if read_only else DATABASE_URL
+        options = engine_options(url, settings, is_async=True)
+        if read_only and make_url(url).get_backend_name() == "postgresql":
+            options["connect_args"] = {"server_settings": {"default_transaction_read_only": "on"}}
+        async_engine = create_async_engine(to_async_url(url), **options)
+        if is_sqlite(url):
+            apply_sqlite_profile(async_engine.sync_engine, settings, read_only)
+        async_engines[read_only] = async_engine
+    return async_engines[read_only]
+
+def get_async_sessionmaker(read_only: bool = False):
+    """Create the async session factory on first use"""
+    if read_only not in async_sessionmakers:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        async_engine = get_async_engine(read_only)
+        bind = async_engine if read_only else for_writes(async_engine)
+        # Objects stay readable after commit without lazy IO outside the event loop
+        async_sessionmakers[read_only] = async_sessionmaker(bind, autoflush=False, expire_on_commit=False)
+    return async_sessionmakers[read_only]
+
+async def get_async_db():
+    """Async database dependency for FastAPI"""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def get_async_read_db():
+    """Async database dependency for FastAPI read-only routes"""
+    async with get_async_sessionmaker(read_only=True)() as db:
+        yield db
@@ -0,0 +1,57 @@
+"""Per-request database and serialization counters.
+
+The profiling middleware puts a RequestStats in `current_request_stats` for each
+request; the engine and ORM hooks in database.connection add to it. Context
+variables follow the request into the threadpool and the async driver's greenlets.
+"""
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+SLOWEST_KEPT = 5
+
+class RequestStats:
+    """What one request spent on SQL, ORM hydration and serialization"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.rows_hydrated = 0
+        self.serialize_seconds = 0.0
+        self.endpoint_finished: Optional[float] = None
+        self._slowest: List[Tuple[float, int, str]] = []
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.query_count += 1
+        self.sql_seconds += seconds
+        # Min-heap of the slowest few; the counter breaks ties without comparing statements
+        entry = (seconds, self.query_count, statement)
+        if len(self._slowest) < SLOWEST_KEPT:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest_statements(self) -> List[Tuple[float, str]]:
+        """(seconds, statement) of the slowest queries, slowest first"""
+        return [(seconds, statement) for seconds, _, statement in sorted(self._slowest, reverse=True)]
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+def mark_endpoint_finished() -> None:
+    """Everything between here and the response start is response validation and encoding"""
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.endpoint_finished = time.perf_counter()
+
+@contextmanager
+def serialization_timer() -> Iterator[None]:
+    """Count the enclosed block as serialization time of the current request"""
+    stats = current_request_stats.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - started
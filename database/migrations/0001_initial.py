@@ -0,0 +1,36 @@
+"""Initial schema: users and tasks with their lookup and keyset pagination indexes"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+from database.migrations.ops import create_index
+
+transactional = True
+
+def upgrade(conn):
+    # Snapshot of the schema at this version - never import the live models here
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("username", String(50), nullable=False),
+        Column("email", String(100), nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    )
+    Table(
+        "tasks", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("title", String(100), nullable=False),
+        Column("description", String(500), nullable=True),
+        Column("is_completed", Boolean),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    )
+    # checkfirst adopts databases created by the old create_all() startup
+    metadata.create_all(conn, checkfirst=True)
+    
+    create_index(conn, "ix_users_id", "users", ["id"])
+    create_index(conn, "ix_users_username", "users", ["username"], unique=True)
+    create_index(conn, "ix_users_email", "users", ["email"], unique=True)
+    create_index(conn, "ix_tasks_id", "tasks", ["id"])
+    create_index(conn, "ix_tasks_created_at_id", "tasks", ["created_at", "id"])
+    create_index(conn, "ix_tasks_user_id_created_at_id", "tasks", ["user_id", "created_at", "id"])
+    create_index(conn, "ix_tasks_is_completed_created_at_id", "tasks", ["is_completed", "created_at", "id"])
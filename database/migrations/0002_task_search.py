@@ -0,0 +1,39 @@
+"""Full-text search over task title and description"""
+from sqlalchemy import text
+from database.migrations.ops import supports_concurrent_index
+
+# Builds the Postgres GIN index CONCURRENTLY; the SQLite statements are transactional anyway
+transactional = False
+
+SQLITE_STATEMENTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    # Index the tasks that already exist
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+]
+
+def upgrade(conn):
+    # Snapshot of database/search.py at this version
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_STATEMENTS:
+            conn.execute(text(statement))
+    elif conn.dialect.name == "postgresql":
+        concurrently = " CONCURRENTLY" if supports_concurrent_index(conn) else ""
+        conn.execute(text(
+            f"CREATE INDEX{concurrently} IF NOT EXISTS ix_tasks_search ON tasks USING gin "
+            "(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')))"
+        ))
@@ -0,0 +1,22 @@
+"""Per-user task counters behind the stats endpoints"""
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table, text
+
+transactional = True
+
+def upgrade(conn):
+    # Snapshot of the schema at this version - never import the live models here
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "user_task_stats", metadata,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("task_count", Integer, nullable=False),
+        Column("completed_count", Integer, nullable=False),
+    )
+    metadata.tables["user_task_stats"].create(conn, checkfirst=True)
+    
+    # Backfill from the tasks that already exist
+    conn.execute(text(
+        "INSERT INTO user_task_stats (user_id, task_count, completed_count) "
+        "SELECT user_id, COUNT(id), SUM(CASE WHEN is_completed THEN 1 ELSE 0 END) FROM tasks GROUP BY user_id"
+    ))
@@ -0,0 +1,17 @@
+"""updated_at on users and tasks, and a per-user version stamp for conditional GETs"""
+from sqlalchemy import Column, DateTime, Integer, text
+from database.migrations.ops import add_column
+
+transactional = True
+
+def upgrade(conn):
+    # Snapshot of the columns at this version - never import the live models here
+    add_column(conn, "users", Column("updated_at", DateTime(timezone=True)))
+    add_column(conn, "tasks", Column("updated_at", DateTime(timezone=True)))
+    add_column(conn, "user_task_stats", Column("version", Integer, nullable=False, server_default=text("0")))
+    add_column(conn, "user_task_stats", Column("updated_at", DateTime(timezone=True)))
+    
+    # Best known values for existing rows: creation time, and "now" for the counters
+    conn.execute(text("UPDATE users SET updated_at = created_at"))
+    conn.execute(text("UPDATE tasks SET updated_at = created_at"))
+    conn.execute(text("UPDATE user_task_stats SET version = 1, updated_at = CURRENT_TIMESTAMP"))
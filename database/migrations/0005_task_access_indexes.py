@@ -0,0 +1,16 @@
+"""Indexes for a user's open/completed tasks, and a covering index for task listings"""
+from database.migrations.ops import create_index, drop_index
+
+# Builds the Postgres indexes CONCURRENTLY
+transactional = False
+
+def upgrade(conn):
+    create_index(
+        conn, "ix_tasks_user_id_is_completed_created_at_id", "tasks", ["user_id", "is_completed", "created_at", "id"]
+    )
+    # Replaces ix_tasks_user_id_created_at_id; built before the old one goes so listings always have an index
+    create_index(
+        conn, "ix_tasks_user_id_created_at_id_covering", "tasks", ["user_id", "created_at", "id"],
+        include=["is_completed", "title", "description"],
+    )
+    drop_index(conn, "ix_tasks_user_id_created_at_id")
@@ -0,0 +1,25 @@
+"""Cold storage for completed tasks moved out of the hot tasks table"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from database.migrations.ops import create_index
+
+transactional = True
+
+def upgrade(conn):
+    # Snapshot of the schema at this version - never import the live models here
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "tasks_archive", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("title", String(100), nullable=False),
+        Column("description", String(500), nullable=True),
+        Column("is_completed", Boolean, nullable=False),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("created_at", DateTime(timezone=True)),
+        Column("updated_at", DateTime(timezone=True)),
+        Column("archived_at", DateTime(timezone=True), nullable=False),
+    )
+    metadata.tables["tasks_archive"].create(conn, checkfirst=True)
+    
+    create_index(conn, "ix_tasks_archive_user_id_created_at_id", "tasks_archive", ["user_id", "created_at", "id"])
+    create_index(conn, "ix_tasks_archive_created_at_id", "tasks_archive", ["created_at", "id"])
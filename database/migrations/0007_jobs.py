@@ -0,0 +1,30 @@
+"""Background jobs queued by requests and run by worker threads"""
+from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, String, Table, Text
+from database.migrations.ops import create_index
+
+transactional = True
+
+def upgrade(conn):
+    # Snapshot of the schema at this version - never import the live models here
+    metadata = MetaData()
+    Table(
+        "jobs", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("type", String(50), nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("payload", JSON, nullable=False),
+        Column("progress", Integer, nullable=False),
+        Column("total", Integer, nullable=True),
+        Column("result", JSON, nullable=True),
+        Column("error", Text, nullable=True),
+        Column("attempts", Integer, nullable=False),
+        Column("max_attempts", Integer, nullable=False),
+        Column("run_after", DateTime(timezone=True), nullable=False),
+        Column("worker", String(100), nullable=True),
+        Column("created_at", DateTime(timezone=True)),
+        Column("updated_at", DateTime(timezone=True)),
+        Column("finished_at", DateTime(timezone=True), nullable=True),
+    )
+    metadata.tables["jobs"].create(conn, checkfirst=True)
+    
+    create_index(conn, "ix_jobs_status_run_after_id", "jobs", ["status", "run_after", "id"])
@@ -0,0 +1,33 @@
+"""Never reuse task IDs: SQLite hands out max(id) + 1 unless the table is AUTOINCREMENT.
+
+Archived and deleted tasks leave the tasks table, so without it their IDs came back for new
+tasks. Postgres draws IDs from a sequence, which never goes back, so only SQLite changes.
+"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+from database.migrations.ops import rebuild_sqlite_table, start_sqlite_sequence
+
+transactional = True
+
+def upgrade(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    # Snapshot of the schema at this version - never import the live models here
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    rebuilt = Table(
+        "tasks_rebuilt", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("title", String(100), nullable=False),
+        Column("description", String(500), nullable=True),
+        Column("is_completed", Boolean),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+        sqlite_autoincrement=True,
+    )
+    # AUTOINCREMENT can't be added in place. Row IDs are copied as they are, so the search index
+    # still points at the right tasks
+    rebuild_sqlite_table(conn, "tasks", rebuilt)
+    # Start above every ID handed out so far that is still known, archived ones included
+    start_sqlite_sequence(conn, "tasks", "SELECT MAX(id) FROM tasks", "SELECT MAX(id) FROM tasks_archive")
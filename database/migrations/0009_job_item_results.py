@@ -0,0 +1,17 @@
+"""Per-item results of bulk import jobs, written chunk by chunk instead of rewriting the job's result"""
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table, Text
+
+transactional = True
+
+def upgrade(conn):
+    # Snapshot of the schema at this version - never import the live models here
+    metadata = MetaData()
+    Table("jobs", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "job_item_results", metadata,
+        Column("job_id", Integer, ForeignKey("jobs.id"), primary_key=True),
+        Column("item_index", Integer, primary_key=True),
+        Column("task_id", Integer, nullable=True),
+        Column("error", Text, nullable=True),
+    )
+    metadata.tables["job_item_results"].create(conn, checkfirst=True)
@@ -0,0 +1,34 @@
+"""Never reuse user IDs, now that users can be deleted: SQLite AUTOINCREMENT, as 0008 did for tasks.
+
+A reused ID would inherit the deleted user's URLs, and with them clients' cached validators.
+Postgres draws IDs from a sequence, which never goes back, so only SQLite changes.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+from database.migrations.ops import rebuild_sqlite_table, start_sqlite_sequence
+
+transactional = True
+
+def upgrade(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    # Snapshot of the schema at this version - never import the live models here
+    rebuilt = Table(
+        "users_rebuilt", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("username", String(50), nullable=False),
+        Column("email", String(100), nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+        sqlite_autoincrement=True,
+    )
+    # SQLite doesn't enforce the foreign keys pointing at users here, and they refer to it by name,
+    # so they follow the rebuilt table
+    rebuild_sqlite_table(conn, "users", rebuilt)
+    start_sqlite_sequence(
+        conn, "users",
+        "SELECT MAX(id) FROM users",
+        "SELECT MAX(user_id) FROM tasks",
+        "SELECT MAX(user_id) FROM tasks_archive",
+        "SELECT MAX(user_id) FROM user_task_stats",
+    )
@@ -0,0 +1,26 @@
+"""Rewrite second-precision SQLite timestamps in the microsecond form the app writes.
+
+Rows from the old server default (CURRENT_TIMESTAMP, 'YYYY-MM-DD HH:MM:SS') sort before their
+own second in the stored 'YYYY-MM-DD HH:MM:SS.ffffff' form, so keyset cursors, which compare
+on created_at, skipped them. Postgres stores real timestamps, so only SQLite changes.
+"""
+from sqlalchemy import text
+
+transactional = True
+
+# Every timestamp column written by a server default or copied from one by an earlier migration
+COLUMNS = [
+    ("users", "created_at"),
+    ("users", "updated_at"),
+    ("tasks", "created_at"),
+    ("tasks", "updated_at"),
+    ("tasks_archive", "created_at"),
+    ("tasks_archive", "updated_at"),
+    ("user_task_stats", "updated_at"),
+]
+
+def upgrade(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    for table, column in COLUMNS:
+        conn.execute(text(f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19"))
@@ -0,0 +1,130 @@
+"""Versioned schema migrations.
+
+Each migration is a module in this package named `<version>_<name>.py` with an
+`upgrade(conn)` function and a `transactional` flag. Migrations that build
+Postgres indexes CONCURRENTLY must set `transactional = False`.
+"""
+import importlib
+import pkgutil
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Set
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import func
+
+MIGRATION_MODULE = re.compile(r"^(\d{4})_(\w+)$")
+
+# Arbitrary key identifying this application's migration lock in pg_advisory_lock
+POSTGRES_LOCK_KEY = 7_318_200_601
+LOCK_TIMEOUT_SECONDS = 60
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", String(4), primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    module: object
+
+def load_migrations() -> List[Migration]:
+    """Discover migration modules in version order"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = MIGRATION_MODULE.match(module_info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append(Migration(match.group(1), match.group(2), module))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+def applied_versions(conn: Connection) -> Set[str]:
+    """Versions already recorded in schema_migrations"""
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.scalars(select(schema_migrations.c.version)))
+
+def pending_migrations(conn: Connection) -> List[Migration]:
+    """Migrations not yet applied to this database"""
+    applied = applied_versions(conn)
+    return [migration for migration in load_migrations() if migration.version not in applied]
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply pending migrations under a lock; returns the applied versions (empty when current)"""
+    # Fast path: a current schema costs one read and no lock
+    with engine.connect() as conn:
+        if not pending_migrations(conn):
+            return []
+
+    if engine.dialect.name == "sqlite":
+        return _run_sqlite(engine)
+    return _run_locked(engine)
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+
+def _run_sqlite(engine: Engine) -> List[str]:
+    """SQLite: BEGIN IMMEDIATE takes the database write lock, so concurrent workers queue behind it"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        _begin_immediate(conn)
+        try:
+            schema_migrations.create(conn, checkfirst=True)
+            # Re-check under the lock: another worker may have just finished
+            pending = pending_migrations(conn)
+            for migration in pending:
+                # SQLite DDL is transactional, so every migration commits or rolls back together
+                migration.module.upgrade(conn)
+                _record(conn, migration)
+            conn.execute(text("COMMIT"))
+        except BaseException:
+            conn.execute(text("ROLLBACK"))
+            raise
+    return [migration.version for migration in pending]
+
+def _begin_immediate(conn: Connection) -> None:
+    deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+    while True:
+        try:
+            conn.execute(text("BEGIN IMMEDIATE"))
+            return
+        except OperationalError as e:
+            if "locked" not in str(e) or time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+@contextmanager
+def _advisory_lock(engine: Engine) -> Iterator[None]:
+    """Postgres: a session-level advisory lock held on its own connection for the whole run"""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": POSTGRES_LOCK_KEY})
+        try:
+            yield
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": POSTGRES_LOCK_KEY})
+
+def _run_locked(engine: Engine) -> List[str]:
+    applied = []
+    with _advisory_lock(engine):
+        with engine.begin() as conn:
+            schema_migrations.create(conn, checkfirst=True)
+            pending = pending_migrations(conn)
+        for migration in pending:
+            if getattr(migration.module, "transactional", True):
+                with engine.begin() as conn:
+                    migration.module.upgrade(conn)
+                    _record(conn, migration)
+            else:
+                # e.g. CREATE INDEX CONCURRENTLY, which refuses to run inside a transaction
+                with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    migration.module.upgrade(conn)
+                    _record(conn, migration)
+            applied.append(migration.version)
+    return applied
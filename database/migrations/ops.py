@@ -0,0 +1,56 @@
+from typing import Sequence
+from sqlalchemy import Column, Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+def supports_concurrent_index(conn: Connection) -> bool:
+    """Postgres can build indexes without blocking writes, but only outside a transaction"""
+    return conn.dialect.name == "postgresql" and conn.get_isolation_level() == "AUTOCOMMIT"
+
+def create_index(
+    conn: Connection, name: str, table: str, columns: Sequence[str], unique: bool = False, include: Sequence[str] = ()
+) -> None:
+    """Create an index if missing, concurrently where the backend supports it.
+
+    `include` adds non-key columns on Postgres (a covering index); other backends only index `columns`.
+    """
+    concurrently = " CONCURRENTLY" if supports_concurrent_index(conn) else ""
+    unique_sql = "UNIQUE " if unique else ""
+    include_sql = f" INCLUDE ({', '.join(include)})" if include and conn.dialect.name == "postgresql" else ""
+    conn.execute(text(
+        f"CREATE {unique_sql}INDEX{concurrently} IF NOT EXISTS {name} ON {table} ({', '.join(columns)}){include_sql}"
+    ))
+
+def drop_index(conn: Connection, name: str) -> None:
+    """Drop an index if present, concurrently where the backend supports it"""
+    concurrently = " CONCURRENTLY" if supports_concurrent_index(conn) else ""
+    conn.execute(text(f"DROP INDEX{concurrently} IF EXISTS {name}"))
+
+def add_column(conn: Connection, table: str, column: Column) -> None:
+    """Add a column if missing; NOT NULL columns need a constant server_default"""
+    if column.name in {existing["name"] for existing in inspect(conn).get_columns(table)}:
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}"))
+
+def rebuild_sqlite_table(conn: Connection, name: str, rebuilt: Table) -> None:
+    """Replace SQLite table `name` with `rebuilt` (same columns, new table options), copying its rows.
+
+    For changes SQLite can't make in place, such as AUTOINCREMENT. The table's indexes and
+    triggers are recreated exactly as earlier migrations left them; row IDs are kept.
+    """
+    dependents = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = :name AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ), {"name": name}).scalars().all()
+    rebuilt.create(conn)
+    columns = ", ".join(column.name for column in rebuilt.columns)
+    conn.execute(text(f"INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
+    conn.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {name}"))
+    for statement in dependents:
+        conn.execute(text(statement))
+
+def start_sqlite_sequence(conn: Connection, table: str, *max_id_queries: str) -> None:
+    """Make an AUTOINCREMENT table's next ID exceed every ID the given `SELECT MAX(...)` queries return"""
+    floor = ", ".join(f"COALESCE(({query}), 0)" for query in max_id_queries)
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :table"), {"table": table})
+    conn.execute(text(f"INSERT INTO sqlite_sequence (name, seq) SELECT :table, MAX({floor}, 0)"), {"table": table})
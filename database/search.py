@@ -0,0 +1,46 @@
+"""Full-text index over task title and description.
+
+SQLite keeps an FTS5 external-content table in sync with `tasks` through triggers;
+Postgres uses a GIN index on a tsvector expression, so there is nothing to keep in sync.
+Other databases have no index; TaskRepository.search_tasks falls back to LIKE there.
+"""
+from sqlalchemy import DDL, Table, event
+
+SEARCH_TABLE = "tasks_fts"
+
+# Postgres search document; queries must repeat this exact expression to use the GIN index
+POSTGRES_SEARCH_VECTOR = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+SQLITE_CREATE = [
+    # prefix='2 3' adds prefix indexes so "buy mi*" doesn't scan every term
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, description, content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    # Only text changes touch the index; completing a task does not
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+SQLITE_DROP = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+POSTGRES_CREATE = [f"CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING gin ({POSTGRES_SEARCH_VECTOR})"]
+
+def attach_search_index(tasks: Table) -> None:
+    """Create and drop the search index together with the tasks table (create_all / drop_all)"""
+    for statement in SQLITE_CREATE:
+        event.listen(tasks, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_CREATE:
+        event.listen(tasks, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    # The triggers go with the table, but the FTS table would outlive it
+    for statement in SQLITE_DROP:
+        event.listen(tasks, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
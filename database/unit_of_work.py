@@ -0,0 +1,50 @@
+import logging
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+AFTER_COMMIT_KEY = "after_commit_callbacks"
+
+logger = logging.getLogger(__name__)
+
+class UnitOfWork:
+    """Owns a Session's transaction: repositories only flush, the unit of work commits once"""
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def __enter__(self) -> "UnitOfWork":
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+    
+    def commit(self) -> None:
+        """Commit everything flushed so far; after-commit callbacks then run"""
+        self.session.commit()
+    
+    def rollback(self) -> None:
+        """Discard everything since the last commit"""
+        self.session.rollback()
+
+def after_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Run `callback` once the session's current transaction commits (dropped on rollback)"""
+    session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session: Session) -> None:
+    # The data is committed by now: a failing callback (say, a publish to an unreachable Redis) is
+    # logged, and neither fails the request nor keeps the callbacks after it (cache invalidation) from running
+    for callback in session.info.pop(AFTER_COMMIT_KEY, []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("After-commit callback %r failed", callback)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_after_commit_callbacks(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(AFTER_COMMIT_KEY, None)
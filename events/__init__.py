@@ -0,0 +1,24 @@
+from functools import lru_cache
+from config import get_settings
+from events.broker import RESET, SUBSCRIBED, Event, EventBroker, MemoryBroker, NullBroker, RedisBroker
+from events.publisher import ChangePublisher
+
+@lru_cache()
+def get_broker() -> EventBroker:
+    """The process-wide change feed broker configured by EVENTS_BACKEND (memory, redis or none)"""
+    settings = get_settings()
+    options = {"buffer_size": settings.events_buffer_size, "heartbeat_seconds": settings.events_heartbeat_seconds}
+    if settings.events_backend == "redis":
+        import redis
+        import redis.asyncio
+
+        return RedisBroker(
+            redis.Redis.from_url(settings.redis_url),
+            redis.asyncio.Redis.from_url(settings.redis_url),
+            stream=settings.events_stream,
+            max_length=settings.events_stream_max_length,
+            **options,
+        )
+    if settings.events_backend == "memory":
+        return MemoryBroker(**options)
+    return NullBroker(**options)
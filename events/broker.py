@@ -0,0 +1,328 @@
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Event IDs are "<int>-<int>": Redis stream IDs, or "<process start ms>-<sequence>" in memory
+EventKey = Tuple[int, int]
+
+# Sent instead of events the subscriber can no longer be given; it must reload and carry on from its ID
+RESET = "reset"
+# First event of a fresh subscription: its ID is where the feed starts, for resuming before any change
+SUBSCRIBED = "subscribed"
+
+class Event(NamedTuple):
+    id: str
+    type: str
+    user_id: Optional[int]
+    data: dict
+
+    @property
+    def key(self) -> EventKey:
+        return parse_event_id(self.id)
+
+def parse_event_id(event_id: str) -> EventKey:
+    """Order key of an event ID; ValueError if malformed"""
+    first, _, second = event_id.partition("-")
+    return int(first), int(second or 0)
+
+def format_event_id(key: EventKey) -> str:
+    return f"{key[0]}-{key[1]}"
+
+class EventBroker:
+    """Fan-out of task change events to subscribers on this process, with a replay buffer for resuming.
+
+    Backends only differ in how published events reach `_append`: directly (memory), or through
+    a shared log every worker tails (Redis). Publishing is thread-safe and never blocks on subscribers;
+    each subscriber keeps its own position in the buffer, so a slow one only ever falls behind itself.
+    """
+
+    def __init__(self, buffer_size: int = 10000, heartbeat_seconds: float = 15):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.published = 0
+        self.resets = 0
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._keys: Deque[EventKey] = deque(maxlen=buffer_size)
+        # Key of the newest event dropped from the buffer: resuming from before it leaves a gap
+        self._evicted_through: Optional[EventKey] = None
+        self._lock = threading.Lock()
+        # One wake-up per event loop, swapped for a fresh one on every append
+        self._wakeups: Dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+        self._subscribers = 0
+
+    def publish(self, changes: Iterable[Tuple[str, int, dict]]) -> None:
+        """Publish (type, user_id, data) changes, in order"""
+        raise NotImplementedError
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything published so far has been sent; False on timeout"""
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {"published": self.published, "resets": self.resets, "subscribers": self._subscribers, "buffered": len(self._buffer)}
+
+    async def listen(self, user_id: Optional[int] = None, after: Optional[str] = None) -> AsyncIterator[Optional[Event]]:
+        """Yield events newer than `after` (or from now on), optionally only one user's.
+
+        A fresh subscription starts with a SUBSCRIBED event. Yields None after `heartbeat_seconds`
+        without events, so callers can keep idle connections alive.
+        """
+        self._subscribers += 1
+        try:
+            await self._start()
+            if after is None:
+                position = self._tail()
+                yield Event(format_event_id(position), SUBSCRIBED, None, {})
+            else:
+                position, replayed = await self._resume(after)
+                for event in replayed:
+                    if user_id is None or event.user_id in (user_id, None):  # resets go to everyone
+                        yield event
+
+            while True:
+                waiter = self._waiter()
+                events, lagged = self._read_after(position)
+                if lagged:
+                    self.resets += 1
+                    position = self._tail()
+                    yield self._reset(position)
+                    continue
+                if not events:
+                    try:
+                        await asyncio.wait_for(waiter.wait(), self.heartbeat_seconds)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                position = events[-1].key
+                for event in events:
+                    if user_id is None or event.user_id == user_id:
+                        yield event
+        finally:
+            self._subscribers -= 1
+
+    async def _start(self) -> None:
+        """Make sure published events are flowing into the buffer"""
+
+    async def _replay(self, after: EventKey) -> Optional[List[Event]]:
+        """Events after `after` that are no longer buffered; None if they can't be recovered"""
+        return None
+
+    async def _resume(self, after: str) -> Tuple[EventKey, List[Event]]:
+        """Position to continue from and any events to replay first; a reset if `after` can't be honoured"""
+        try:
+            key = parse_event_id(after)
+        except ValueError:
+            key = None
+        if key is not None:
+            with self._lock:
+                buffered = bool(self._keys) and self._keys[0] <= key <= self._keys[-1]
+                evicted_through = self._evicted_through
+            if buffered or (evicted_through is not None and key == evicted_through):
+                return key, []
+            replayed = await self._replay(key)
+            if replayed is not None:
+                return (replayed[-1].key if replayed else key), replayed
+        self.resets += 1
+        position = self._tail()
+        return position, [self._reset(position)]
+
+    def _reset(self, position: EventKey) -> Event:
+        return Event(format_event_id(position), RESET, None, {})
+
+    def _tail(self) -> EventKey:
+        with self._lock:
+            if self._keys:
+                return self._keys[-1]
+            return self._evicted_through or self._origin()
+
+    def _origin(self) -> EventKey:
+        """Position before the first event"""
+        return (0, 0)
+
+    def _read_after(self, position: EventKey) -> Tuple[List[Event], bool]:
+        """Buffered events after `position`, and whether some were already evicted"""
+        with self._lock:
+            if self._evicted_through is not None and position < self._evicted_through:
+                return [], True
+            start = bisect.bisect_right(self._keys, position)
+            return list(itertools.islice(self._buffer, start, None)), False
+
+    def _append(self, events: List[Event]) -> None:
+        """Buffer events and wake every subscriber"""
+        if not events:
+            return
+        with self._lock:
+            for event in events:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self._evicted_through = self._keys[0]
+                self._buffer.append(event)
+                self._keys.append(event.key)
+            self.published += len(events)
+            loops = list(self._wakeups)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:  # loop closed
+                self._wakeups.pop(loop, None)
+
+    def _waiter(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        waiter = self._wakeups.get(loop)
+        if waiter is None:
+            waiter = self._wakeups[loop] = asyncio.Event()
+        return waiter
+
+    def _wake(self, loop: asyncio.AbstractEventLoop) -> None:
+        waiter = self._wakeups.get(loop)
+        self._wakeups[loop] = asyncio.Event()
+        if waiter is not None:
+            waiter.set()
+
+class NullBroker(EventBroker):
+    """Change feed disabled: publishing is a no-op and subscribers only ever get heartbeats"""
+
+    def publish(self, changes: Iterable[Tuple[str, int, dict]]) -> None:
+        pass
+
+class MemoryBroker(EventBroker):
+    """Single-process broker; IDs restart with the process, so resuming across restarts resets"""
+
+    def __init__(self, buffer_size: int = 10000, heartbeat_seconds: float = 15):
+        super().__init__(buffer_size, heartbeat_seconds)
+        self._epoch = int(time.time() * 1000)
+        self._sequence = itertools.count(1)
+        self._publish_lock = threading.Lock()
+
+    def publish(self, changes: Iterable[Tuple[str, int, dict]]) -> None:
+        # IDs are assigned and appended under one lock, so the buffer stays in ID order
+        with self._publish_lock:
+            self._append([
+                Event(format_event_id((self._epoch, next(self._sequence))), event_type, user_id, data)
+                for event_type, user_id, data in changes
+            ])
+
+    async def _replay(self, after: EventKey) -> Optional[List[Event]]:
+        # Only this process's own IDs, and only while nothing after them has been evicted
+        if after[0] == self._epoch and self._evicted_through is None and after <= self._tail():
+            return []
+        return None
+
+    def _origin(self) -> EventKey:
+        return (self._epoch, 0)
+
+class RedisBroker(EventBroker):
+    """Broker shared by all workers through a Redis stream; each process tails it into its own buffer"""
+
+    def __init__(self, client, async_client, stream: str = "task_tracker:events", max_length: int = 100000,
+                 buffer_size: int = 10000, heartbeat_seconds: float = 15):
+        super().__init__(buffer_size, heartbeat_seconds)
+        self.client = client
+        self.async_client = async_client
+        self.stream = stream
+        self.max_length = max_length
+        self._tailing: Optional[asyncio.Task] = None
+        self._outbox: "queue.Queue[List[Tuple[str, int, dict]]]" = queue.Queue()
+        self._sender: Optional[threading.Thread] = None
+        self._sender_lock = threading.Lock()
+
+    def publish(self, changes: Iterable[Tuple[str, int, dict]]) -> None:
+        # Called from after-commit hooks, in async mode on the event loop: the blocking XADD round trip
+        # happens on a sender thread instead; one thread, so events still reach the stream in order
+        self._outbox.put(list(changes))
+        if self._sender is None:
+            with self._sender_lock:
+                if self._sender is None:
+                    self._sender = threading.Thread(target=self._send_forever, name="event-publisher", daemon=True)
+                    self._sender.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._outbox.all_tasks_done:
+            while self._outbox.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._outbox.all_tasks_done.wait(remaining)
+        return True
+
+    def _send_forever(self) -> None:
+        while True:
+            batches = [self._outbox.get()]
+            # Whatever queued up meanwhile goes out in the same pipeline
+            while True:
+                try:
+                    batches.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                pipeline = self.client.pipeline(transaction=False)
+                for changes in batches:
+                    for event_type, user_id, data in changes:
+                        fields = {"type": event_type, "user_id": user_id, "data": json.dumps(data)}
+                        pipeline.xadd(self.stream, fields, maxlen=self.max_length, approximate=True)
+                pipeline.execute()
+            except Exception:
+                logger.exception("Publishing %d change event batch(es) failed", len(batches))
+            finally:
+                for _ in batches:
+                    self._outbox.task_done()
+
+    async def _start(self) -> None:
+        if self._tailing is not None and not self._tailing.done():
+            return
+        # Tail from the current end: anything older comes from _replay, so nothing falls in between
+        newest = await self.async_client.xrevrange(self.stream, count=1)
+        start = self._decode(newest[0]).id if newest else "0-0"
+        if self._tailing is None or self._tailing.done():
+            self._tailing = asyncio.get_running_loop().create_task(self._tail_stream(start))
+
+    async def _tail_stream(self, last_id: str) -> None:
+        while True:
+            try:
+                response = await self.async_client.xread(
+                    {self.stream: last_id}, count=1000, block=int(self.heartbeat_seconds * 1000)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reading the event stream failed; retrying")
+                await asyncio.sleep(1)
+                continue
+            for _, entries in response or ():
+                events = [self._decode(entry) for entry in entries]
+                if events:
+                    last_id = events[-1].id
+                    self._append(events)
+
+    async def _replay(self, after: EventKey) -> Optional[List[Event]]:
+        try:
+            info = await self.async_client.xinfo_stream(self.stream)
+        except Exception:  # no stream yet
+            return None
+        # Trimmed past `after` (Redis 7+ reports the newest trimmed ID): the gap can't be replayed
+        trimmed = info.get("max-deleted-entry-id")
+        if trimmed and after < parse_event_id(_text(trimmed)):
+            return None
+        limit = self._buffer.maxlen
+        entries = await self.async_client.xrange(self.stream, min=f"({format_event_id(after)}", count=limit + 1)
+        if len(entries) > limit:
+            return None
+        return [self._decode(entry) for entry in entries]
+
+    def _decode(self, entry) -> Event:
+        entry_id, fields = entry
+        fields = {_text(name): _text(value) for name, value in fields.items()}
+        user_id = fields.get("user_id")
+        return Event(_text(entry_id), fields["type"], int(user_id) if user_id else None, json.loads(fields["data"]))
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
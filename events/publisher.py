@@ -0,0 +1,22 @@
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+from database.unit_of_work import after_commit
+from events.broker import EventBroker
+
+TASK_CREATED = "task.created"
+TASK_COMPLETED = "task.completed"
+TASK_DELETED = "task.deleted"
+# Moved to the archive: gone from live task lists, still readable with include_archived
+TASK_ARCHIVED = "task.archived"
+
+class ChangePublisher:
+    """Hands change events to the broker once the session's transaction commits; dropped on rollback"""
+    
+    def __init__(self, db: Session, broker: EventBroker):
+        self.db = db
+        self.broker = broker
+    
+    def publish(self, changes: List[Tuple[str, int, dict]]) -> None:
+        """Publish (type, user_id, data) changes after commit, so subscribers never see uncommitted writes"""
+        if changes:
+            after_commit(self.db, lambda: self.broker.publish(changes))
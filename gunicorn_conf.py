@@ -0,0 +1,78 @@
+"""Multi-process serving: gunicorn_conf.py for `gunicorn -c gunicorn_conf.py main:app`.
+
+The master applies migrations once and (with PRELOAD_APP) imports the app once; every worker
+then drops the pooled connections and client singletons it inherited, so nothing that holds
+a socket or file handle is shared across processes.
+"""
+import logging
+import os
+from uvicorn.workers import UvicornWorker
+from config import get_settings
+
+settings = get_settings()
+
+class ConfiguredUvicornWorker(UvicornWorker):
+    """Uvicorn worker with the HTTP parser and event loop chosen by HTTP_PROTOCOL and EVENT_LOOP"""
+    CONFIG_KWARGS = {"loop": settings.event_loop, "http": settings.http_protocol}
+
+bind = settings.bind
+workers = settings.workers
+worker_class = "gunicorn_conf.ConfiguredUvicornWorker"
+preload_app = settings.preload_app
+timeout = settings.worker_timeout
+graceful_timeout = settings.graceful_timeout
+# The uvicorn worker takes its keep-alive timeout and listen backlog from these
+keepalive = settings.keepalive_seconds
+backlog = settings.backlog
+max_requests = settings.max_requests
+max_requests_jitter = settings.max_requests // 10
+
+logger = logging.getLogger("gunicorn.error")
+
+def on_starting(server):
+    """Master, before any worker exists: bring the schema up to date exactly once"""
+    from database.connection import engine
+    from database.migrations import run_migrations
+
+    applied = run_migrations(engine)
+    logger.info("Applied migrations: %s", ", ".join(applied) if applied else "none, schema is current")
+    engine.dispose()
+    # Workers inherit the setting when preloaded and the environment otherwise
+    os.environ["MIGRATE_ON_STARTUP"] = "false"
+    settings.migrate_on_startup = False
+
+    if workers == 1 and not settings.shares_state() and (os.cpu_count() or 1) > 1 \
+            and not (os.getenv("WORKERS") or os.getenv("WEB_CONCURRENCY")):
+        logger.info(
+            "Serving with 1 worker: the cache, change feed or rate limiter keeps per-process state. Use the redis "
+            "backends (or turn them off) to get one worker per core, or set WORKERS to run several anyway."
+        )
+    # Set explicitly: the operator chose several workers over per-process state, so only warn
+    if workers > 1 and settings.rate_limit_per_second > 0 and settings.rate_limit_backend == "memory":
+        logger.warning(
+            "%d workers with RATE_LIMIT_BACKEND=memory: each worker keeps its own buckets, so a client may get "
+            "up to %d times its rate limit. Set RATE_LIMIT_BACKEND=redis to share them.",
+            workers, workers,
+        )
+    if workers > 1 and (settings.cache_backend == "memory" or settings.events_backend == "memory"):
+        logger.warning(
+            "%d workers with in-process cache/change feed backends: each worker caches and publishes on its own, "
+            "so cached reads may be stale for up to %ds and subscribers only see their worker's writes. "
+            "Set CACHE_BACKEND=redis and EVENTS_BACKEND=redis to share them.",
+            workers, settings.cache_ttl_seconds,
+        )
+
+def post_fork(server, worker):
+    """Worker, right after fork: fresh connection pools and client singletons"""
+    from cache import get_cache
+    from database.connection import dispose_after_fork
+    from events import get_broker
+    from jobs import get_job_pool
+    from middleware import get_concurrency_limiter, get_rate_limiter
+
+    dispose_after_fork()
+    get_cache.cache_clear()
+    get_broker.cache_clear()
+    get_rate_limiter.cache_clear()
+    get_concurrency_limiter.cache_clear()
+    get_job_pool.cache_clear()
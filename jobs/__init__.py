@@ -0,0 +1,21 @@
+from functools import lru_cache
+from config import get_settings
+from jobs.worker import Handler, JobContext, JobWorkerPool
+
+@lru_cache()
+def get_job_pool() -> JobWorkerPool:
+    """The process-wide background job workers, configured by the JOB_* settings (started by the app)"""
+    from database.connection import SessionLocal
+    from jobs.handlers import HANDLERS
+
+    settings = get_settings()
+    return JobWorkerPool(
+        SessionLocal,
+        HANDLERS,
+        concurrency=settings.job_concurrency,
+        poll_seconds=settings.job_poll_seconds,
+        retry_base_seconds=settings.job_retry_base_seconds,
+        retry_max_seconds=settings.job_retry_max_seconds,
+        heartbeat_seconds=settings.job_heartbeat_seconds,
+        stale_seconds=settings.job_stale_seconds,
+    )
@@ -0,0 +1,61 @@
+from typing import Dict
+from database.unit_of_work import UnitOfWork
+from repositories.stats_repository import StatsRepository
+from services.job_service import JOB_BULK_IMPORT, JOB_DELETE_USER, JOB_REBUILD_STATS
+from services.task_service import BULK_CHUNK_SIZE
+from services.user_service import UserValidationError
+from services.factories import create_task_service, create_user_service
+from jobs.worker import Handler, JobContext
+
+# Tasks deleted per transaction when deleting a user
+DELETE_BATCH_SIZE = 1000
+
+def bulk_import(context: JobContext) -> dict:
+    """Create the payload's tasks a chunk per transaction; the result is shaped like BulkTaskResponse"""
+    items = context.payload["items"]
+    # Each chunk commits its per-item results and only the counters, so a chunk costs the same however far in it is
+    counts = dict(context.result or {"created": 0, "failed": len(context.payload["errors"])})
+    for start in range(context.progress, len(items), BULK_CHUNK_SIZE):
+        chunk = items[start:start + BULK_CHUNK_SIZE]
+        with context.session() as db, UnitOfWork(db):
+            outcomes = create_task_service(db).create_tasks_bulk([(title, user_id, description) for _, title, user_id, description in chunk])
+            context.record_items(db, [(index, task_id, error) for (index, *_), (task_id, error) in zip(chunk, outcomes)])
+            for _, error in outcomes:
+                counts["created" if error is None else "failed"] += 1
+            context.checkpoint(db, start + len(chunk), result=counts)
+    # The whole list is written once, with the finished job
+    results = [{"index": index, "id": None, "error": error} for index, error in context.payload["errors"]]
+    results += [{"index": index, "id": task_id, "error": error} for index, task_id, error in context.item_results()]
+    results.sort(key=lambda item: item["index"])
+    return {**counts, "results": results}
+
+def delete_user(context: JobContext) -> dict:
+    """Delete a user's tasks a batch per transaction, then the user"""
+    user_id = context.payload["user_id"]
+    deleted = context.progress
+    while True:
+        with context.session() as db, UnitOfWork(db):
+            count = create_task_service(db).delete_user_tasks(user_id, DELETE_BATCH_SIZE)
+            if count == 0:
+                # In the same transaction as finding no tasks left, so none can be added in between
+                try:
+                    create_user_service(db).delete_user(user_id)
+                except UserValidationError:
+                    pass  # deleted by an earlier attempt
+            deleted += count
+            context.checkpoint(db, deleted)
+        if count == 0:
+            return {"deleted_tasks": deleted}
+
+def rebuild_stats(context: JobContext) -> dict:
+    """Recount every user's task counters"""
+    with context.session() as db, UnitOfWork(db):
+        users = StatsRepository(db).rebuild()
+        context.checkpoint(db, 1, total=1)
+    return {"users": users}
+
+HANDLERS: Dict[str, Handler] = {
+    JOB_BULK_IMPORT: bulk_import,
+    JOB_DELETE_USER: delete_user,
+    JOB_REBUILD_STATS: rebuild_stats,
+}
@@ -0,0 +1,202 @@
+import logging
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database.unit_of_work import UnitOfWork
+from models.job import Job
+from models.task import utcnow
+from repositories.job_repository import JobRepository
+from services.job_service import JobValidationError
+
+logger = logging.getLogger(__name__)
+
+class JobContext:
+    """What a handler gets: the payload, how far earlier attempts got, and a way to record progress"""
+
+    def __init__(self, job: Job, session_factory: Callable[[], Session]):
+        self.job_id = job.id
+        self.payload = job.payload
+        self.attempt = job.attempts
+        self.progress = job.progress
+        self.total = job.total
+        self.result = job.result
+        self._session_factory = session_factory
+
+    def session(self) -> Session:
+        """A new session of the worker's own; each step should be one unit of work on it"""
+        return self._session_factory()
+
+    def checkpoint(self, db: Session, progress: int, total: Optional[int] = None, result: Optional[dict] = None) -> None:
+        """Record progress in the step's own transaction: it commits, or is retried, together with the step"""
+        JobRepository(db).checkpoint(self.job_id, progress, total, result)
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        if result is not None:
+            self.result = result
+
+    def record_items(self, db: Session, results: List[Tuple[int, Optional[int], Optional[str]]]) -> None:
+        """Record per-item outcomes (index, task ID, error) in the step's own transaction, like checkpoint"""
+        JobRepository(db).add_item_results(self.job_id, results)
+
+    def item_results(self) -> List[Tuple[int, Optional[int], Optional[str]]]:
+        """Every per-item outcome recorded so far, by this attempt or earlier ones"""
+        with self.session() as db:
+            return JobRepository(db).get_item_results(self.job_id)
+
+# A handler runs one job to completion, returning its result; raising retries it with backoff,
+# unless it raises JobValidationError. Retries resume from the last checkpoint.
+Handler = Callable[[JobContext], Optional[dict]]
+
+class JobWorkerPool:
+    """Runs queued jobs on `concurrency` worker threads, each with its own sessions.
+
+    Jobs live in the database, so any process may queue them and any worker (in any process)
+    may run them; a guarded claim makes sure only one does. Failed attempts are retried with
+    exponential backoff and jitter. While a job runs, its worker heartbeats every
+    `heartbeat_seconds`, however long a step takes; a running job whose worker stops
+    heartbeating for `stale_seconds` is claimed again.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        handlers: Dict[str, Handler],
+        concurrency: int = 2,
+        poll_seconds: float = 1.0,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 300.0,
+        heartbeat_seconds: float = 30.0,
+        stale_seconds: float = 300.0,
+    ):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.stale_seconds = stale_seconds
+        # Several heartbeats per stale period, so one slow or failed heartbeat doesn't lose the job
+        self.heartbeat_seconds = min(heartbeat_seconds, stale_seconds / 3)
+        self.name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        self._stopping.clear()
+        for number in range(self.concurrency):
+            thread = threading.Thread(target=self._work, args=(f"{self.name}-{number}",), name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop taking jobs and wait for the running ones; an unfinished job is claimed again once stale"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def wake(self) -> None:
+        """A job was queued: look for work now rather than at the next poll"""
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {"succeeded": self.succeeded, "failed": self.failed, "retried": self.retried, "busy": self._busy}
+
+    def run_once(self, worker: Optional[str] = None) -> bool:
+        """Claim and run one due job in the calling thread; False if there was none"""
+        now = utcnow()
+        with self.session_factory() as db, UnitOfWork(db):
+            job = JobRepository(db).claim_next(worker or self.name, now, now - timedelta(seconds=self.stale_seconds))
+        if job is None:
+            return False
+
+        with self._lock:
+            self._busy += 1
+        try:
+            self._run(job)
+        finally:
+            with self._lock:
+                self._busy -= 1
+        return True
+
+    def _work(self, worker: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.run_once(worker):
+                    continue
+            except Exception:
+                logger.exception("Claiming a job failed")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def _run(self, job: Job) -> None:
+        handler = self.handlers.get(job.type)
+        if job.attempts > job.max_attempts:
+            # Claimed again after its worker went quiet on the last attempt
+            self._fail(job, "Worker stopped responding", retry=False)
+            return
+        if handler is None:
+            self._fail(job, f"Unknown job type {job.type}", retry=False)
+            return
+        try:
+            with self._heartbeat(job):
+                result = handler(JobContext(job, self.session_factory))
+        except JobValidationError as e:
+            self._fail(job, str(e), retry=False)
+            return
+        except Exception as e:
+            logger.exception("Job %s (%s) failed on attempt %d of %d", job.id, job.type, job.attempts, job.max_attempts)
+            self._fail(job, f"{type(e).__name__}: {e}", retry=job.attempts < job.max_attempts)
+            return
+        with self.session_factory() as db, UnitOfWork(db):
+            JobRepository(db).finish(job.id, result)
+        self.succeeded += 1
+
+    @contextmanager
+    def _heartbeat(self, job: Job) -> Iterator[None]:
+        """Keep the job's heartbeat fresh from a side thread while its handler runs"""
+        done = threading.Event()
+
+        def beat() -> None:
+            while not done.wait(self.heartbeat_seconds):
+                try:
+                    with self.session_factory() as db, UnitOfWork(db):
+                        JobRepository(db).heartbeat(job.id, job.worker)
+                except Exception:
+                    logger.exception("Heartbeat of job %s failed", job.id)
+
+        thread = threading.Thread(target=beat, name=f"job-heartbeat-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _fail(self, job: Job, error: str, retry: bool) -> None:
+        retry_at = utcnow() + timedelta(seconds=self._backoff(job.attempts)) if retry else None
+        with self.session_factory() as db, UnitOfWork(db):
+            JobRepository(db).fail(job.id, error, retry_at)
+        if retry:
+            self.retried += 1
+        else:
+            self.failed += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, so jobs failing together don't retry in lockstep"""
+        return random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempt - 1)))
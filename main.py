@@ -1,7 +1,20 @@
+import asyncio
 from fastapi import FastAPI
-from database.connection import create_tables
+from fastapi.responses import PlainTextResponse
+from cache import get_cache
+from config import get_settings
+from database.connection import engine, read_engine
+from database.migrations import run_migrations
+from events import get_broker
 from api.task_routes import router as task_router
 from api.user_routes import router as user_router
+from api.job_routes import router as job_router
+from jobs import get_job_pool
+from services.factories import create_archiver
+from middleware import (
+    AdmissionMiddleware, CompressionMiddleware, ProfilingMiddleware, get_compression_stats, get_concurrency_limiter,
+    get_metrics, get_rate_limiter,
+)
 
 # Create FastAPI app
 app = FastAPI(
@@ -10,15 +23,91 @@ app = FastAPI(
     version="2.0.0"
 )
 
-# Create database tables on startup
+# Apply pending schema migrations on startup (a no-op check when the schema is current);
+# under gunicorn the master applies them once before forking workers
 @app.on_event("startup")
 def startup_event():
-    create_tables()
+    if get_settings().migrate_on_startup:
+        run_migrations(engine)
+
+# Background job workers; every process runs its own, claiming jobs from the shared table
+@app.on_event("startup")
+def start_job_workers():
+    if get_settings().jobs_enabled:
+        get_job_pool().start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    get_job_pool().stop()
+
+# Send change events still queued for the shared stream before the process exits
+@app.on_event("shutdown")
+def flush_change_events():
+    get_broker().flush(timeout=5)
+
+# Periodic archival of old completed tasks, when ARCHIVE_INTERVAL_SECONDS is set
+@app.on_event("startup")
+async def start_archiver():
+    interval = get_settings().archive_interval_seconds
+    if interval > 0:
+        app.state.archiver = asyncio.create_task(create_archiver().run_periodically(interval))
+
+@app.on_event("shutdown")
+async def stop_archiver():
+    archiver = getattr(app.state, "archiver", None)
+    if archiver is not None:
+        archiver.cancel()
+
+# Rate limits and a concurrency cap in front of the DB pool; innermost, so /metrics counts what it turns away
+app.add_middleware(AdmissionMiddleware)
+
+# gzip/br/zstd for large JSON, NDJSON and CSV bodies, streamed ones included; inside the profiling
+# middleware, so request durations include the compression time
+app.add_middleware(CompressionMiddleware)
+
+# Per-request Server-Timing, /metrics counters and opt-in profiling
+if get_settings().metrics_enabled:
+    app.add_middleware(ProfilingMiddleware)
 
 # Include routes
 app.include_router(user_router)
 app.include_router(task_router)
+app.include_router(job_router)
 
 @app.get("/")
 def root():
-    return {"message": "Task Manager API with Users is running!"}
\ No newline at end of file
+    return {"message": "Task Manager API with Users is running!"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this process"""
+    cache_stats = get_cache().stats()
+    counters = {f"cache_{name}_total": cache_stats.pop(name) for name in ("hits", "misses", "evictions")}
+    gauges = {f"cache_{name}": value for name, value in cache_stats.items()}
+    event_stats = get_broker().stats()
+    counters.update({f"events_{name}_total": event_stats.pop(name) for name in ("published", "resets")})
+    gauges.update({f"events_{name}": value for name, value in event_stats.items()})
+    job_stats = get_job_pool().stats()
+    counters.update({f"jobs_{name}_total": job_stats.pop(name) for name in ("succeeded", "failed", "retried")})
+    gauges.update({f"jobs_{name}": value for name, value in job_stats.items()})
+    compression_stats = get_compression_stats().stats()
+    counters.update({f"compression_{name}_total": value for name, value in compression_stats.items()})
+    rate_limit_stats = get_rate_limiter().stats()
+    counters.update({
+        f"ratelimit_{name}_total": rate_limit_stats.pop(name)
+        for name in ("allowed", "limited", "errors") if name in rate_limit_stats
+    })
+    gauges.update({f"ratelimit_{name}": value for name, value in rate_limit_stats.items()})
+    concurrency = get_concurrency_limiter()
+    if concurrency is not None:
+        admission_stats = concurrency.stats()
+        counters.update({
+            f"admission_{name}_total": admission_stats.pop(name) for name in ("admitted", "queued", "rejected", "timeouts")
+        })
+        gauges.update({f"admission_{name}": value for name, value in admission_stats.items()})
+    # Only queue pools track checkouts (in-memory SQLite uses a single connection)
+    if hasattr(engine.pool, "checkedout"):
+        gauges["db_pool_checked_out"] = engine.pool.checkedout()
+    if read_engine is not engine and hasattr(read_engine.pool, "checkedout"):
+        gauges["db_read_pool_checked_out"] = read_engine.pool.checkedout()
+    return PlainTextResponse(get_metrics().render(counters, gauges), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,54 @@
+"""Management commands: python manage.py <command>"""
+import argparse
+from database.connection import SessionLocal, engine
+from database.migrations import load_migrations, pending_migrations, run_migrations
+from database.unit_of_work import UnitOfWork
+from repositories.stats_repository import StatsRepository
+import models.user  # noqa: F401 - registers User for the Task relationship
+
+def migrate(args) -> None:
+    """Apply pending schema migrations"""
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {', '.join(applied)}" if applied else "Schema is up to date")
+
+def migration_status(args) -> None:
+    """List migrations and whether they are applied"""
+    with engine.connect() as conn:
+        pending = {migration.version for migration in pending_migrations(conn)}
+    for migration in load_migrations():
+        state = "pending" if migration.version in pending else "applied"
+        print(f"{migration.version} {migration.name}: {state}")
+
+def rebuild_stats(args) -> None:
+    """Recount the per-user task counters from the tasks table, repairing any drift"""
+    with SessionLocal() as db, UnitOfWork(db):
+        users = StatsRepository(db).rebuild()
+    print(f"Rebuilt task stats for {users} users")
+
+def archive_tasks(args) -> None:
+    """Move completed tasks older than ARCHIVE_AFTER_DAYS (or --days) to the archive table"""
+    from datetime import timedelta
+    from services.factories import create_archiver
+
+    archiver = create_archiver()
+    if args.days is not None:
+        archiver.age = timedelta(days=args.days)
+    moved = archiver.run(max_batches=args.max_batches)
+    print(f"Archived {moved} completed tasks")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Task Manager management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help=migrate.__doc__).set_defaults(handler=migrate)
+    commands.add_parser("migration-status", help=migration_status.__doc__).set_defaults(handler=migration_status)
+    commands.add_parser("rebuild-stats", help=rebuild_stats.__doc__).set_defaults(handler=rebuild_stats)
+    archive = commands.add_parser("archive-tasks", help=archive_tasks.__doc__)
+    archive.add_argument("--days", type=float, help="archive tasks completed more than this many days ago")
+    archive.add_argument("--max-batches", type=int, help="stop after this many batches")
+    archive.set_defaults(handler=archive_tasks)
+    
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+from middleware.admission import (
+    AdmissionMiddleware, ConcurrencyLimiter, MemoryRateLimiter, NullRateLimiter, RateLimiter, RedisRateLimiter,
+    get_concurrency_limiter, get_rate_limiter,
+)
+from middleware.compression import CompressionMiddleware, get_compression_stats
+from middleware.metrics import Metrics, get_metrics
+from middleware.profiling import InstrumentedRoute, ProfilingMiddleware
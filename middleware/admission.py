@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Callable, Deque, Dict, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Monitoring must keep answering while the app sheds load
+EXEMPT_PATHS = frozenset({"/metrics"})
+
+def take_token(tokens: float, updated: float, now: float, rate: float, burst: int, cost: int = 1) -> Tuple[float, float]:
+    """One token bucket step: (tokens left, seconds to wait before retrying, 0 if allowed).
+
+    The bucket refills at `rate` tokens per second up to `burst`; a request takes `cost` tokens.
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+class RateLimiter:
+    """Per-client token buckets, with allowed/limited counters"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, key: str, cost: int = 1) -> float:
+        """Take `cost` tokens from the client's bucket; 0 if allowed, else seconds until it would be"""
+        return self._count(self._take(key, cost))
+
+    async def acquire_async(self, key: str, cost: int = 1) -> float:
+        """Same as acquire, for the event loop: backends that do network IO await it instead of blocking"""
+        return self._count(await self._take_async(key, cost))
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {"allowed": self.allowed, "limited": self.limited}
+
+    def _count(self, retry_after: float) -> float:
+        if retry_after > 0:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def _take(self, key: str, cost: int) -> float:
+        raise NotImplementedError
+
+    async def _take_async(self, key: str, cost: int) -> float:
+        # In-process buckets only take a lock for a few arithmetic operations
+        return self._take(key, cost)
+
+class NullRateLimiter(RateLimiter):
+    """Rate limiting disabled: every request is allowed"""
+
+    def __init__(self):
+        super().__init__(rate=0, burst=0)
+
+    def _take(self, key: str, cost: int) -> float:
+        return 0.0
+
+class MemoryRateLimiter(RateLimiter):
+    """Buckets kept in this process, bounded to the most recently seen clients"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000, clock: Callable[[], float] = time.monotonic):
+        super().__init__(rate, burst)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "clients": len(self._buckets)}
+
+    def _take(self, key: str, cost: int) -> float:
+        now = self._clock()
+        with self._lock:
+            # A forgotten client starts over with a full bucket, which only ever errs towards allowing
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens, retry_after = take_token(tokens, updated, now, self.rate, self.burst, cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+# take_token() in Lua, so the read-refill-write of a bucket is atomic on the Redis server
+REDIS_TOKEN_BUCKET = """
+local rate, burst, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = math.min(burst, (tonumber(state[1]) or burst) + math.max(0, now - (tonumber(state[2]) or now)) * rate)
+local retry_after = 0
+if tokens >= cost then tokens = tokens - cost else retry_after = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """Buckets shared by all workers, on any client with Redis eval semantics.
+
+    The middleware goes through `async_client` (redis.asyncio), so the round trip never blocks the
+    event loop; without one, the sync client's call is moved to the threadpool. While Redis is
+    unreachable requests are let through (fail open) and counted as errors.
+    """
+
+    def __init__(self, client, rate: float, burst: int, prefix: str = "task_tracker:ratelimit:",
+                 clock: Callable[[], float] = time.time, async_client=None):
+        super().__init__(rate, burst)
+        self.client = client
+        self.async_client = async_client
+        self.prefix = prefix
+        self.errors = 0
+        # Wall clock: every worker and host must agree on it
+        self._clock = clock
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {**super().stats(), "errors": self.errors}
+
+    def _take(self, key: str, cost: int) -> float:
+        try:
+            reply = self.client.eval(REDIS_TOKEN_BUCKET, 1, self.prefix + key, self.rate, self.burst, self._clock(), cost)
+        except Exception as e:
+            return self._fail_open(e)
+        return _retry_after(reply)
+
+    async def _take_async(self, key: str, cost: int) -> float:
+        if self.async_client is None:
+            return await run_in_threadpool(self._take, key, cost)
+        try:
+            reply = await self.async_client.eval(
+                REDIS_TOKEN_BUCKET, 1, self.prefix + key, self.rate, self.burst, self._clock(), cost
+            )
+        except Exception as e:
+            return self._fail_open(e)
+        return _retry_after(reply)
+
+    def _fail_open(self, error: Exception) -> float:
+        # An outage of the limiter must not take the API down with it
+        self.errors += 1
+        logger.warning("Rate limit check failed, allowing the request: %s: %s", type(error).__name__, error)
+        return 0.0
+
+def _retry_after(reply) -> float:
+    return float(reply.decode() if isinstance(reply, bytes) else reply)
+
+class ConcurrencyLimiter:
+    """At most `limit` requests in flight; up to `queue_size` more wait (first come, first served)
+    for at most `queue_timeout` seconds, and the rest are turned away at once.
+
+    Works across event loops and threads: slots are counted under a lock, and a freed slot is
+    handed straight to the oldest waiter on that waiter's own loop.
+    """
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False if the queue is full or the wait timed out"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                self.admitted += 1
+                return True
+            if len(self._waiters) >= self.queue_size:
+                self.rejected += 1
+                return False
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+            self.queued += 1
+
+        try:
+            await asyncio.wait_for(waiter[1], self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            with self._lock:
+                # Still queued: give up the place. Otherwise a slot was handed over just now and is ours
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+                    if isinstance(error, asyncio.TimeoutError):
+                        self.timeouts += 1
+            if isinstance(error, asyncio.CancelledError):
+                if granted:
+                    self.release()
+                raise
+            if not granted:
+                return False
+        with self._lock:
+            self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one"""
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            loop, future = self._waiters.popleft()
+        try:
+            loop.call_soon_threadsafe(_grant, future)
+        except RuntimeError:  # the waiter's loop is gone; pass the slot on
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            "admitted": self.admitted, "queued": self.queued, "rejected": self.rejected, "timeouts": self.timeouts,
+            "in_flight": self._in_flight, "waiting": len(self._waiters),
+        }
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+class AdmissionMiddleware:
+    """Sheds load before it reaches the database pool.
+
+    Each client's requests pass a token bucket first (429 when empty), then take one of the
+    concurrency limiter's slots for as long as the response is being produced (503 when the wait
+    queue is full or the wait times out). Both answers carry Retry-After. Event streams are
+    rate limited on connect but give their slot back once streaming starts, since an idle
+    subscriber holds no connection; WebSockets only pass the rate limit.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency: Optional[ConcurrencyLimiter] = None,
+        client_header: Optional[str] = None,
+        retry_after: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.app = app
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.concurrency = concurrency if concurrency is not None else get_concurrency_limiter()
+        self.client_header = (client_header or settings.rate_limit_client_header or "").lower()
+        self.retry_after = retry_after or settings.admission_retry_after_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self.rate_limiter.acquire_async(self._client(scope))
+        if wait > 0:
+            await self._refuse(scope, receive, send, 429, "Rate limit exceeded", math.ceil(wait))
+            return
+        if scope["type"] == "websocket" or self.concurrency is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.concurrency.acquire():
+            await self._refuse(scope, receive, send, 503, "Server is busy", self.retry_after)
+            return
+        held = True
+
+        async def send_releasing_streams(message: Message) -> None:
+            nonlocal held
+            if held and message["type"] == "http.response.start":
+                if Headers(raw=message["headers"]).get("content-type", "").startswith("text/event-stream"):
+                    held = False
+                    self.concurrency.release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_releasing_streams)
+        finally:
+            if held:
+                self.concurrency.release()
+
+    def _client(self, scope: Scope) -> str:
+        """Rate limit key: the configured header (first value, e.g. X-Forwarded-For behind a proxy) or the peer address"""
+        if self.client_header:
+            value = Headers(scope=scope).get(self.client_header)
+            if value:
+                return value.split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _refuse(self, scope: Scope, receive: Receive, send: Send, status: int, detail: str, retry_after: int) -> None:
+        if scope["type"] == "websocket":
+            # Closing before accepting makes the server answer the handshake with 403
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": str(max(1, retry_after))})
+        await response(scope, receive, send)
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide rate limiter configured by RATE_LIMIT_BACKEND (memory, redis or none)"""
+    settings = get_settings()
+    if settings.rate_limit_per_second <= 0:
+        return NullRateLimiter()
+    if settings.rate_limit_backend == "redis":
+        import redis
+        import redis.asyncio
+
+        return RedisRateLimiter(
+            redis.Redis.from_url(settings.redis_url),
+            settings.rate_limit_per_second,
+            settings.rate_limit_burst,
+            async_client=redis.asyncio.Redis.from_url(settings.redis_url),
+        )
+    if settings.rate_limit_backend == "memory":
+        return MemoryRateLimiter(settings.rate_limit_per_second, settings.rate_limit_burst, settings.rate_limit_max_clients)
+    return NullRateLimiter()
+
+@lru_cache()
+def get_concurrency_limiter() -> Optional[ConcurrencyLimiter]:
+    """The process-wide concurrency limiter, or None when MAX_CONCURRENT_REQUESTS is 0"""
+    settings = get_settings()
+    if settings.max_concurrent_requests <= 0:
+        return None
+    return ConcurrencyLimiter(
+        settings.max_concurrent_requests, settings.admission_queue_size, settings.admission_queue_timeout_seconds
+    )
@@ -0,0 +1,264 @@
+import threading
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import get_settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Exact media types (parameters stripped) worth compressing, besides text/* and the +json/+xml suffixes
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json", "application/x-ndjson", "application/javascript", "application/xml", "image/svg+xml",
+})
+# Server-sent events must reach the client event by event; never hold them back in a compressor
+UNCOMPRESSED_TYPES = frozenset({"text/event-stream"})
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a response of this Content-Type is text that compresses well"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if not media_type or media_type in UNCOMPRESSED_TYPES:
+        return False
+    return (
+        media_type in COMPRESSIBLE_TYPES
+        or media_type.startswith("text/")
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+class Encoder:
+    """One response body's compressor: `compress` what's buffered, `flush` at stream chunk ends, `finish` at the end"""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class BrotliEncoder(Encoder):
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+def encoder_factories(
+    encodings: Sequence[str], gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3
+) -> Dict[str, Callable[[], Encoder]]:
+    """Content-coding -> encoder factory, in the given order of preference, leaving out unavailable ones"""
+    available = {"gzip": lambda: GzipEncoder(gzip_level)}
+    if brotli is not None:
+        available["br"] = lambda: BrotliEncoder(brotli_quality)
+    if zstandard is not None:
+        available["zstd"] = lambda: ZstdEncoder(zstd_level)
+    return {encoding: available[encoding] for encoding in encodings if encoding in available}
+
+def negotiate(accept_encoding: str, preferred: Sequence[str]) -> Optional[str]:
+    """The content-coding to use: the client's highest q-value, ties going to our preference order"""
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in preferred:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class CompressionStats:
+    """Responses compressed and the bytes before and after, for /metrics"""
+
+    def __init__(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def record(self, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {"responses": self.responses, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+@lru_cache()
+def get_compression_stats() -> CompressionStats:
+    """Process-wide compression counters"""
+    return CompressionStats()
+
+class CompressionMiddleware:
+    """Compresses text responses of at least `minimum_size` bytes with the best encoding the client accepts.
+
+    Pure ASGI, so streamed responses stay streamed: the body is compressed chunk by chunk and
+    flushed at every chunk the app sends. Responses that are too small, already encoded, not
+    compressible (images, server-sent events) or not wanted by the client pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encoders: Optional[Dict[str, Callable[[], Encoder]]] = None,
+        minimum_size: Optional[int] = None,
+        stats: Optional[CompressionStats] = None,
+    ):
+        self.app = app
+        settings = get_settings()
+        if encoders is None:
+            encoders = encoder_factories(
+                [encoding.strip() for encoding in settings.compression_encodings.split(",") if encoding.strip()],
+                settings.compression_gzip_level, settings.compression_brotli_quality, settings.compression_zstd_level,
+            )
+        self.encoders = encoders
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+        self.stats = stats or get_compression_stats()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encoders:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), list(self.encoders))
+        responder = CompressingResponder(send, encoding and self.encoders[encoding], encoding, self.minimum_size, self.stats)
+        await self.app(scope, receive, responder.send)
+
+class CompressingResponder:
+    """The `send` of one response: decides on compression at the first body chunk, then encodes every chunk"""
+
+    def __init__(
+        self, send: Send, factory: Optional[Callable[[], Encoder]], encoding: Optional[str], minimum_size: int,
+        stats: CompressionStats,
+    ):
+        self._send = send
+        self._factory = factory
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._stats = stats
+        self._start: Optional[Message] = None
+        self._pending: List[bytes] = []
+        self._encoder: Optional[Encoder] = None
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+        elif message["type"] == "http.response.start":
+            self._start_response(message)
+            if self._passthrough:
+                await self._send(message)
+        elif message["type"] == "http.response.body":
+            await self._body(message)
+        else:
+            await self._send(message)
+
+    def _start_response(self, message: Message) -> None:
+        headers = MutableHeaders(scope=message)
+        status = message["status"]
+        if status < 200 or status in (204, 304) or "content-encoding" in headers \
+                or not is_compressible(headers.get("content-type", "")):
+            self._passthrough = True
+            return
+        # The representation now depends on Accept-Encoding, whether or not this one gets compressed
+        headers.add_vary_header("Accept-Encoding")
+        if self._factory is None:
+            self._passthrough = True
+            return
+        self._start = message
+
+    async def _body(self, message: Message) -> None:
+        body, more_body = message.get("body", b""), message.get("more_body", False)
+        if self._encoder is None:
+            self._pending.append(body)
+            buffered = sum(len(chunk) for chunk in self._pending)
+            if more_body and buffered < self._minimum_size:
+                return  # not sure yet whether the stream is worth compressing
+            body = b"".join(self._pending)
+            self._pending = []
+            if buffered < self._minimum_size:
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            self._begin(known_length=not more_body)
+
+        self._bytes_in += len(body)
+        data = self._encoder.compress(body)
+        data += self._encoder.flush() if more_body else self._encoder.finish()
+        self._bytes_out += len(data)
+        if not more_body and self._start is not None:
+            # The whole body in one message: it still gets an exact Content-Length
+            MutableHeaders(scope=self._start)["Content-Length"] = str(len(data))
+        if self._start is not None:
+            await self._send(self._start)
+            self._start = None
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+        if not more_body:
+            self._stats.record(self._bytes_in, self._bytes_out)
+
+    def _begin(self, known_length: bool) -> None:
+        self._encoder = self._factory()
+        headers = MutableHeaders(scope=self._start)
+        headers["Content-Encoding"] = self._encoding
+        if not known_length:
+            del headers["Content-Length"]
+        # A strong validator promises byte-identical bodies, which the encoded one is not
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
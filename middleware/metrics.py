@@ -0,0 +1,94 @@
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from database.instrumentation import RequestStats
+
+# Request duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels: object) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class Metrics:
+    """Process-wide request metrics, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        # (method, route) -> per-bucket counts, then sum and count
+        self._durations: Dict[Tuple[str, str], List[float]] = {}
+        # route -> queries, SQL seconds, hydrated rows, serialization seconds
+        self._route_totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0, 0.0])
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        """Record one finished request"""
+        with self._lock:
+            self._requests[(method, route, str(status))] += 1
+            histogram = self._durations.setdefault((method, route), [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            totals = self._route_totals[route]
+            totals[0] += stats.query_count
+            totals[1] += stats.sql_seconds
+            totals[2] += stats.rows_hydrated
+            totals[3] += stats.serialize_seconds
+
+    def render(self, counters: Optional[Dict[str, float]] = None, gauges: Optional[Dict[str, float]] = None) -> str:
+        """All metrics, plus unlabelled extra counters and gauges (e.g. cache and pool figures)"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample} {value}" for sample, value in samples)
+
+        with self._lock:
+            requests = sorted(self._requests.items())
+            durations = sorted((key, list(values)) for key, values in self._durations.items())
+            route_totals = sorted((route, list(totals)) for route, totals in self._route_totals.items())
+
+        family("http_requests_total", "counter", "Requests served", (
+            (f"http_requests_total{_labels(method=method, route=route, status=status)}", count)
+            for (method, route, status), count in requests
+        ))
+        histogram_samples = []
+        for (method, route), values in durations:
+            for bound, count in zip(self.buckets, values):
+                histogram_samples.append(
+                    (f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=f'{bound:g}')}", count)
+                )
+            histogram_samples.append(
+                (f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le='+Inf')}", values[-1])
+            )
+            histogram_samples.append((f"http_request_duration_seconds_sum{_labels(method=method, route=route)}", float(values[-2])))
+            histogram_samples.append((f"http_request_duration_seconds_count{_labels(method=method, route=route)}", values[-1]))
+        family("http_request_duration_seconds", "histogram", "Request latency until the response finished", histogram_samples)
+
+        for index, (name, kind, help_text) in enumerate((
+            ("db_queries_total", "counter", "SQL statements executed"),
+            ("db_query_seconds_total", "counter", "Time spent executing SQL statements"),
+            ("orm_rows_hydrated_total", "counter", "ORM objects loaded from result rows"),
+            ("serialization_seconds_total", "counter", "Time spent validating and encoding responses"),
+        )):
+            family(name, kind, help_text, (
+                (f"{name}{_labels(route=route)}", totals[index]) for route, totals in route_totals
+            ))
+
+        for name, value in sorted((counters or {}).items()):
+            family(name, "counter", name.replace("_", " "), [(name, value)])
+        for name, value in sorted((gauges or {}).items()):
+            family(name, "gauge", name.replace("_", " "), [(name, value)])
+        return "\n".join(lines) + "\n"
+
+@lru_cache()
+def get_metrics() -> Metrics:
+    """The process-wide metrics registry"""
+    return Metrics()
@@ -0,0 +1,159 @@
+import cProfile
+import functools
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import Settings, get_settings
+from database.instrumentation import RequestStats, current_request_stats, mark_endpoint_finished
+from middleware.metrics import Metrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that marks when the endpoint returns, so response validation and encoding can be timed"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark_endpoint_finished()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+class ProfilingMiddleware:
+    """Per-request SQL, ORM and serialization figures as a Server-Timing header and /metrics counters.
+
+    Also profiles a sampled fraction of requests (PROFILE_SAMPLE_RATE) and any request that
+    sends "X-Profile: <PROFILE_TOKEN>", writing the profile to PROFILE_DIR. One request is
+    profiled at a time; cProfile sees everything on the event loop thread while it runs, so
+    use PROFILER=pyinstrument for an async-aware call tree.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Optional[Metrics] = None):
+        self.app = app
+        self.metrics = metrics or get_metrics()
+        self._profiling = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        stats = RequestStats()
+        context_token = current_request_stats.set(stats)
+        # The token holder also gets the slowest statements in the header; sampled requests only log them
+        detailed = bool(settings.profile_token) and Headers(scope=scope).get("x-profile") == settings.profile_token
+        sampled = settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+        profile = self._start_profile(scope, settings) if detailed or sampled else None
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = Headers(raw=message["headers"]).get("content-type", "").startswith("text/event-stream")
+                now = time.perf_counter()
+                if stats.endpoint_finished is not None:
+                    stats.serialize_seconds += now - stats.endpoint_finished
+                    stats.endpoint_finished = None
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, now - started, detailed))
+                if profile:
+                    headers.append("X-Profile-File", profile.name)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(context_token)
+            if profile:
+                profile.finish()
+                logger.info("Profiled %s %s: %s; slowest SQL: %s", scope["method"], scope["path"], profile.name, stats.slowest_statements())
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.observe(scope["method"], route, status, elapsed, stats)
+            # Event streams are open for as long as the client listens; that is not slowness
+            if elapsed * 1000 >= settings.slow_request_ms and not streaming:
+                logger.warning(
+                    "Slow request %s %s: %.1f ms, %d queries in %.1f ms, slowest: %s",
+                    scope["method"], scope["path"], elapsed * 1000, stats.query_count,
+                    stats.sql_seconds * 1000, stats.slowest_statements()[:1],
+                )
+
+    def _start_profile(self, scope: Scope, settings: Settings) -> Optional["Profile"]:
+        if not self._profiling.acquire(blocking=False):
+            return None
+        try:
+            return Profile(scope, settings, self._profiling)
+        except Exception:
+            self._profiling.release()
+            raise
+
+class Profile:
+    """One running cProfile or pyinstrument capture, written to PROFILE_DIR when finished"""
+
+    def __init__(self, scope: Scope, settings: Settings, lock: threading.Lock):
+        self._lock = lock
+        self.kind = settings.profiler
+        if self.kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("PROFILER=pyinstrument but pyinstrument is not installed; using cProfile")
+                self.kind = "cprofile"
+        path = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        extension = "html" if self.kind == "pyinstrument" else "prof"
+        self.name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{path}-{uuid.uuid4().hex[:8]}.{extension}"
+        self.path = os.path.join(settings.profile_dir, self.name)
+        if self.kind == "pyinstrument":
+            self._profiler = Profiler(async_mode="enabled")
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self.kind == "pyinstrument":
+                self._profiler.stop()
+                with open(self.path, "w") as f:
+                    f.write(self._profiler.output_html())
+            else:
+                self._profiler.disable()
+                self._profiler.dump_stats(self.path)
+        finally:
+            self._lock.release()
+
+def _header_text(text: str, limit: int = 120) -> str:
+    """A statement squeezed into a quoted, latin-1 safe header parameter"""
+    text = " ".join(text.split())[:limit]
+    return text.replace("\\", "\\\\").replace('"', '\\"').encode("latin-1", "replace").decode("latin-1")
+
+def server_timing(stats: RequestStats, total_seconds: float, detailed: bool = False) -> str:
+    """Server-Timing header value for one request"""
+    metrics = [
+        f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.query_count} queries"',
+        f'orm;desc="{stats.rows_hydrated} rows"',
+        f"serialize;dur={stats.serialize_seconds * 1000:.2f}",
+        f"app;dur={total_seconds * 1000:.2f}",
+    ]
+    if detailed:
+        metrics.extend(
+            f'sql-{rank};dur={seconds * 1000:.2f};desc="{_header_text(statement)}"'
+            for rank, (seconds, statement) in enumerate(stats.slowest_statements(), start=1)
+        )
+    return ", ".join(metrics)
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON, Text
+from database.connection import Base
+from models.task import utcnow
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+class Job(Base):
+    """Background job: queued by a request, run by a worker with its own sessions"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest due job; running jobs are found again by their heartbeat if a worker dies
+        Index("ix_jobs_status_run_after_id", "status", "run_after", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)
+    payload = Column(JSON, nullable=False)
+    # Handlers checkpoint progress (and their running counters) with each committed step, so retries resume
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    worker = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=utcnow)
+    # Also the heartbeat of a running job: bumped on claim, on every checkpoint and by its worker meanwhile
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class JobItemResult(Base):
+    """Outcome of one item of a job over many items (a bulk import's tasks), committed with its chunk"""
+    __tablename__ = "job_item_results"
+    
+    job_id = Column(Integer, ForeignKey("jobs.id"), primary_key=True)
+    item_index = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
@@ -1,29 +1,42 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.connection import Base
+from database.search import attach_search_index
+
+def utcnow() -> datetime:
+    """Timezone-aware current time, set client-side so keyset cursors compare exactly"""
+    return datetime.now(timezone.utc)
 
 class Task(Base):
     """Task database model"""
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination indexes: every listing is ordered by (created_at, id)
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_is_completed_created_at_id", "is_completed", "created_at", "id"),
+        # A user's listing; on Postgres it carries the remaining listed columns so pages never touch the heap
+        Index(
+            "ix_tasks_user_id_created_at_id_covering", "user_id", "created_at", "id",
+            postgresql_include=["is_completed", "title", "description"],
+        ),
+        # A user's open or completed tasks in page order, and index-only completed counts
+        Index("ix_tasks_user_id_is_completed_created_at_id", "user_id", "is_completed", "created_at", "id"),
+        # IDs are never reused, even after the newest task is archived or deleted (Postgres sequences never are)
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
     description = Column(String(500), nullable=True)
     is_completed = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
     
     # Relationship: Many tasks belong to one user
     user = relationship("User", back_populates="tasks")
 
-
-@router.post("/api/users/") 
-def create_user_bad(user_data: UserCreate, db: Session = Depends(get_db)):
-    # HTTP + Logika biznesowa + dostęp do danych = MESS
-    if not user_data.username:  # Logika biznesowa pośród routingu
-        raise HTTPException(400, "Username required")
-    user = User(username=user_data.username, email=user_data.email)
-    db.add(user)  # Bezpośrednie połączenie do DB w routingu
-    db.commit()
-    return user
\ No newline at end of file
+# Full-text search index (FTS5 on SQLite, GIN on Postgres) lives and dies with the table
+attach_search_index(Task.__table__)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+from database.connection import Base
+
+class TaskArchive(Base):
+    """Completed tasks moved out of the hot tasks table by the archival job; same columns and IDs as Task"""
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        # A user's archived tasks in listing order, and index-only archived counts
+        Index("ix_tasks_archive_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_archive_created_at_id", "created_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(100), nullable=False)
+    description = Column(String(500), nullable=True)
+    is_completed = Column(Boolean, nullable=False, default=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False)
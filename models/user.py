@@ -2,15 +2,20 @@ from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.connection import Base
+from models.task import utcnow
 
 class User(Base):
     """User database model"""
     __tablename__ = "users"
+    # IDs are never reused once a user is deleted (Postgres sequences never are)
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
     email = Column(String(100), unique=True, nullable=False, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set client-side to the microsecond, like Task's: it tells users recreated under one ID apart in ETags
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
     
     # Relationship: One user can have many tasks
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
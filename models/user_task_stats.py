@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, text
+from database.connection import Base
+
+class UserTaskStats(Base):
+    """Per-user task counters, kept current by TaskService on every task write"""
+    __tablename__ = "user_task_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    # Bumped with every change to the user's tasks: the validator behind conditional GETs of their task list
+    version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    updated_at = Column(DateTime(timezone=True), nullable=True)
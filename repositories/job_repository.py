@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import Session
+from models.job import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, Job, JobItemResult
+from models.task import utcnow
+from database.unit_of_work import after_commit
+
+class JobRepository:
+    """Data access layer for background jobs"""
+
+    def __init__(self, db: Session, notify: Optional[Callable[[], None]] = None):
+        self.db = db
+        # Wakes this process's workers once a new job is committed, instead of waiting for their next poll
+        self.notify = notify
+
+    def create_job(self, job_type: str, payload: dict, max_attempts: int, total: Optional[int] = None) -> Job:
+        """Queue a job to run as soon as a worker is free"""
+        job = self.db.scalars(
+            insert(Job).returning(Job),
+            [{"type": job_type, "status": JOB_QUEUED, "payload": payload, "total": total, "max_attempts": max_attempts}],
+        ).one()
+        if self.notify:
+            after_commit(self.db, self.notify)
+        return job
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        """Get job by ID"""
+        return self.db.get(Job, job_id)
+
+    def claim_next(self, worker: str, now: datetime, stale_before: datetime) -> Optional[Job]:
+        """Take the oldest due job - or a running one whose worker stopped heartbeating - for `worker`"""
+        claimable = or_(
+            and_(Job.status == JOB_QUEUED, Job.run_after <= now),
+            and_(Job.status == JOB_RUNNING, Job.updated_at < stale_before),
+        )
+        job_id = self.db.scalar(
+            select(Job.id).where(claimable).order_by(Job.run_after, Job.id).limit(1).with_for_update(skip_locked=True)
+        )
+        if job_id is None:
+            return None
+        # Guarded, so two workers that picked the same job can't both take it
+        return self.db.scalars(
+            update(Job)
+            .where(Job.id == job_id, claimable)
+            .values(status=JOB_RUNNING, attempts=Job.attempts + 1, worker=worker, error=None)
+            .returning(Job)
+        ).one_or_none()
+
+    def checkpoint(self, job_id: int, progress: int, total: Optional[int] = None, result: Optional[dict] = None) -> None:
+        """Record progress (and the running counters) of a running job; commits with the work it describes"""
+        values = {"progress": progress, "updated_at": utcnow()}
+        if total is not None:
+            values["total"] = total
+        if result is not None:
+            values["result"] = result
+        self.db.execute(update(Job).where(Job.id == job_id).values(**values))
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Keep a running job claimed by `worker`; False once it isn't (finished, or claimed by another)"""
+        return self.db.execute(
+            update(Job).where(Job.id == job_id, Job.status == JOB_RUNNING, Job.worker == worker).values(updated_at=utcnow())
+        ).rowcount == 1
+
+    def add_item_results(self, job_id: int, results: List[Tuple[int, Optional[int], Optional[str]]]) -> None:
+        """Record the outcome (index, task ID, error) of processed items; commits with the chunk they came from"""
+        if results:
+            self.db.execute(insert(JobItemResult), [
+                {"job_id": job_id, "item_index": index, "task_id": task_id, "error": error}
+                for index, task_id, error in results
+            ])
+
+    def get_item_results(self, job_id: int) -> List[Tuple[int, Optional[int], Optional[str]]]:
+        """Outcomes recorded for a job's items, in item order"""
+        return [tuple(row) for row in self.db.execute(
+            select(JobItemResult.item_index, JobItemResult.task_id, JobItemResult.error)
+            .where(JobItemResult.job_id == job_id)
+            .order_by(JobItemResult.item_index)
+        )]
+
+    def finish(self, job_id: int, result: Optional[dict]) -> None:
+        """Mark a job succeeded"""
+        values = {"status": JOB_SUCCEEDED, "finished_at": utcnow(), "worker": None}
+        if result is not None:
+            values["result"] = result
+        self.db.execute(update(Job).where(Job.id == job_id).values(**values))
+
+    def fail(self, job_id: int, error: str, retry_at: Optional[datetime]) -> None:
+        """Record a failed attempt: queue it again at `retry_at`, or fail the job for good when None"""
+        values = {"error": error, "worker": None}
+        if retry_at is not None:
+            values.update(status=JOB_QUEUED, run_after=retry_at)
+        else:
+            values.update(status=JOB_FAILED, finished_at=utcnow())
+        self.db.execute(update(Job).where(Job.id == job_id).values(**values))
@@ -0,0 +1,100 @@
+from typing import Dict, List, Tuple
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models.task import Task, utcnow
+from models.task_archive import TaskArchive
+from models.user_task_stats import UserTaskStats
+
+class StatsRepository:
+    """Data access layer for the per-user task counters"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def apply_deltas(self, deltas: Dict[int, Tuple[int, int]]) -> None:
+        """Add (task_count, completed_count) deltas to each user's counters in one upsert"""
+        rows = [
+            {"user_id": user_id, "task_count": task_delta, "completed_count": completed_delta}
+            for user_id, (task_delta, completed_delta) in sorted(deltas.items())  # stable lock order
+            if task_delta or completed_delta
+        ]
+        # Increment in the database, so concurrent writers never overwrite each other's counts
+        self._upsert(rows, increment=True)
+    
+    def touch(self, user_ids) -> None:
+        """Bump the users' versions without changing their counts, for writes that only move tasks"""
+        user_ids = sorted(set(user_ids))  # stable lock order
+        if user_ids:
+            self.db.execute(
+                update(UserTaskStats)
+                .where(UserTaskStats.user_id.in_(user_ids))
+                .values(version=UserTaskStats.version + 1, updated_at=utcnow())
+            )
+    
+    def delete_user_stats(self, user_id: int) -> None:
+        """Drop a deleted user's counters"""
+        self.db.execute(delete(UserTaskStats).where(UserTaskStats.user_id == user_id))
+    
+    def get_user_stats(self, user_id: int) -> Tuple[int, int]:
+        """(task_count, completed_count) of one user; zeros for users without tasks"""
+        row = self.db.execute(
+            select(UserTaskStats.task_count, UserTaskStats.completed_count).where(UserTaskStats.user_id == user_id)
+        ).first()
+        return tuple(row) if row else (0, 0)
+    
+    def get_totals(self) -> Tuple[int, int]:
+        """(task_count, completed_count) over all users"""
+        row = self.db.execute(
+            select(
+                func.coalesce(func.sum(UserTaskStats.task_count), 0),
+                func.coalesce(func.sum(UserTaskStats.completed_count), 0),
+            )
+        ).one()
+        return tuple(row)
+    
+    def rebuild(self) -> int:
+        """Recount every user's counters from the tasks and archive tables; returns the number of users counted"""
+        # Archived tasks are still the user's tasks, and all of them completed
+        tasks = select(Task.user_id, Task.is_completed).union_all(
+            select(TaskArchive.user_id, TaskArchive.is_completed)
+        ).subquery()
+        counts = select(
+            tasks.c.user_id,
+            func.count(),
+            func.coalesce(func.sum(case((tasks.c.is_completed == True, 1), else_=0)), 0),
+        ).group_by(tasks.c.user_id)
+        rows = [
+            {"user_id": user_id, "task_count": task_count, "completed_count": completed_count}
+            for user_id, task_count, completed_count in self.db.execute(counts)
+        ]
+        # Zero and re-set rather than delete and insert: versions must only ever go up
+        self.db.execute(
+            update(UserTaskStats).values(
+                task_count=0, completed_count=0, version=UserTaskStats.version + 1, updated_at=utcnow()
+            )
+        )
+        self._upsert(rows, increment=False)
+        return len(rows)
+    
+    def _upsert(self, rows: List[dict], increment: bool) -> None:
+        """Insert or update counter rows, adding to or replacing the counts and bumping each version"""
+        if not rows:
+            return
+        now = utcnow()
+        rows = [{**row, "version": 1, "updated_at": now} for row in rows]
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(UserTaskStats)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserTaskStats.user_id],
+            set_={
+                "task_count": UserTaskStats.task_count + excluded.task_count if increment else excluded.task_count,
+                "completed_count": (
+                    UserTaskStats.completed_count + excluded.completed_count if increment else excluded.completed_count
+                ),
+                "version": UserTaskStats.version + 1,
+                "updated_at": excluded.updated_at,
+            },
+        )
+        self.db.execute(statement, rows)
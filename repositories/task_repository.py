@@ -1,28 +1,242 @@
-from typing import List, Optional
+import heapq
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import DateTime, Select, and_, column, delete, func, insert, literal, literal_column, or_, select, table, update
 from sqlalchemy.orm import Session
-from models.task import Task
+from models.task import Task, utcnow
+from models.task_archive import TaskArchive
+from cache.backends import CacheBackend, NullCache
+from cache.serialization import model_from_dict, model_to_dict
+from database.unit_of_work import after_commit
+from database.search import POSTGRES_SEARCH_VECTOR, SEARCH_TABLE
+
+def _as_utc(value: datetime) -> datetime:
+    """Normalize aware datetimes to UTC, the zone created_at is stored in"""
+    return value.astimezone(timezone.utc) if value.tzinfo else value
+
+# Columns served by the fast list path; created_at trails so the service can build the keyset cursor
+TASK_ROW_COLUMNS = (Task.id, Task.title, Task.description, Task.is_completed, Task.user_id, Task.created_at)
+ARCHIVE_ROW_COLUMNS = tuple(getattr(TaskArchive, column.key) for column in TASK_ROW_COLUMNS)
+# Columns copied as they are when a task moves to the archive
+ARCHIVED_COLUMNS = ("id", "title", "description", "is_completed", "user_id", "created_at", "updated_at")
+
+def _merge_pages(hot: list, archived: list, limit: int, key: Callable) -> list:
+    """The first `limit` items of two pages that are each already in `key` order"""
+    return list(heapq.merge(hot, archived, key=key))[:limit]
 
 class TaskRepository:
     """Data access layer for tasks"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[CacheBackend] = None):
         self.db = db
+        self.cache = cache or NullCache()
     
     def create_task(self, title: str, user_id: int, description: str = None) -> Task:
         """Create a new task for a specific user"""
-        task = Task(title=title, description=description, user_id=user_id)
-        self.db.add(task)
-        self.db.commit()
-        self.db.refresh(task)
+        # INSERT ... RETURNING hands back the stored row, so no refresh SELECT is needed
+        task = self.db.scalars(
+            insert(Task).returning(Task),
+            [{"title": title, "description": description, "user_id": user_id}],
+        ).one()
+        self.invalidate_user_tasks(task.user_id)
         return task
     
+    def create_tasks_bulk(self, rows: List[Dict]) -> List[int]:
+        """Insert many tasks in one executemany statement, returning their IDs in order"""
+        # A savepoint lets a failed batch roll back without losing the rest of the unit of work
+        with self.db.begin_nested():
+            result = self.db.execute(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows)
+            task_ids = list(result.scalars())
+        self.invalidate_user_tasks(*{row["user_id"] for row in rows})
+        return task_ids
+    
     def get_all_tasks(self) -> List[Task]:
         """Get all tasks"""
         return self.db.query(Task).all()
     
     def get_tasks_by_user(self, user_id: int) -> List[Task]:
         """Get all tasks for a specific user"""
-        return self.db.query(Task).filter(Task.user_id == user_id).all()
+        return self._cached_user_tasks(
+            user_id, "all", lambda: self.db.query(Task).filter(Task.user_id == user_id).all()
+        )
+    
+    def get_tasks_page(
+        self,
+        limit: int,
+        user_id: Optional[int] = None,
+        is_completed: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        include_archived: bool = False,
+        version: Optional[int] = None,
+    ) -> List[Task]:
+        """Get up to `limit` tasks ordered by (created_at, id), starting after the keyset `after`.
+
+        With `include_archived`, archived tasks (TaskArchive instances) are merged into the page.
+        A user's page is cached under their task list `version`, when given (see _cached_for_user).
+        """
+        filters = (limit, user_id, is_completed, created_after, created_before, after)
+        
+        def load() -> list:
+            tasks = self.db.scalars(self._page_statement(select(Task), *filters)).all()
+            if not self._reads_archive(include_archived, is_completed):
+                return tasks
+            archived = self.db.scalars(self._page_statement(select(TaskArchive), *filters, model=TaskArchive)).all()
+            return _merge_pages(tasks, archived, limit, key=lambda task: (task.created_at, task.id))
+        
+        if user_id is not None:
+            params = f"page:{limit}:{is_completed}:{created_after}:{created_before}:{after}:{include_archived}"
+            return self._cached_user_tasks(user_id, params, load, version)
+        return load()
+    
+    def get_task_rows_page(
+        self,
+        limit: int,
+        user_id: Optional[int] = None,
+        is_completed: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        include_archived: bool = False,
+        version: Optional[int] = None,
+    ) -> List[tuple]:
+        """Same page as get_tasks_page, as bare TASK_ROW_COLUMNS tuples without ORM hydration"""
+        filters = (limit, user_id, is_completed, created_after, created_before, after)
+        
+        def load() -> List[tuple]:
+            rows = [tuple(row) for row in self.db.execute(self._page_statement(select(*TASK_ROW_COLUMNS), *filters))]
+            if not self._reads_archive(include_archived, is_completed):
+                return rows
+            statement = self._page_statement(select(*ARCHIVE_ROW_COLUMNS), *filters, model=TaskArchive)
+            archived = [tuple(row) for row in self.db.execute(statement)]
+            return _merge_pages(rows, archived, limit, key=lambda row: (row[-1], row[0]))
+        
+        if user_id is not None:
+            params = f"rows:{limit}:{is_completed}:{created_after}:{created_before}:{after}:{include_archived}"
+            return self._cached_for_user(
+                user_id, params, load,
+                dump=lambda rows: [[*row[:-1], row[-1].isoformat() if row[-1] else None] for row in rows],
+                restore=lambda rows: [tuple(row) for row in rows],
+                version=version,
+            )
+        return load()
+    
+    def iter_task_rows(
+        self,
+        batch_size: int,
+        user_id: Optional[int] = None,
+        is_completed: Optional[bool] = None,
+        include_archived: bool = False,
+    ) -> Iterator[List[tuple]]:
+        """Stream every matching task as TASK_ROW_COLUMNS tuples, `batch_size` rows at a time, ordered by id"""
+        batches = self._iter_rows(TASK_ROW_COLUMNS, Task, batch_size, user_id, is_completed)
+        if not self._reads_archive(include_archived, is_completed):
+            yield from batches
+            return
+        archived = self._iter_rows(ARCHIVE_ROW_COLUMNS, TaskArchive, batch_size, user_id, is_completed)
+        # Both streams are in id order, so merging them row by row keeps memory at a batch each
+        rows = heapq.merge(
+            (row for batch in batches for row in batch), (row for batch in archived for row in batch), key=lambda row: row[0]
+        )
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            batches.close()
+            archived.close()
+    
+    def _iter_rows(self, columns: tuple, model, batch_size: int, user_id, is_completed) -> Iterator[List[tuple]]:
+        """Stream the matching rows of one store in id order"""
+        statement = select(*columns).order_by(model.id)
+        if user_id is not None:
+            statement = statement.where(model.user_id == user_id)
+        if is_completed is not None:
+            statement = statement.where(model.is_completed == is_completed)
+        # yield_per streams from a server-side cursor where the driver has one, so only one batch is in memory
+        result = self.db.execute(statement.execution_options(yield_per=batch_size))
+        try:
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        finally:
+            result.close()
+    
+    def _reads_archive(self, include_archived: bool, is_completed: Optional[bool]) -> bool:
+        """Whether a read has to look at the archive too; it only ever holds completed tasks"""
+        return include_archived and is_completed is not False
+    
+    def search_tasks(
+        self,
+        terms: List[Tuple[str, bool]],
+        limit: int,
+        offset: int = 0,
+        user_id: Optional[int] = None,
+    ) -> List[Task]:
+        """Tasks matching all (term, is_prefix) terms, best match first"""
+        # Only live tasks are indexed: archiving a task drops it from the index along with its row
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            # Terms are bare words, so quoting them is enough to keep FTS5 syntax out
+            match = " ".join(f'"{term}"' + ("*" if prefix else "") for term, prefix in terms)
+            fts = table(SEARCH_TABLE, column("rowid"))
+            fts_table = literal_column(SEARCH_TABLE)
+            # bm25 ranks lower-is-better; a title hit weighs more than a description hit
+            statement = (
+                select(Task)
+                .join(fts, fts.c.rowid == Task.id)
+                .where(fts_table.op("MATCH")(match))
+                .order_by(func.bm25(fts_table, 10.0, 1.0), Task.id)
+            )
+        elif dialect == "postgresql":
+            match = " & ".join(term + (":*" if prefix else "") for term, prefix in terms)
+            vector = literal_column(POSTGRES_SEARCH_VECTOR)
+            query = func.to_tsquery(literal_column("'english'"), match)
+            statement = (
+                select(Task)
+                .where(vector.op("@@")(query))
+                .order_by(func.ts_rank_cd(vector, query).desc(), Task.id)
+            )
+        else:
+            # No full-text index on this database: every term must appear in the title or description.
+            # Scans the table and can't rank, so matches come in ID order
+            statement = select(Task).order_by(Task.id)
+            for term, _ in terms:
+                # Terms are bare words, but _ is a word character and a LIKE wildcard
+                pattern = "%" + term.replace("_", "\\_") + "%"
+                statement = statement.where(or_(
+                    Task.title.ilike(pattern, escape="\\"), Task.description.ilike(pattern, escape="\\"),
+                ))
+        
+        if user_id is not None:
+            statement = statement.where(Task.user_id == user_id)
+        return self.db.scalars(statement.limit(limit).offset(offset)).all()
+    
+    def _page_statement(
+        self, statement: Select, limit, user_id, is_completed, created_after, created_before, after, model=Task
+    ) -> Select:
+        """Apply the listing filters, keyset and (created_at, id) order to a SELECT over tasks or the archive"""
+        if user_id is not None:
+            statement = statement.where(model.user_id == user_id)
+        if is_completed is not None:
+            statement = statement.where(model.is_completed == is_completed)
+        if created_after is not None:
+            statement = statement.where(model.created_at >= _as_utc(created_after))
+        if created_before is not None:
+            statement = statement.where(model.created_at < _as_utc(created_before))
+        if after is not None:
+            after_created_at, after_id = after
+            statement = statement.where(or_(
+                model.created_at > after_created_at,
+                and_(model.created_at == after_created_at, model.id > after_id),
+            ))
+        return statement.order_by(model.created_at, model.id).limit(limit)
     
     def get_task_by_id(self, task_id: int) -> Optional[Task]:
         """Get task by ID"""
@@ -32,13 +246,153 @@ class TaskRepository:
         """Get task by ID for specific user"""
         return self.db.query(Task).filter(Task.id == task_id, Task.user_id == user_id).first()
     
+    def get_archived_task(self, task_id: int, user_id: int) -> Optional[TaskArchive]:
+        """Get an archived task by ID for specific user"""
+        return self.db.query(TaskArchive).filter(TaskArchive.id == task_id, TaskArchive.user_id == user_id).first()
+    
+    def complete_task(self, task_id: int, user_id: int) -> Optional[Task]:
+        """Complete an open task of the user in one guarded UPDATE; None if no such open task"""
+        task = self.db.scalars(
+            update(Task)
+            .where(Task.id == task_id, Task.user_id == user_id, Task.is_completed == False)
+            .values(is_completed=True)
+            .returning(Task)
+        ).one_or_none()
+        if task is not None:
+            self.invalidate_user_tasks(user_id)
+        return task
+    
+    def delete_open_task(self, task_id: int, user_id: int) -> bool:
+        """Delete an open task of the user in one guarded DELETE; False if no such open task"""
+        deleted_id = self.db.execute(
+            delete(Task)
+            .where(Task.id == task_id, Task.user_id == user_id, Task.is_completed == False)
+            .returning(Task.id)
+        ).scalar_one_or_none()
+        if deleted_id is not None:
+            self.invalidate_user_tasks(user_id)
+        return deleted_id is not None
+    
+    def complete_tasks(self, task_ids: List[int], user_id: int) -> List[int]:
+        """Complete the user's open tasks among `task_ids` in one guarded UPDATE; returns the completed IDs"""
+        completed_ids = list(self.db.scalars(
+            update(Task)
+            .where(Task.id.in_(task_ids), Task.user_id == user_id, Task.is_completed == False)
+            .values(is_completed=True)
+            .returning(Task.id)
+        ))
+        if completed_ids:
+            self.invalidate_user_tasks(user_id)
+        return completed_ids
+    
+    def delete_open_tasks(self, task_ids: List[int], user_id: int) -> List[int]:
+        """Delete the user's open tasks among `task_ids` in one guarded DELETE; returns the deleted IDs"""
+        deleted_ids = list(self.db.scalars(
+            delete(Task)
+            .where(Task.id.in_(task_ids), Task.user_id == user_id, Task.is_completed == False)
+            .returning(Task.id)
+        ))
+        if deleted_ids:
+            self.invalidate_user_tasks(user_id)
+        return deleted_ids
+    
+    def get_completion_states(self, task_ids: List[int], user_id: int) -> Dict[int, bool]:
+        """is_completed of each of the user's tasks among `task_ids`, archived ones included, in one query"""
+        rows = self.db.execute(
+            select(Task.id, Task.is_completed).where(Task.id.in_(task_ids), Task.user_id == user_id)
+            .union_all(
+                select(TaskArchive.id, TaskArchive.is_completed)
+                .where(TaskArchive.id.in_(task_ids), TaskArchive.user_id == user_id)
+            )
+        )
+        return {task_id: bool(is_completed) for task_id, is_completed in rows}
+    
+    def delete_user_tasks(self, user_id: int, limit: int) -> List[Tuple[int, bool]]:
+        """Delete up to `limit` of a user's tasks, live ones first, then archived; returns their (id, is_completed)"""
+        for model in (Task, TaskArchive):
+            task_ids = select(model.id).where(model.user_id == user_id).order_by(model.id).limit(limit).scalar_subquery()
+            deleted = [tuple(row) for row in self.db.execute(
+                delete(model).where(model.id.in_(task_ids)).returning(model.id, model.is_completed)
+            )]
+            if deleted:
+                self.invalidate_user_tasks(user_id)
+                return [(task_id, bool(is_completed)) for task_id, is_completed in deleted]
+        return []
+    
+    def archive_completed_tasks(self, completed_before: datetime, limit: int) -> List[Tuple[int, int]]:
+        """Move up to `limit` tasks completed before the cutoff into the archive; returns their (id, user_id)"""
+        batch = [tuple(row) for row in self.db.execute(
+            select(Task.id, Task.user_id)
+            .where(Task.is_completed == True, Task.updated_at < _as_utc(completed_before))
+            .order_by(Task.id)
+            .limit(limit)
+            # Concurrent archivers on Postgres take disjoint batches; SQLite serializes writers anyway
+            .with_for_update(skip_locked=True)
+        )]
+        if not batch:
+            return []
+        
+        task_ids = [task_id for task_id, _ in batch]
+        columns = [getattr(Task, name) for name in ARCHIVED_COLUMNS]
+        self.db.execute(insert(TaskArchive).from_select(
+            [*ARCHIVED_COLUMNS, "archived_at"],
+            select(*columns, literal(utcnow(), DateTime(timezone=True))).where(Task.id.in_(task_ids)),
+        ))
+        self.db.execute(delete(Task).where(Task.id.in_(task_ids)))
+        self.invalidate_user_tasks(*{user_id for _, user_id in batch})
+        return batch
+    
     def update_task(self, task: Task) -> Task:
         """Update task"""
-        self.db.commit()
-        self.db.refresh(task)
+        self.db.flush()
+        self.invalidate_user_tasks(task.user_id)
         return task
     
     def delete_task(self, task: Task) -> None:
         """Delete task"""
         self.db.delete(task)
-        self.db.commit()
+        self.db.flush()
+        self.invalidate_user_tasks(task.user_id)
+    
+    def invalidate_user_tasks(self, *user_ids: int) -> None:
+        """Drop cached task lists of the given users once the current transaction commits"""
+        # Lists are keyed by a per-user generation token; forgetting the token orphans them all
+        keys = [f"tasks:user:{user_id}:generation" for user_id in user_ids]
+        after_commit(self.db, lambda: self.cache.delete(*keys))
+    
+    def _cached_user_tasks(
+        self, user_id: int, params: str, load: Callable[[], List[Task]], version: Optional[int] = None
+    ) -> List[Task]:
+        """Read-through cache for one user's task lists"""
+        return self._cached_for_user(
+            user_id, params, load,
+            dump=lambda tasks: [model_to_dict(task) for task in tasks],
+            restore=lambda cached: [
+                model_from_dict(TaskArchive if "archived_at" in data else Task, data) for data in cached
+            ],
+            version=version,
+        )
+    
+    def _cached_for_user(
+        self, user_id: int, params: str, load: Callable, dump: Callable, restore: Callable, version: Optional[int] = None
+    ) -> list:
+        """Read-through cache for anything derived from one user's tasks"""
+        generation_key = f"tasks:user:{user_id}:generation"
+        generation = self.cache.get(generation_key)
+        if generation is None:
+            # A fresh token (not a counter) so a lost token can never revive old lists
+            generation = uuid.uuid4().hex
+            self.cache.set(generation_key, generation)
+        
+        # The generation is only dropped by the process that made the write; keying by the database's
+        # version of the user's task list (the one their ETag is made from) too keeps another process's
+        # cache from serving a body older than the ETag it is sent with
+        if version is not None:
+            params = f"v{version}:{params}"
+        key = f"tasks:user:{user_id}:{generation}:{params}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return restore(cached)
+        value = load()
+        self.cache.set(key, dump(value))
+        return value
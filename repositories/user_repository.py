@@ -1,35 +1,164 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import delete, func, insert, or_, select
 from sqlalchemy.orm import Session
+from models.task import Task
+from models.task_archive import TaskArchive
 from models.user import User
+from models.user_task_stats import UserTaskStats
+from cache.backends import CacheBackend, NullCache
+from cache.serialization import model_from_dict, model_to_dict
+from database.unit_of_work import after_commit
 
 class UserRepository:
     """Data access layer for users"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[CacheBackend] = None):
         self.db = db
         ## Aggregation - Repository uses Session for all operations
+        self.cache = cache or NullCache()
     
     def create_user(self, username: str, email: str) -> User:
-        """Create a new user"""
-        user = User(username=username, email=email)
-        self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        """Create a new user; raises IntegrityError if the username or email is taken"""
+        # The unique indexes decide, race-free; the savepoint keeps the unit of work usable after a conflict
+        with self.db.begin_nested():
+            user = self.db.scalars(insert(User).returning(User), [{"username": username, "email": email}]).one()
+        self.invalidate_user(user)
         return user
     
+    def get_taken_fields(self, username: str, email: str) -> Set[str]:
+        """Which of "username" and "email" already belong to a user, in one query"""
+        taken = set()
+        rows = self.db.execute(
+            select(User.username, User.email).where(or_(User.username == username, User.email == email))
+        )
+        for existing_username, existing_email in rows:
+            if existing_username == username:
+                taken.add("username")
+            if existing_email == email:
+                taken.add("email")
+        return taken
+    
     def get_all_users(self) -> List[User]:
         """Get all users"""
         return self.db.query(User).all()
     
+    def get_users_with_task_counts(self, limit: int, after_id: Optional[int] = None) -> List[Tuple[User, int, int]]:
+        """Get up to `limit` users ordered by id with (total, completed) task counts in one query"""
+        statement = self._task_counts_statement((User,), limit, after_id)
+        return [tuple(row) for row in self.db.execute(statement)]
+    
+    def get_user_rows_with_task_counts(self, limit: int, after_id: Optional[int] = None) -> List[tuple]:
+        """Same page as get_users_with_task_counts, as (id, username, email, total, completed) tuples"""
+        statement = self._task_counts_statement((User.id, User.username, User.email), limit, after_id)
+        return [tuple(row) for row in self.db.execute(statement)]
+    
+    def _task_counts_statement(self, columns: tuple, limit: int, after_id: Optional[int]):
+        """SELECT the given user columns plus task counts for one page of users"""
+        # Correlated subqueries only touch the tasks of the users on this page
+        task_count = (
+            select(func.count(Task.id)).where(Task.user_id == User.id).correlate(User).scalar_subquery()
+        )
+        completed_count = (
+            select(func.count(Task.id))
+            .where(Task.user_id == User.id, Task.is_completed == True)
+            .correlate(User)
+            .scalar_subquery()
+        )
+        # Archived tasks still count, all as completed
+        archived_count = (
+            select(func.count(TaskArchive.id)).where(TaskArchive.user_id == User.id).correlate(User).scalar_subquery()
+        )
+        statement = select(*columns, task_count + archived_count, completed_count + archived_count)
+        if after_id is not None:
+            statement = statement.where(User.id > after_id)
+        return statement.order_by(User.id).limit(limit)
+    
+    def get_task_list_version(self, user_id: int) -> Optional[Tuple[int, Optional[datetime], Optional[datetime]]]:
+        """(version, last modified, user created) of a user's tasks in one primary-key lookup; None if no such user"""
+        row = self.db.execute(
+            select(
+                func.coalesce(UserTaskStats.version, 0),
+                func.coalesce(UserTaskStats.updated_at, User.created_at),
+                User.created_at,
+            )
+            .select_from(User)
+            .outerjoin(UserTaskStats, UserTaskStats.user_id == User.id)
+            .where(User.id == user_id)
+        ).first()
+        return tuple(row) if row else None
+    
+    def get_users_page_version(self, limit: int, after_id: Optional[int] = None) -> Tuple[tuple, Optional[datetime]]:
+        """(stamp, last modified) of the page get_users_with_task_counts would return, without counting tasks"""
+        page = select(
+            User.id,
+            User.created_at,
+            User.updated_at,
+            func.coalesce(UserTaskStats.version, 0).label("version"),
+            UserTaskStats.updated_at.label("tasks_updated_at"),
+        ).outerjoin(UserTaskStats, UserTaskStats.user_id == User.id)
+        if after_id is not None:
+            page = page.where(User.id > after_id)
+        page = page.order_by(User.id).limit(limit).subquery()
+        # Membership, user rows and per-user task versions only ever move these forward; the times catch
+        # a deleted user's place taken by a new one, which can leave the sums as they were
+        count, id_sum, max_id, version_sum, users_created, users_updated, tasks_updated = self.db.execute(
+            select(
+                func.count(),
+                func.sum(page.c.id),
+                func.max(page.c.id),
+                func.sum(page.c.version),
+                func.max(page.c.created_at),
+                func.max(page.c.updated_at),
+                func.max(page.c.tasks_updated_at),
+            )
+        ).one()
+        last_modified = max((moment for moment in (users_updated, tasks_updated) if moment is not None), default=None)
+        return (count, id_sum, max_id, version_sum, users_created, users_updated, tasks_updated), last_modified
+    
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get user by ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        return self._cached_user(
+            f"user:id:{user_id}", lambda: self.db.query(User).filter(User.id == user_id).first()
+        )
         ##  All operations go through contained session
     
+    def get_existing_user_ids(self, user_ids: Iterable[int]) -> Set[int]:
+        """Get which of the given user IDs exist, in a single query"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        return set(self.db.scalars(select(User.id).where(User.id.in_(user_ids))))
+    
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
-        return self.db.query(User).filter(User.username == username).first()
+        return self._cached_user(
+            f"user:username:{username}", lambda: self.db.query(User).filter(User.username == username).first()
+        )
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
-        return self.db.query(User).filter(User.email == email).first()
+        return self._cached_user(
+            f"user:email:{email}", lambda: self.db.query(User).filter(User.email == email).first()
+        )
+    
+    def delete_user(self, user: User) -> None:
+        """Delete a user whose tasks are already gone"""
+        # Core DELETE: going through the ORM would load the tasks relationship for its cascade
+        self.db.execute(delete(User).where(User.id == user.id))
+        self.invalidate_user(user)
+    
+    def invalidate_user(self, user: User) -> None:
+        """Drop every cached lookup of a user once the current transaction commits"""
+        keys = [f"user:id:{user.id}", f"user:username:{user.username}", f"user:email:{user.email}"]
+        after_commit(self.db, lambda: self.cache.delete(*keys))
+    
+    def _cached_user(self, key: str, load: Callable[[], Optional[User]]) -> Optional[User]:
+        """Read-through cache for single-user lookups (misses are not cached)"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return model_from_dict(User, cached)
+        user = load()
+        if user is not None:
+            self.cache.set(key, model_to_dict(user))
+        return user
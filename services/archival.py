@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Callable, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from database.unit_of_work import UnitOfWork
+from models.task import utcnow
+from services.task_service import TaskService
+
+logger = logging.getLogger(__name__)
+
+class TaskArchiver:
+    """Background job moving completed tasks older than `age` from the hot tasks table to tasks_archive.
+
+    Each batch is its own short transaction, with a pause in between, so the write lock is never
+    held for long and foreground writes interleave with a large backlog. Safe to run in several
+    processes at once: on Postgres they skip each other's locked rows, and SQLite serializes writers.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        service_factory: Callable[[Session], TaskService],
+        age: timedelta,
+        batch_size: int = 500,
+        pause_seconds: float = 0.05,
+    ):
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.age = age
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+
+    def run(self, max_batches: Optional[int] = None) -> int:
+        """Archive everything completed before now - age (or up to `max_batches` batches); returns how many moved"""
+        # One cutoff per run, so tasks completed while it runs wait for the next one
+        completed_before = utcnow() - self.age
+        moved = batches = 0
+        while max_batches is None or batches < max_batches:
+            with self.session_factory() as db, UnitOfWork(db):
+                batch = self.service_factory(db).archive_completed_tasks(completed_before, self.batch_size)
+            moved += batch
+            batches += 1
+            if batch < self.batch_size:
+                break
+            time.sleep(self.pause_seconds)
+        return moved
+
+    async def run_periodically(self, interval_seconds: float) -> None:
+        """Run every `interval_seconds` until cancelled, off the event loop"""
+        while True:
+            try:
+                moved = await run_in_threadpool(self.run)
+                if moved:
+                    logger.info("Archived %d completed tasks", moved)
+            except Exception:
+                logger.exception("Archiving completed tasks failed; retrying next interval")
+            await asyncio.sleep(interval_seconds)
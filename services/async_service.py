@@ -0,0 +1,99 @@
+from typing import Any, AsyncIterator, Callable, Iterator
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from config import get_settings
+from database.connection import get_async_db, get_async_read_db, get_db, get_read_db
+from database.unit_of_work import UnitOfWork
+
+_EXHAUSTED = object()
+
+class AsyncService:
+    """Awaitable facade over a sync service - routes call `await service.method(...)` in either mode.
+
+    Each call is one unit of work: it commits once when the method returns and rolls back if it raises.
+    """
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        async def call(*args, **kwargs):
+            return await self._run(lambda service: getattr(service, name)(*args, **kwargs))
+        return call
+
+    async def stream(self, name: str, *args, **kwargs) -> AsyncIterator[Any]:
+        """Call a service method that returns an iterator and iterate it without blocking the event loop.
+
+        The method itself runs eagerly, so its validation errors raise here rather than mid-stream;
+        the items are then pulled one `next()` at a time outside any unit of work (reads only).
+        """
+        iterator = await self._execute(lambda service: iter(getattr(service, name)(*args, **kwargs)))
+        return self._drain(iterator)
+
+    async def _drain(self, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        try:
+            while True:
+                item = await self._execute(lambda service: next(iterator, _EXHAUSTED))
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                await self._execute(lambda service: close())
+
+    async def _run(self, operation: Callable[[Any], Any]) -> Any:
+        """Run `operation(service)` as one unit of work"""
+        raise NotImplementedError
+
+    async def _execute(self, operation: Callable[[Any], Any]) -> Any:
+        """Run `operation(service)` in the right execution context, without a unit of work"""
+        raise NotImplementedError
+
+class ThreadpoolService(AsyncService):
+    """Sync mode: runs the service, and its blocking Session, on the threadpool"""
+
+    def __init__(self, service: Any, session: Session):
+        self._service = service
+        self._session = session
+
+    async def _run(self, operation: Callable[[Any], Any]) -> Any:
+        def unit_of_work():
+            with UnitOfWork(self._session):
+                return operation(self._service)
+        return await run_in_threadpool(unit_of_work)
+
+    async def _execute(self, operation: Callable[[Any], Any]) -> Any:
+        return await run_in_threadpool(operation, self._service)
+
+class AsyncSessionService(AsyncService):
+    """Async mode: runs the service on an AsyncSession, so its repositories await the async driver"""
+
+    def __init__(self, session, factory: Callable[[Session], Any]):
+        self._session = session
+        self._factory = factory
+
+    async def _run(self, operation: Callable[[Any], Any]) -> Any:
+        # run_sync hands the repositories the AsyncSession's sync facade; its IO is
+        # awaited on the event loop through the async driver rather than blocking a thread
+        def unit_of_work(db: Session):
+            with UnitOfWork(db):
+                return operation(self._factory(db))
+        return await self._session.run_sync(unit_of_work)
+
+    async def _execute(self, operation: Callable[[Any], Any]) -> Any:
+        # Each call re-enters the greenlet bridge, so a generator started in one call
+        # can keep awaiting the async driver in the next
+        return await self._session.run_sync(lambda db: operation(self._factory(db)))
+
+def service_dependency(factory: Callable[[Session], Any], read_only: bool = False) -> Callable[..., AsyncService]:
+    """Build the FastAPI dependency for a service in the configured (sync or async) mode"""
+    if get_settings().async_mode:
+        session_dependency = get_async_read_db if read_only else get_async_db
+
+        async def dependency(db=Depends(session_dependency)) -> AsyncService:
+            return AsyncSessionService(db, factory)
+    else:
+        session_dependency = get_read_db if read_only else get_db
+
+        def dependency(db: Session = Depends(session_dependency)) -> AsyncService:
+            return ThreadpoolService(factory(db), db)
+    return dependency
@@ -0,0 +1,44 @@
+"""Services wired to their repositories, cache and broker, for every entry point: routes, job workers, CLI"""
+from datetime import timedelta
+from sqlalchemy.orm import Session
+from repositories.job_repository import JobRepository
+from repositories.stats_repository import StatsRepository
+from repositories.task_repository import TaskRepository
+from repositories.user_repository import UserRepository
+from services.archival import TaskArchiver
+from services.job_service import JobService
+from services.task_service import TaskService
+from services.user_service import UserService
+from database.connection import SessionLocal
+from events import ChangePublisher, get_broker
+from cache import get_cache
+from config import get_settings
+
+def create_task_service(db: Session) -> TaskService:
+    """Dependency injection for task service"""
+    task_repository = TaskRepository(db, get_cache())
+    user_repository = UserRepository(db, get_cache())
+    return TaskService(task_repository, user_repository, StatsRepository(db), ChangePublisher(db, get_broker()))
+
+def create_user_service(db: Session) -> UserService:
+    """Dependency injection for user service"""
+    repository = UserRepository(db, get_cache())
+    return UserService(repository, StatsRepository(db))
+
+def create_job_service(db: Session) -> JobService:
+    """Dependency injection for job service"""
+    from jobs import get_job_pool  # the job package imports these factories for its handlers
+
+    repository = JobRepository(db, notify=get_job_pool().wake)
+    return JobService(repository, UserRepository(db, get_cache()), get_settings().job_max_attempts)
+
+def create_archiver() -> TaskArchiver:
+    """The archival job as configured, on write sessions and the same services as the routes"""
+    settings = get_settings()
+    return TaskArchiver(
+        SessionLocal,
+        create_task_service,
+        age=timedelta(days=settings.archive_after_days),
+        batch_size=settings.archive_batch_size,
+        pause_seconds=settings.archive_batch_pause_seconds,
+    )
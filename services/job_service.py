@@ -0,0 +1,45 @@
+from typing import List, Optional, Tuple
+from repositories.job_repository import JobRepository
+from repositories.user_repository import UserRepository
+from models.job import Job
+
+class JobValidationError(Exception):
+    """Custom exception for job business logic validation; a job failing with it is not retried"""
+    pass
+
+JOB_BULK_IMPORT = "tasks.bulk_import"
+JOB_DELETE_USER = "users.delete"
+JOB_REBUILD_STATS = "stats.rebuild"
+
+class JobService:
+    """Business logic layer for queuing background jobs and reporting on them"""
+    
+    def __init__(self, repository: JobRepository, user_repository: UserRepository, max_attempts: int = 5):
+        self.repository = repository
+        self.user_repository = user_repository
+        self.max_attempts = max_attempts
+    
+    def enqueue_bulk_import(
+        self, items: List[Tuple[int, str, int, Optional[str]]], errors: List[Tuple[int, str]]
+    ) -> Job:
+        """Queue creating (index, title, user_id, description) tasks; `errors` are items already rejected"""
+        payload = {"items": [list(item) for item in items], "errors": [list(error) for error in errors]}
+        return self.repository.create_job(JOB_BULK_IMPORT, payload, self.max_attempts, total=len(items))
+    
+    def enqueue_user_deletion(self, user_id: int) -> Job:
+        """Queue deleting a user together with all their tasks"""
+        # Business rule: User must exist
+        if not self.user_repository.get_user_by_id(user_id):
+            raise JobValidationError("User not found")
+        return self.repository.create_job(JOB_DELETE_USER, {"user_id": user_id}, self.max_attempts)
+    
+    def enqueue_stats_rebuild(self) -> Job:
+        """Queue recounting every user's task counters"""
+        return self.repository.create_job(JOB_REBUILD_STATS, {}, self.max_attempts, total=1)
+    
+    def get_job(self, job_id: int) -> Job:
+        """Get job by ID with validation"""
+        job = self.repository.get_job(job_id)
+        if not job:
+            raise JobValidationError("Job not found")
+        return job
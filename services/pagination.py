@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(*key: Any) -> str:
+    """Encode the sort key of the last returned row as an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    """Decode a cursor back into its sort key, raising ValueError if it was tampered with"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError("Invalid cursor")
+
+    try:
+        return tuple(
+            datetime.fromisoformat(value) if expected is datetime else expected(value)
+            for expected, value in zip(types, payload)
+        )
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -1,18 +1,39 @@
-from typing import List, Optional
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
 from repositories.task_repository import TaskRepository
 from repositories.user_repository import UserRepository
+from repositories.stats_repository import StatsRepository
 from models.task import Task
+from events.publisher import TASK_ARCHIVED, TASK_COMPLETED, TASK_CREATED, TASK_DELETED, ChangePublisher
+from services.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 
 class TaskValidationError(Exception):
     """Custom exception for business logic validation"""
     pass
 
+BULK_CHUNK_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+# A search term is a word, optionally ending in * for prefix matching
+SEARCH_TERM = re.compile(r"(\w+)(\*?)")
+
 class TaskService:
     """Business logic layer for tasks"""
     
-    def __init__(self, task_repository: TaskRepository, user_repository: UserRepository):
+    def __init__(
+        self,
+        task_repository: TaskRepository,
+        user_repository: UserRepository,
+        stats_repository: StatsRepository,
+        publisher: Optional[ChangePublisher] = None,
+    ):
         self.task_repository = task_repository
         self.user_repository = user_repository
+        self.stats_repository = stats_repository
+        self.publisher = publisher
     
     def create_task(self, title: str, user_id: int, description: str = None) -> Task:
         """Create a new task with validation"""
@@ -21,6 +42,55 @@ class TaskService:
         if not user:
             raise TaskValidationError("User not found")
         
+        task = self.task_repository.create_task(self._validate_title(title), user_id, description)
+        self.stats_repository.apply_deltas({user_id: (1, 0)})
+        self._publish([(TASK_CREATED, user_id, task_data(task.id, task.title, task.description, task.is_completed, user_id))])
+        return task
+    
+    def create_tasks_bulk(
+        self, items: List[Tuple[str, int, Optional[str]]]
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """Create many (title, user_id, description) tasks; returns (task_id, error) for each item"""
+        # Business rule: User must exist - checked for the whole batch in one query
+        existing_user_ids = self.user_repository.get_existing_user_ids(user_id for _, user_id, _ in items)
+        
+        results: List[Tuple[Optional[int], Optional[str]]] = [(None, None)] * len(items)
+        rows, positions = [], []
+        for position, (title, user_id, description) in enumerate(items):
+            if user_id not in existing_user_ids:
+                results[position] = (None, "User not found")
+                continue
+            try:
+                title = self._validate_title(title)
+            except TaskValidationError as e:
+                results[position] = (None, str(e))
+                continue
+            rows.append({"title": title, "description": description, "user_id": user_id})
+            positions.append(position)
+        
+        # Each chunk is one savepoint-guarded INSERT; a failed chunk does not abort the others
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk_positions = positions[start:start + BULK_CHUNK_SIZE]
+            try:
+                task_ids = self.task_repository.create_tasks_bulk(rows[start:start + BULK_CHUNK_SIZE])
+            except SQLAlchemyError:
+                for position in chunk_positions:
+                    results[position] = (None, "Task could not be saved")
+                continue
+            for position, task_id in zip(chunk_positions, task_ids):
+                results[position] = (task_id, None)
+        
+        created = Counter(items[position][1] for position, (task_id, _) in enumerate(results) if task_id is not None)
+        self.stats_repository.apply_deltas({user_id: (count, 0) for user_id, count in created.items()})
+        self._publish([
+            (TASK_CREATED, row["user_id"], task_data(results[position][0], row["title"], row["description"], False, row["user_id"]))
+            for position, row in zip(positions, rows)
+            if results[position][0] is not None
+        ])
+        return results
+    
+    def _validate_title(self, title: str) -> str:
+        """Apply the title business rules and return the normalized title"""
         # Business rule: Title cannot be empty
         if not title or title.strip() == "":
             raise TaskValidationError("Task title cannot be empty")
@@ -29,7 +99,7 @@ class TaskService:
         if len(title.strip()) > 100:
             raise TaskValidationError("Task title must be under 100 characters")
         
-        return self.task_repository.create_task(title.strip(), user_id, description)
+        return title.strip()
     
     def get_tasks_by_user(self, user_id: int) -> List[Task]:
         """Get all tasks for a specific user"""
@@ -44,26 +114,235 @@ class TaskService:
         """Get all tasks (admin function)"""
         return self.task_repository.get_all_tasks()
     
+    def list_tasks(
+        self,
+        user_id: Optional[int] = None,
+        is_completed: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        include_archived: bool = False,
+        version: Optional[int] = None,
+    ) -> Tuple[List[Task], Optional[str]]:
+        """Get one page of tasks and the cursor of the next page (None on the last page)"""
+        return self._paginate(
+            self.task_repository.get_tasks_page,
+            lambda task: (task.created_at, task.id),
+            cursor,
+            limit,
+            user_id=user_id,
+            is_completed=is_completed,
+            created_after=created_after,
+            created_before=created_before,
+            include_archived=include_archived,
+            version=version,
+        )
+    
+    def list_user_tasks(self, user_id: int, **filters) -> Tuple[List[Task], Optional[str]]:
+        """Get one page of tasks for a specific user"""
+        # Business rule: User must exist
+        user = self.user_repository.get_user_by_id(user_id)
+        if not user:
+            raise TaskValidationError("User not found")
+        
+        return self.list_tasks(user_id=user_id, **filters)
+    
+    def list_task_rows(
+        self,
+        user_id: Optional[int] = None,
+        is_completed: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        include_archived: bool = False,
+        version: Optional[int] = None,
+    ) -> Tuple[List[tuple], Optional[str]]:
+        """Same page as list_tasks, as bare column tuples for the fast serialization path"""
+        return self._paginate(
+            self.task_repository.get_task_rows_page,
+            lambda row: (row[-1], row[0]),
+            cursor,
+            limit,
+            user_id=user_id,
+            is_completed=is_completed,
+            created_after=created_after,
+            created_before=created_before,
+            include_archived=include_archived,
+            version=version,
+        )
+    
+    def list_user_task_rows(self, user_id: int, **filters) -> Tuple[List[tuple], Optional[str]]:
+        """Same page as list_user_tasks, as bare column tuples"""
+        # Business rule: User must exist
+        user = self.user_repository.get_user_by_id(user_id)
+        if not user:
+            raise TaskValidationError("User not found")
+        
+        return self.list_task_rows(user_id=user_id, **filters)
+    
+    def export_task_rows(
+        self, user_id: Optional[int] = None, is_completed: Optional[bool] = None, include_archived: bool = False
+    ) -> Iterator[List[tuple]]:
+        """Stream all matching tasks as batches of column tuples, for exports"""
+        # Business rule: User must exist - checked up front, before anything is streamed
+        if user_id is not None and not self.user_repository.get_user_by_id(user_id):
+            raise TaskValidationError("User not found")
+        
+        return self.task_repository.iter_task_rows(
+            EXPORT_BATCH_SIZE, user_id=user_id, is_completed=is_completed, include_archived=include_archived
+        )
+    
+    def search_tasks(
+        self, query: str, user_id: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0
+    ) -> List[Task]:
+        """Full-text search over title and description, best match first"""
+        # Only words and trailing * are kept, so no backend query syntax reaches the index
+        terms = [(term, bool(star)) for term, star in SEARCH_TERM.findall(query or "")]
+        if not terms:
+            raise TaskValidationError("Search query cannot be empty")
+        
+        # Business rule: User must exist
+        if user_id is not None and not self.user_repository.get_user_by_id(user_id):
+            raise TaskValidationError("User not found")
+        
+        return self.task_repository.search_tasks(terms, limit, offset, user_id=user_id)
+    
+    def get_user_tasks_version(self, user_id: int) -> Tuple[int, Optional[datetime], Optional[datetime]]:
+        """(version, last modified, user created) of a user's tasks, for conditional GETs of their task list"""
+        version = self.user_repository.get_task_list_version(user_id)
+        # Business rule: User must exist
+        if version is None:
+            raise TaskValidationError("User not found")
+        return version
+    
+    def check_user(self, user_id: int) -> None:
+        """Raise unless the user exists"""
+        # Business rule: User must exist
+        if not self.user_repository.get_user_by_id(user_id):
+            raise TaskValidationError("User not found")
+    
+    def get_task_stats(self) -> Tuple[int, int]:
+        """(task_count, completed_count) over all tasks, from the maintained counters"""
+        return self.stats_repository.get_totals()
+    
+    def _paginate(self, fetch, sort_key, cursor: Optional[str], limit: int, **filters) -> Tuple[list, Optional[str]]:
+        """Fetch the page after `cursor` and encode the cursor of the page after it"""
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, datetime, int)
+            except ValueError as e:
+                raise TaskValidationError(str(e))
+        
+        # Fetch one extra row to learn whether another page exists
+        items = fetch(limit + 1, **filters, after=after)
+        if len(items) <= limit:
+            return items, None
+        
+        items = items[:limit]
+        return items, encode_cursor(*sort_key(items[-1]))
+    
     def complete_task(self, task_id: int, user_id: int) -> Task:
         """Mark task as completed for specific user"""
-        task = self.task_repository.get_task_by_id_and_user(task_id, user_id)
-        if not task:
+        # Ownership and "not yet completed" are enforced by the UPDATE itself, race-free
+        task = self.task_repository.complete_task(task_id, user_id)
+        if task:
+            self.stats_repository.apply_deltas({user_id: (0, 1)})
+            self._publish([(TASK_COMPLETED, user_id, {"id": task_id})])
+            return task
+        
+        # Nothing matched: look the task up only to report why
+        if not self._find_task(task_id, user_id):
             raise TaskValidationError("Task not found or you don't have permission")
+        raise TaskValidationError("Task is already completed")
+    
+    def complete_tasks(self, task_ids: List[int], user_id: int) -> List[Tuple[int, Optional[str]]]:
+        """Complete many tasks of a user; returns (task_id, error) for each distinct ID, in order"""
+        return self._apply_batch(
+            self.task_repository.complete_tasks, task_ids, user_id,
+            applied_delta=lambda count: (0, count), completed_error="Task is already completed", event_type=TASK_COMPLETED,
+        )
+    
+    def delete_tasks(self, task_ids: List[int], user_id: int) -> List[Tuple[int, Optional[str]]]:
+        """Delete many tasks of a user; returns (task_id, error) for each distinct ID, in order"""
+        # Business rule: Cannot delete completed tasks - enforced by the guarded DELETE
+        return self._apply_batch(
+            self.task_repository.delete_open_tasks, task_ids, user_id,
+            applied_delta=lambda count: (-count, 0), completed_error="Cannot delete completed tasks", event_type=TASK_DELETED,
+        )
+    
+    def _apply_batch(
+        self, apply, task_ids, user_id: int, applied_delta, completed_error: str, event_type: str
+    ) -> List[Tuple[int, Optional[str]]]:
+        """Run a guarded set-based write over `task_ids` in chunks and explain every ID it skipped"""
+        task_ids = list(dict.fromkeys(task_ids))
+        applied = set()
+        for start in range(0, len(task_ids), BULK_CHUNK_SIZE):
+            applied.update(apply(task_ids[start:start + BULK_CHUNK_SIZE], user_id))
+        if applied:
+            self.stats_repository.apply_deltas({user_id: applied_delta(len(applied))})
+            self._publish([(event_type, user_id, {"id": task_id}) for task_id in task_ids if task_id in applied])
         
-        if task.is_completed:
-            raise TaskValidationError("Task is already completed")
+        # Only the skipped IDs are looked up, to report why
+        skipped = [task_id for task_id in task_ids if task_id not in applied]
+        states = {}
+        for start in range(0, len(skipped), BULK_CHUNK_SIZE):
+            states.update(self.task_repository.get_completion_states(skipped[start:start + BULK_CHUNK_SIZE], user_id))
         
-        task.is_completed = True
-        return self.task_repository.update_task(task)
+        results = []
+        for task_id in task_ids:
+            if task_id in applied:
+                results.append((task_id, None))
+            elif task_id in states:
+                results.append((task_id, completed_error))
+            else:
+                results.append((task_id, "Task not found or you don't have permission"))
+        return results
     
     def delete_task(self, task_id: int, user_id: int) -> None:
         """Delete a task with business rules for specific user"""
-        task = self.task_repository.get_task_by_id_and_user(task_id, user_id)
-        if not task:
-            raise TaskValidationError("Task not found or you don't have permission")
-        
-        # Business rule: Cannot delete completed tasks
-        if task.is_completed:
-            raise TaskValidationError("Cannot delete completed tasks")
+        # Business rule: Cannot delete completed tasks - enforced by the guarded DELETE
+        if self.task_repository.delete_open_task(task_id, user_id):
+            # Only open tasks can be deleted, so the completed count is unchanged
+            self.stats_repository.apply_deltas({user_id: (-1, 0)})
+            self._publish([(TASK_DELETED, user_id, {"id": task_id})])
+            return
         
-        self.task_repository.delete_task(task)
+        if not self._find_task(task_id, user_id):
+            raise TaskValidationError("Task not found or you don't have permission")
+        raise TaskValidationError("Cannot delete completed tasks")
+    
+    def _find_task(self, task_id: int, user_id: int):
+        """The user's task, live or archived; None if they have no such task"""
+        return (
+            self.task_repository.get_task_by_id_and_user(task_id, user_id)
+            or self.task_repository.get_archived_task(task_id, user_id)
+        )
+    
+    def delete_user_tasks(self, user_id: int, limit: int) -> int:
+        """Delete one batch of a user's tasks, completed and archived ones included; returns how many went"""
+        deleted = self.task_repository.delete_user_tasks(user_id, limit)
+        if deleted:
+            completed = sum(1 for _, is_completed in deleted if is_completed)
+            self.stats_repository.apply_deltas({user_id: (-len(deleted), -completed)})
+            self._publish([(TASK_DELETED, user_id, {"id": task_id}) for task_id, _ in deleted])
+        return len(deleted)
+    
+    def archive_completed_tasks(self, completed_before: datetime, limit: int) -> int:
+        """Move one batch of tasks completed before the cutoff to the archive; returns how many moved"""
+        moved = self.task_repository.archive_completed_tasks(completed_before, limit)
+        # Counts are unchanged (archived tasks still count), but the users' live task lists changed
+        self.stats_repository.touch(user_id for _, user_id in moved)
+        self._publish([(TASK_ARCHIVED, user_id, {"id": task_id}) for task_id, user_id in moved])
+        return len(moved)
+    
+    def _publish(self, changes: List[Tuple[str, int, dict]]) -> None:
+        """Announce committed task changes on the change feed"""
+        if self.publisher:
+            self.publisher.publish(changes)
+
+def task_data(task_id: int, title: str, description: Optional[str], is_completed: bool, user_id: int) -> dict:
+    """Change feed payload of a task, shaped like TaskResponse"""
+    return {"id": task_id, "title": title, "description": description, "is_completed": is_completed, "user_id": user_id}
@@ -1,6 +1,10 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from repositories.user_repository import UserRepository
+from repositories.stats_repository import StatsRepository
 from models.user import User
+from services.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 
 class UserValidationError(Exception):
     """Custom exception for user business logic validation"""
@@ -10,9 +14,10 @@ class UserService:
     """Business logic layer for users"""
     
    # Association example
-    def __init__(self, repository: UserRepository):
+    def __init__(self, repository: UserRepository, stats_repository: StatsRepository):
         #UserService stores reference
         self.repository = repository
+        self.stats_repository = stats_repository
     
     def create_user(self, username: str, email: str) -> User:
         ## UserService USES its repository
@@ -21,30 +26,80 @@ class UserService:
         if not username or username.strip() == "":
             raise UserValidationError("Username cannot be empty")
         
-        # Business rule: Username must be unique
-        existing_user = self.repository.get_user_by_username(username.strip())
-        #Direct method call on stored reference
-        if existing_user:
-            raise UserValidationError("Username already exists")
-        
-        # Business rule: Email must be unique
-        existing_email = self.repository.get_user_by_email(email.strip())
-        if existing_email:
-            raise UserValidationError("Email already exists")
-        
         # Business rule: Basic email validation
         if not email or "@" not in email:
             raise UserValidationError("Invalid email format")
         
-        return self.repository.create_user(username.strip(), email.strip())
+        # Business rules: Username and email must be unique - enforced by the unique indexes,
+        # so concurrent signups can't both pass a check and the happy path is a single INSERT
+        try:
+            #Direct method call on stored reference
+            return self.repository.create_user(username.strip(), email.strip())
+        except IntegrityError:
+            # Only a failed signup pays for finding out which one was taken
+            taken = self.repository.get_taken_fields(username.strip(), email.strip())
+            if "username" in taken:
+                raise UserValidationError("Username already exists")
+            if "email" in taken:
+                raise UserValidationError("Email already exists")
+            raise
     
     def get_all_users(self) -> List[User]:
         """Get all users"""
         return self.repository.get_all_users()
     
+    def list_users_with_task_counts(
+        self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[Tuple[User, int, int]], Optional[str]]:
+        """Get one page of users with (total, completed) task counts and the next-page cursor"""
+        return self._paginate(self.repository.get_users_with_task_counts, lambda row: row[0].id, cursor, limit)
+    
+    def list_user_rows_with_task_counts(
+        self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[tuple], Optional[str]]:
+        """Same page as list_users_with_task_counts, as bare column tuples for the fast serialization path"""
+        return self._paginate(self.repository.get_user_rows_with_task_counts, lambda row: row[0], cursor, limit)
+    
+    def get_users_page_version(
+        self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[tuple, Optional[datetime]]:
+        """(stamp, last modified) of the page list_users_with_task_counts returns, for conditional GETs"""
+        # limit + 1, like the page itself: whether a next page exists is part of the response
+        return self.repository.get_users_page_version(limit + 1, after_id=self._decode_after_id(cursor))
+    
+    def _paginate(self, fetch, user_id_of, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+        """Fetch the page after `cursor` and encode the cursor of the page after it"""
+        rows = fetch(limit + 1, after_id=self._decode_after_id(cursor))
+        if len(rows) <= limit:
+            return rows, None
+        
+        rows = rows[:limit]
+        return rows, encode_cursor(user_id_of(rows[-1]))
+    
+    def _decode_after_id(self, cursor: Optional[str]) -> Optional[int]:
+        """The last user ID of the previous page, from its cursor"""
+        if not cursor:
+            return None
+        try:
+            (after_id,) = decode_cursor(cursor, int)
+        except ValueError as e:
+            raise UserValidationError(str(e))
+        return after_id
+    
     def get_user_by_id(self, user_id: int) -> User:
         """Get user by ID with validation"""
         user = self.repository.get_user_by_id(user_id)
         if not user:
             raise UserValidationError("User not found")
         return user
+    
+    def delete_user(self, user_id: int) -> None:
+        """Delete a user once all their tasks are deleted"""
+        user = self.get_user_by_id(user_id)
+        self.stats_repository.delete_user_stats(user_id)
+        self.repository.delete_user(user)
+    
+    def get_user_stats(self, user_id: int) -> Tuple[int, int]:
+        """(task_count, completed_count) of a user, from the maintained counters"""
+        self.get_user_by_id(user_id)
+        return self.stats_repository.get_user_stats(user_id)
@@ -0,0 +1,171 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from middleware.admission import (
+    AdmissionMiddleware, ConcurrencyLimiter, MemoryRateLimiter, NullRateLimiter, RedisRateLimiter, take_token,
+)
+
+class FakeRedis:
+    """Minimal stand-in for a Redis client that runs the token bucket script in Python"""
+
+    def __init__(self):
+        self.data = {}
+
+    def eval(self, script, numkeys, key, rate, burst, now, cost):
+        tokens, updated = self.data.get(key, (burst, now))
+        tokens, retry_after = take_token(tokens, updated, now, rate, burst, cost)
+        self.data[key] = (tokens, now)
+        return str(retry_after).encode()
+
+class FakeAsyncRedis:
+    """The same fake with an awaitable eval, like redis.asyncio; `error` makes every call raise it"""
+
+    def __init__(self, sync, error=None):
+        self.sync = sync
+        self.error = error
+        self.calls = 0
+
+    async def eval(self, *args):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.sync.eval(*args)
+
+class Clock:
+    """Manually advanced time source"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestRateLimiters:
+    """Tests for the token bucket backends"""
+
+    def test_memory_buckets_allow_bursts_then_refill(self):
+        """Test a client gets its burst at once, then tokens at the configured rate"""
+        clock = Clock()
+        limiter = MemoryRateLimiter(rate=2, burst=3, clock=clock)
+
+        assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire("a") == 0.5
+        assert limiter.acquire("b") == 0  # buckets are per client
+        clock.now += 0.5
+        assert limiter.acquire("a") == 0
+        assert limiter.stats() == {"allowed": 5, "limited": 1, "clients": 2}
+
+    def test_memory_buckets_forget_least_recent_clients(self):
+        """Test the bucket table stays bounded"""
+        limiter = MemoryRateLimiter(rate=1, burst=1, max_clients=2, clock=Clock())
+        for client in ("a", "b", "c"):
+            limiter.acquire(client)
+
+        assert list(limiter._buckets) == ["b", "c"]
+
+    def test_redis_buckets_are_shared_between_workers(self):
+        """Test two workers on one Redis draw from the same bucket"""
+        client, clock = FakeRedis(), Clock()
+        first, second = (RedisRateLimiter(client, rate=1, burst=2, clock=clock) for _ in range(2))
+
+        assert first.acquire("a") == second.acquire("a") == 0
+        assert first.acquire("a") == 1.0
+        assert list(client.data) == ["task_tracker:ratelimit:a"]
+
+    def test_redis_buckets_are_awaited_on_the_event_loop(self):
+        """Test the middleware's path awaits the async client, sharing buckets with the sync one"""
+        client, clock = FakeRedis(), Clock()
+        async_client = FakeAsyncRedis(client)
+        limiter = RedisRateLimiter(client, rate=1, burst=2, clock=clock, async_client=async_client)
+
+        async def run():
+            return [await limiter.acquire_async("a") for _ in range(2)]
+
+        assert asyncio.run(run()) == [0, 0]
+        assert limiter.acquire("a") == 1.0
+        assert async_client.calls == 2
+        assert limiter.stats() == {"allowed": 2, "limited": 1, "errors": 0}
+
+    def test_redis_outage_lets_requests_through(self):
+        """Test a Redis error allows the request (fail open) and is counted, rather than failing it"""
+        async_client = FakeAsyncRedis(FakeRedis(), error=ConnectionError("Connection refused"))
+        limiter = RedisRateLimiter(FakeRedis(), rate=1, burst=1, clock=Clock(), async_client=async_client)
+
+        async def run():
+            return [await limiter.acquire_async("a") for _ in range(3)]
+
+        assert asyncio.run(run()) == [0, 0, 0]
+        assert limiter.stats() == {"allowed": 3, "limited": 0, "errors": 3}
+
+class TestConcurrencyLimiter:
+    """Tests for the global in-flight cap and its wait queue"""
+
+    def test_queue_then_reject(self):
+        """Test requests over the limit wait in a bounded queue and get a freed slot in order"""
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=5)
+
+        async def run():
+            assert await limiter.acquire()
+            waiting = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            assert not await limiter.acquire()  # the queue is full
+            limiter.release()
+            assert await asyncio.wait_for(waiting, 5)
+            limiter.release()
+
+        asyncio.run(run())
+        assert limiter.stats() == {"admitted": 2, "queued": 1, "rejected": 1, "timeouts": 0, "in_flight": 0, "waiting": 0}
+
+    def test_wait_times_out(self):
+        """Test a queued request gives up after the queue timeout and leaves the queue"""
+        limiter = ConcurrencyLimiter(limit=1, queue_size=5, queue_timeout=0.01)
+
+        async def run():
+            await limiter.acquire()
+            return await limiter.acquire()
+
+        assert asyncio.run(run()) is False
+        assert limiter.stats()["timeouts"] == 1
+        assert limiter.stats()["waiting"] == 0
+
+class TestAdmissionMiddleware:
+    """Tests for the 429/503 responses"""
+
+    def make_client(self, rate_limiter, concurrency):
+        app = FastAPI()
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        app.add_middleware(AdmissionMiddleware, rate_limiter=rate_limiter, concurrency=concurrency)
+        return TestClient(app)
+
+    def test_rate_limited_clients_get_429(self):
+        """Test a client over its rate is told when to come back"""
+        client = self.make_client(MemoryRateLimiter(rate=0.5, burst=2, clock=Clock()), None)
+
+        statuses = [client.get("/ping").status_code for _ in range(3)]
+        response = client.get("/ping")
+
+        assert statuses == [200, 200, 429]
+        assert response.headers["Retry-After"] == "2"
+
+    def test_saturated_server_sheds_with_503(self):
+        """Test requests that can't get a slot are turned away instead of piling up"""
+        concurrency = ConcurrencyLimiter(limit=0, queue_size=0, queue_timeout=1)
+        client = self.make_client(NullRateLimiter(), concurrency)
+
+        response = client.get("/ping")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert concurrency.stats()["rejected"] == 1
+
+    def test_slots_are_released(self):
+        """Test every finished request gives its slot back"""
+        concurrency = ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1)
+        client = self.make_client(NullRateLimiter(), concurrency)
+
+        assert [client.get("/ping").status_code for _ in range(3)] == [200, 200, 200]
+        assert concurrency.stats()["in_flight"] == 0
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base, get_db, get_read_db
+from database.unit_of_work import UnitOfWork
+from services.factories import create_task_service
+from repositories.stats_repository import StatsRepository
+from services.archival import TaskArchiver
+from main import app
+from cache import get_cache
+
+# Test database setup
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+class TestTaskArchival:
+    """Integration tests for moving completed tasks to the archive"""
+
+    def setup_method(self):
+        """Setup for each test"""
+        Base.metadata.create_all(bind=engine)
+        get_cache().clear()
+        self.client = TestClient(app)
+        self.user_id = self.client.post("/api/users/", json={"username": "testuser", "email": "test@example.com"}).json()["id"]
+        self.task_ids = [
+            self.client.post("/api/tasks/", json={"title": f"Task {i}", "user_id": self.user_id}).json()["id"]
+            for i in range(5)
+        ]
+        # Tasks 0, 1 and 3 are completed
+        for task_id in (self.task_ids[0], self.task_ids[1], self.task_ids[3]):
+            self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+
+    def teardown_method(self):
+        """Cleanup after each test"""
+        Base.metadata.drop_all(bind=engine)
+
+    def archiver(self, batch_size=500):
+        return TaskArchiver(TestingSessionLocal, create_task_service, age=timedelta(0), batch_size=batch_size, pause_seconds=0)
+
+    def user_task_ids(self, **params):
+        response = self.client.get(f"/api/tasks/user/{self.user_id}", params=params)
+        assert response.status_code == 200
+        return [task["id"] for task in response.json()]
+
+    def test_completed_tasks_move_out_of_live_lists(self):
+        """Test archived tasks leave the default listing but stay readable and counted"""
+        before = self.client.get(f"/api/tasks/user/{self.user_id}")
+
+        assert self.archiver().run() == 3
+
+        open_ids = [self.task_ids[2], self.task_ids[4]]
+        assert self.user_task_ids() == open_ids
+        assert self.user_task_ids(include_archived="true") == self.task_ids
+        assert self.user_task_ids(include_archived="true", is_completed="false") == open_ids
+        # The archival changed the live list, so cached copies must not revalidate
+        assert self.client.get(
+            f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": before.headers["ETag"]}
+        ).status_code == 200
+        assert self.client.get("/api/tasks/stats").json() == {"task_count": 5, "completed_count": 3, "open_count": 2}
+        user = self.client.get("/api/users/").json()[0]
+        assert (user["task_count"], user["completed_count"]) == (5, 3)
+
+    def test_archived_tasks_page_and_export_with_live_ones(self):
+        """Test cursor pages and exports merge both stores in order"""
+        self.archiver().run()
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, "include_archived": "true", **({"cursor": cursor} if cursor else {})}
+            response = self.client.get("/api/tasks/", params=params)
+            seen += [task["id"] for task in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        exported = self.client.get("/api/tasks/export", params={"include_archived": "true"}).text.splitlines()
+
+        assert seen == self.task_ids
+        assert len(exported) == 5
+
+    def test_archived_tasks_keep_their_write_rules(self):
+        """Test archived tasks still can't be completed again or deleted"""
+        self.archiver().run()
+
+        completed = self.client.put(f"/api/tasks/{self.task_ids[0]}/complete?user_id={self.user_id}")
+        deleted = self.client.post("/api/tasks/delete", json={"user_id": self.user_id, "task_ids": [self.task_ids[1]]})
+
+        assert completed.json()["detail"] == "Task is already completed"
+        assert deleted.json()["results"] == [{"id": self.task_ids[1], "error": "Cannot delete completed tasks"}]
+
+    def test_runs_in_batches(self):
+        """Test each batch is its own transaction and a run can be capped"""
+        assert self.archiver(batch_size=2).run(max_batches=1) == 2
+        assert self.archiver(batch_size=2).run() == 1
+        assert self.archiver(batch_size=2).run() == 0
+
+    def test_archived_and_deleted_ids_are_never_reused(self):
+        """Test a new task gets a fresh ID after the newest tasks were archived or deleted"""
+        self.client.put(f"/api/tasks/{self.task_ids[4]}/complete?user_id={self.user_id}")
+
+        assert self.archiver().run() == 4
+        self.client.delete(f"/api/tasks/{self.task_ids[2]}?user_id={self.user_id}")
+        new_id = self.client.post("/api/tasks/", json={"title": "New", "user_id": self.user_id}).json()["id"]
+
+        assert new_id > self.task_ids[4]
+        assert self.user_task_ids(include_archived="true") == [*self.task_ids[:2], *self.task_ids[3:], new_id]
+
+    def test_rebuilt_stats_count_archived_tasks(self):
+        """Test recounting the counters includes the archive"""
+        self.archiver().run()
+        db = TestingSessionLocal()
+        try:
+            with UnitOfWork(db):
+                StatsRepository(db).rebuild()
+            assert StatsRepository(db).get_user_stats(self.user_id) == (5, 3)
+        finally:
+            db.close()
@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from config import get_settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The routes pick their session dependencies (AsyncSession or Session) when they are imported,
+# so this module re-runs itself in a child process with ASYNC_MODE on
+in_async_mode = get_settings().async_mode
+
+@pytest.mark.skipif(in_async_mode, reason="already running in async mode")
+def test_routes_in_async_mode(tmp_path):
+    """Run the route tests below against an ASYNC_MODE app on its own database"""
+    env = {
+        **os.environ,
+        "ASYNC_MODE": "true",
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'async.db'}",
+        "JOBS_ENABLED": "false",
+    }
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", os.path.abspath(__file__)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+    assert result.returncode == 0, result.stdout[-5000:] + result.stderr[-2000:]
+    assert "4 passed" in result.stdout
+
+@pytest.mark.skipif(not in_async_mode, reason="run by test_routes_in_async_mode with ASYNC_MODE on")
+class TestAsyncRoutes:
+    """The HTTP routes served on an AsyncSession through aiosqlite"""
+
+    @pytest.fixture(autouse=True)
+    def client(self):
+        from main import app
+        from cache import get_cache
+
+        get_cache().clear()
+        # Entering the client runs the startup hooks, which migrate the database
+        with TestClient(app) as client:
+            self.client = client
+            self.user_id = client.post(
+                "/api/users/", json={"username": f"user{os.urandom(4).hex()}", "email": f"{os.urandom(4).hex()}@example.com"}
+            ).json()["id"]
+            yield
+
+    def test_create_task(self):
+        """Test creating a task, and its validation error, in async mode"""
+        created = self.client.post("/api/tasks/", json={"title": "Async", "user_id": self.user_id})
+        orphan = self.client.post("/api/tasks/", json={"title": "Orphan", "user_id": 999999})
+
+        assert created.status_code == 200
+        assert created.json()["title"] == "Async"
+        assert orphan.status_code == 400
+
+    def test_list_with_conditional_get(self):
+        """Test a user's listing and its 304 revalidation until the next write"""
+        self.client.post("/api/tasks/", json={"title": "First", "user_id": self.user_id})
+        listed = self.client.get(f"/api/tasks/user/{self.user_id}")
+        etag = listed.headers["ETag"]
+
+        revalidated = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": etag})
+        self.client.post("/api/tasks/", json={"title": "Second", "user_id": self.user_id})
+        changed = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": etag})
+
+        assert [task["title"] for task in listed.json()] == ["First"]
+        assert revalidated.status_code == 304
+        assert changed.status_code == 200
+        assert [task["title"] for task in changed.json()] == ["First", "Second"]
+
+    def test_bulk_create(self):
+        """Test a bulk import reports each item and creates the valid ones"""
+        items = [{"title": "One", "user_id": self.user_id}, {"title": ""}, {"title": "Two", "user_id": self.user_id}]
+
+        response = self.client.post("/api/tasks/bulk", json=items)
+
+        assert response.status_code == 200
+        assert (response.json()["created"], response.json()["failed"]) == (2, 1)
+        assert len(self.client.get(f"/api/tasks/user/{self.user_id}").json()) == 2
+
+    def test_routes_use_async_sessions(self):
+        """Test requests are served through the async engine"""
+        from database.connection import async_engines
+
+        self.client.get(f"/api/tasks/user/{self.user_id}")
+
+        assert False in async_engines
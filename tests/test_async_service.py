@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from database.connection import Base, to_async_url
+from repositories.task_repository import TaskRepository
+from repositories.user_repository import UserRepository
+from repositories.stats_repository import StatsRepository
+from services.async_service import AsyncSessionService, ThreadpoolService
+from services.task_service import TaskService, TaskValidationError
+from services.user_service import UserService
+
+def build_services(db):
+    """Wire both services onto one session, as the routes do"""
+    user_repository, stats_repository = UserRepository(db), StatsRepository(db)
+    return UserService(user_repository, stats_repository), TaskService(TaskRepository(db), user_repository, stats_repository)
+
+class TestAsyncService:
+    """Tests for the awaitable service facades used by async routes"""
+    
+    def test_to_async_url_maps_drivers(self):
+        """Test sync URLs are mapped onto their async drivers"""
+        assert to_async_url("sqlite:///./tasks.db") == "sqlite+aiosqlite:///./tasks.db"
+        assert to_async_url("postgresql+psycopg2://u:p@db/tasks") == "postgresql+asyncpg://u:p@db/tasks"
+        with pytest.raises(ValueError):
+            to_async_url("mysql://u:p@db/tasks")
+    
+    def test_async_session_service_runs_business_logic(self):
+        """Test services run unchanged on an AsyncSession through aiosqlite"""
+        async def scenario():
+            engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            
+            async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                users = AsyncSessionService(session, lambda db: build_services(db)[0])
+                tasks = AsyncSessionService(session, lambda db: build_services(db)[1])
+                
+                user = await users.create_user("asyncuser", "async@example.com")
+                # The failed call below rolls back, expiring loaded objects; keep plain values
+                user_id = user.id
+                task = await tasks.create_task("Async Task", user_id)
+                task_id = task.id
+                with pytest.raises(TaskValidationError, match="User not found"):
+                    await tasks.create_task("Orphan", 999)
+                page, next_cursor = await tasks.list_user_tasks(user_id)
+                titles = [t.title for t in page]
+            await engine.dispose()
+            return task_id, [t.id for t in page], titles, next_cursor
+        
+        task_id, page_ids, titles, next_cursor = asyncio.run(scenario())
+        
+        assert page_ids == [task_id]
+        assert titles == ["Async Task"]
+        assert next_cursor is None
+    
+    def test_threadpool_service_awaits_sync_methods(self):
+        """Test the sync-mode facade returns the wrapped service's results"""
+        class EchoService:
+            def echo(self, value, suffix=""):
+                return value + suffix
+        
+        session = Mock()
+        
+        result = asyncio.run(ThreadpoolService(EchoService(), session).echo("task", suffix="!"))
+        
+        assert result == "task!"
+        session.commit.assert_called_once()
+    
+    def test_threadpool_service_rolls_back_on_error(self):
+        """Test a failing call rolls its unit of work back instead of committing"""
+        class FailingService:
+            def fail(self):
+                raise TaskValidationError("Task title cannot be empty")
+        session = Mock()
+        
+        with pytest.raises(TaskValidationError):
+            asyncio.run(ThreadpoolService(FailingService(), session).fail())
+        
+        session.rollback.assert_called_once()
+        session.commit.assert_not_called()
@@ -0,0 +1,34 @@
+from benchmarks.results import compare, percentile, summarize
+from benchmarks.scaling import speedups
+
+class TestBenchmarkResults:
+    """Tests for benchmark summaries and baseline comparison"""
+    
+    def test_summarize_reports_percentiles_and_throughput(self):
+        """Test nearest-rank percentiles over a known distribution"""
+        summary = summarize([float(ms) for ms in range(1, 101)], elapsed_s=2.0, errors=1)
+        
+        assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.0, 95.0, 99.0)
+        assert summary["throughput_rps"] == 50.0
+        assert summary["errors"] == 1
+        assert percentile([], 95) == 0.0
+    
+    def test_compare_flags_only_slowdowns_beyond_threshold(self):
+        """Test regressions are reported per benchmark against the baseline"""
+        baseline = {"load": {"GET /a": {"p95_ms": 10.0}, "GET /b": {"p95_ms": 10.0}}, "micro": {"x": {"p95_ms": 1.0}}}
+        current = {"load": {"GET /a": {"p95_ms": 11.5}, "GET /b": {"p95_ms": 13.0}, "GET /new": {"p95_ms": 99.0}}}
+        
+        regressions = compare(current, baseline, threshold=0.2)
+        
+        assert [regression.name for regression in regressions] == ["load: GET /b"]
+        assert round(regressions[0].change, 2) == 0.3
+    
+    def test_speedups_are_relative_to_fewest_workers(self):
+        """Test scaling results are grouped per endpoint and normalized to the smallest worker count"""
+        results = {
+            "GET /a [workers=1]": {"throughput_rps": 100.0},
+            "GET /a [workers=4]": {"throughput_rps": 350.0},
+            "GET /b [workers=2]": {"throughput_rps": 80.0},
+        }
+        
+        assert speedups(results) == {"GET /a": {1: 1.0, 4: 3.5}, "GET /b": {2: 1.0}}
@@ -0,0 +1,134 @@
+import threading
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from cache.backends import MemoryCache, RedisCache
+from database.connection import Base
+from database.unit_of_work import UnitOfWork
+from repositories.task_repository import TaskRepository
+from repositories.user_repository import UserRepository
+
+class FakeRedis:
+    """Minimal in-memory stand-in for a Redis client"""
+    
+    def __init__(self):
+        self.data = {}
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+    
+    def scan_iter(self, match):
+        return [key for key in self.data if key.startswith(match.rstrip("*"))]
+
+class TestCacheBackends:
+    """Unit tests for cache backends"""
+    
+    def test_memory_cache_evicts_least_recently_used(self):
+        """Test the entry bound evicts the least recently used key"""
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+    
+    def test_memory_cache_expires_entries(self):
+        """Test entries expire after their TTL"""
+        now = [0.0]
+        cache = MemoryCache(ttl_seconds=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        
+        now[0] = 9.9
+        assert cache.get("a") == 1
+        now[0] = 10.0
+        assert cache.get("a") is None
+        assert cache.evictions == 1
+    
+    def test_memory_cache_counts_every_lookup_across_threads(self):
+        """Test hit/miss counters stay exact under concurrent gets"""
+        cache = MemoryCache()
+        cache.set("a", 1)
+        
+        def lookups():
+            for i in range(2000):
+                cache.get("a" if i % 2 else "b")
+        
+        threads = [threading.Thread(target=lookups) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (8000, 8000)
+    
+    def test_redis_cache_round_trips_json(self):
+        """Test the Redis backend stores JSON under its prefix"""
+        client = FakeRedis()
+        cache = RedisCache(client, prefix="test:")
+        cache.set("user:id:1", {"id": 1, "username": "testuser"})
+        
+        assert cache.get("user:id:1") == {"id": 1, "username": "testuser"}
+        assert list(client.data) == ["test:user:id:1"]
+        cache.clear()
+        assert cache.get("user:id:1") is None
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
+
+@pytest.mark.parametrize("make_cache", [MemoryCache, lambda: RedisCache(FakeRedis())])
+class TestCachedRepositories:
+    """Tests for read-through caching and invalidation in repositories"""
+    
+    def setup_method(self):
+        """Setup for each test"""
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: self.statements.append(args[2]))
+    
+    def teardown_method(self):
+        """Cleanup after each test"""
+        self.db.close()
+        self.engine.dispose()
+    
+    def test_user_lookup_served_from_cache(self, make_cache):
+        """Test repeated user lookups hit the database once"""
+        repository = UserRepository(self.db, make_cache())
+        with UnitOfWork(self.db):
+            user = repository.create_user("testuser", "test@example.com")
+        self.statements.clear()
+        
+        first = repository.get_user_by_id(user.id)
+        second = repository.get_user_by_id(user.id)
+        
+        assert (first.username, second.username) == ("testuser", "testuser")
+        assert len(self.statements) == 1
+    
+    def test_task_write_invalidates_user_task_list(self, make_cache):
+        """Test creating a task drops the user's cached task lists"""
+        cache = make_cache()
+        repository = TaskRepository(self.db, cache)
+        with UnitOfWork(self.db):
+            user = UserRepository(self.db, cache).create_user("testuser", "test@example.com")
+            repository.create_task("First", user.id)
+        
+        assert [task.title for task in repository.get_tasks_page(10, user_id=user.id)] == ["First"]
+        self.statements.clear()
+        assert [task.title for task in repository.get_tasks_page(10, user_id=user.id)] == ["First"]
+        assert self.statements == []
+        
+        with UnitOfWork(self.db):
+            repository.create_task("Second", user.id)
+            # Not invalidated before commit: other sessions can't see "Second" yet either
+            assert [task.title for task in repository.get_tasks_page(10, user_id=user.id)] == ["First"]
+        assert [task.title for task in repository.get_tasks_page(10, user_id=user.id)] == ["First", "Second"]
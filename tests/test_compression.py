@@ -0,0 +1,115 @@
+import gzip
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from middleware.compression import CompressionMiddleware, CompressionStats, encoder_factories, is_compressible, negotiate
+
+ROWS = [{"id": i, "title": f"Task {i}", "is_completed": False} for i in range(200)]
+
+class TestNegotiation:
+    """Tests for choosing an encoding and what to compress"""
+
+    @pytest.mark.parametrize("accept_encoding, expected", [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("gzip;q=0, identity", None),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("", None),
+    ])
+    def test_client_preference_then_ours(self, accept_encoding, expected):
+        """Test the client's q-values win and ties go to the server's order"""
+        assert negotiate(accept_encoding, ["br", "gzip"]) == expected
+
+    @pytest.mark.parametrize("content_type, expected", [
+        ("application/json", True),
+        ("application/x-ndjson", True),
+        ("text/csv; charset=utf-8", True),
+        ("application/problem+json", True),
+        ("text/event-stream", False),
+        ("image/png", False),
+        ("", False),
+    ])
+    def test_compressible_types(self, content_type, expected):
+        """Test only text-like bodies are compressed, and never server-sent events"""
+        assert is_compressible(content_type) is expected
+
+class TestCompressionMiddleware:
+    """Tests for the compressed responses"""
+
+    def make_client(self, stats=None):
+        app = FastAPI()
+
+        @app.get("/rows")
+        def rows():
+            return JSONResponse(ROWS, headers={"ETag": '"v1"'})
+
+        @app.get("/small")
+        def small():
+            return {"ok": True}
+
+        @app.get("/image")
+        def image():
+            return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse((f"{row}\n".encode() for row in ROWS), media_type="application/x-ndjson")
+
+        @app.get("/events")
+        def events():
+            return StreamingResponse((f"data: {i}\n\n" * 200 for i in range(3)), media_type="text/event-stream")
+
+        app.add_middleware(CompressionMiddleware, encoders=encoder_factories(["gzip"]), minimum_size=500, stats=stats)
+        return TestClient(app)
+
+    def raw(self, client, path, accept_encoding="gzip"):
+        with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+            return response, b"".join(response.iter_raw())
+
+    def test_large_json_is_gzipped(self):
+        """Test a list page is compressed, keeps an exact length and weakens its validator"""
+        stats = CompressionStats()
+        response, body = self.raw(self.make_client(stats), "/rows")
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Content-Length"] == str(len(body))
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"] == 'W/"v1"'
+        uncompressed = len(gzip.decompress(body))
+        assert stats.stats() == {"responses": 1, "bytes_in": uncompressed, "bytes_out": len(body)}
+        assert len(body) < uncompressed / 4
+
+    def test_identity_when_not_accepted(self):
+        """Test clients that don't ask for compression get the plain body, marked as negotiated"""
+        response, body = self.raw(self.make_client(), "/rows", accept_encoding="identity")
+
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert json.loads(body) == ROWS
+
+    @pytest.mark.parametrize("path", ["/small", "/image"])
+    def test_small_and_binary_bodies_pass_through(self, path):
+        """Test bodies under the threshold and non-text types are left alone"""
+        response, body = self.raw(self.make_client(), path)
+
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Content-Length"] == str(len(body))
+
+    def test_streams_are_compressed_chunk_by_chunk(self):
+        """Test a streamed export stays streamed (no length) and decodes to the whole body"""
+        response, body = self.raw(self.make_client(), "/stream")
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in response.headers
+        assert gzip.decompress(body).decode().splitlines() == [str(row) for row in ROWS]
+
+    def test_event_streams_are_never_compressed(self):
+        """Test server-sent events go out as the app sends them"""
+        response, body = self.raw(self.make_client(), "/events")
+
+        assert "Content-Encoding" not in response.headers
+        assert body.startswith(b"data: 0\n\n")
@@ -0,0 +1,148 @@
+import threading
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from config import Settings
+from database.connection import create_db_engine, engine_options, for_writes
+from database.unit_of_work import UnitOfWork, after_commit
+
+class TestConnection:
+    """Tests for engine configuration"""
+    
+    def test_sqlite_profile_applied_on_connect(self, tmp_path):
+        """Test every new SQLite connection gets the WAL profile"""
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'profile.db'}", Settings())
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        engine.dispose()
+    
+    def test_read_only_engine_rejects_writes(self, tmp_path):
+        """Test the read engine cannot modify the database"""
+        url = f"sqlite:///{tmp_path / 'readonly.db'}"
+        writer = create_db_engine(url, Settings())
+        with writer.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        reader = create_db_engine(url, Settings(), read_only=True)
+        
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM items")).scalar() == 0
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO items (id) VALUES (1)"))
+        writer.dispose()
+        reader.dispose()
+    
+    def test_pool_settings_from_environment(self, monkeypatch):
+        """Test pool options come from settings, except for in-memory SQLite"""
+        monkeypatch.setenv("DB_POOL_SIZE", "20")
+        monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+        settings = Settings()
+        
+        options = engine_options("postgresql://u:p@db/tasks", settings)
+        
+        assert options["pool_size"] == 20
+        assert options["pool_pre_ping"] is False
+        assert "pool_size" not in engine_options("sqlite://", settings)
+    
+    def test_workers_default_to_one_with_per_process_backends(self, monkeypatch):
+        """Test several workers are only the default once no backend keeps per-process state"""
+        for name in ("WORKERS", "WEB_CONCURRENCY", "RATE_LIMIT_PER_SECOND"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setattr("os.cpu_count", lambda: 8)
+        
+        monkeypatch.setenv("CACHE_BACKEND", "memory")
+        assert Settings().workers == 1
+        monkeypatch.setenv("CACHE_BACKEND", "redis")
+        monkeypatch.setenv("EVENTS_BACKEND", "redis")
+        assert Settings().workers == 8
+        monkeypatch.setenv("RATE_LIMIT_PER_SECOND", "10")
+        assert Settings().workers == 1
+        monkeypatch.setenv("WORKERS", "4")
+        assert Settings().workers == 4
+    
+    def test_unit_of_work_commits_once_and_rolls_back_atomically(self, tmp_path):
+        """Test a unit of work spans several writes, and savepoints nest inside it"""
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'uow.db'}", Settings())
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        session = sessionmaker(bind=engine)()
+        
+        with pytest.raises(RuntimeError):
+            with UnitOfWork(session):
+                session.execute(text("INSERT INTO items (id) VALUES (1)"))
+                session.execute(text("INSERT INTO items (id) VALUES (2)"))
+                raise RuntimeError("job failed half-way")
+        with UnitOfWork(session):
+            session.execute(text("INSERT INTO items (id) VALUES (3)"))
+            with pytest.raises(OperationalError):
+                with session.begin_nested():
+                    session.execute(text("INSERT INTO missing (id) VALUES (4)"))
+            session.execute(text("INSERT INTO items (id) VALUES (5)"))
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT id FROM items ORDER BY id")).scalars().all() == [3, 5]
+        session.close()
+        engine.dispose()
+    
+    def test_failing_after_commit_callback_is_isolated(self, tmp_path):
+        """Test a callback that raises neither fails the commit nor skips the callbacks after it"""
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'callbacks.db'}", Settings())
+        session = sessionmaker(bind=engine)()
+        ran = []
+        
+        def failing_publish():
+            raise ConnectionError("redis unreachable")
+        
+        with UnitOfWork(session):
+            session.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+            after_commit(session, failing_publish)
+            after_commit(session, lambda: ran.append("invalidate"))
+        
+        assert ran == ["invalidate"]
+        session.close()
+        engine.dispose()
+    
+    def test_write_sessions_wait_for_the_sqlite_write_lock(self, tmp_path):
+        """Test a write session that reads first is not failed by a concurrent writer"""
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'writers.db'}", Settings())
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        Session = sessionmaker(bind=for_writes(engine))
+        
+        def other_writer():
+            with Session() as other, UnitOfWork(other):
+                other.execute(text("INSERT INTO items (id) VALUES (2)"))
+        
+        with Session() as session, UnitOfWork(session):
+            session.execute(text("SELECT COUNT(*) FROM items")).scalar()
+            thread = threading.Thread(target=other_writer)
+            thread.start()
+            time.sleep(0.2)  # a deferred transaction would now lose the race and fail on its write
+            session.execute(text("INSERT INTO items (id) VALUES (1)"))
+        thread.join()
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT id FROM items ORDER BY id")).scalars().all() == [1, 2]
+        engine.dispose()
+    
+    def test_post_fork_gives_workers_fresh_pools_and_clients(self):
+        """Test the gunicorn post_fork hook drops inherited connection pools and client singletons"""
+        import gunicorn_conf
+        from cache import get_cache
+        from database.connection import engine
+        from events import get_broker
+        from middleware import get_concurrency_limiter, get_rate_limiter
+        
+        pool, cache, broker = engine.pool, get_cache(), get_broker()
+        rate_limiter, concurrency = get_rate_limiter(), get_concurrency_limiter()
+        gunicorn_conf.post_fork(None, None)
+        
+        assert engine.pool is not pool
+        assert get_cache() is not cache
+        assert get_broker() is not broker
+        assert get_rate_limiter() is not rate_limiter
+        assert get_concurrency_limiter() is not concurrency
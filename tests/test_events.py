@@ -0,0 +1,186 @@
+import asyncio
+import threading
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base, get_db, get_read_db
+from database.unit_of_work import UnitOfWork
+from events import RESET, SUBSCRIBED, ChangePublisher, MemoryBroker, RedisBroker
+from events.broker import parse_event_id
+from api.responses import sse_stream
+from main import app
+from cache import get_cache
+
+# Test database setup
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+def collect(broker, count, **kwargs):
+    """The first `count` items a new subscriber gets"""
+    async def run():
+        items = []
+        async for item in broker.listen(**kwargs):
+            items.append(item)
+            if len(items) == count:
+                return items
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+class TestEventBroker:
+    """Unit tests for the change feed broker"""
+
+    def test_resume_replays_only_the_users_events_after_the_id(self):
+        """Test a subscriber resuming from an ID gets the later events of its user, in order"""
+        broker = MemoryBroker()
+        broker.publish([("task.created", 1, {"id": 1}), ("task.created", 2, {"id": 2})])
+        first_id = collect(broker, 1, after=f"{broker._origin()[0]}-0")[0].id
+        broker.publish([("task.completed", 1, {"id": 1}), ("task.deleted", 1, {"id": 1})])
+
+        events = collect(broker, 2, user_id=1, after=first_id)
+
+        assert [(event.type, event.user_id) for event in events] == [("task.completed", 1), ("task.deleted", 1)]
+
+    def test_live_events_wake_subscribers(self):
+        """Test events published from another thread reach a waiting subscriber"""
+        broker = MemoryBroker()
+
+        async def run():
+            events = broker.listen(user_id=7)
+            assert (await events.__anext__()).type == SUBSCRIBED
+            pending = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(broker.publish, [("task.created", 8, {"id": 1}), ("task.created", 7, {"id": 2})])
+            event = await asyncio.wait_for(pending, 5)
+            await events.aclose()
+            return event
+
+        assert asyncio.run(run()).data == {"id": 2}
+
+    def test_unknown_or_evicted_position_resets(self):
+        """Test resuming from an ID no longer buffered (or from another process) sends a reset"""
+        broker = MemoryBroker(buffer_size=2)
+        broker.publish([("task.created", 1, {"id": i}) for i in range(3)])
+
+        evicted = collect(broker, 1, after=f"{broker._origin()[0]}-0")[0]
+        foreign = collect(broker, 1, after="1-1")[0]
+
+        assert evicted.type == foreign.type == RESET
+        # The reset carries the position to carry on from after reloading
+        assert evicted.id == broker._buffer[-1].id
+
+    def test_idle_subscribers_get_heartbeats(self):
+        """Test a quiet feed yields None so connections can be kept alive"""
+        broker = MemoryBroker(heartbeat_seconds=0.01)
+        assert collect(broker, 3)[1:] == [None, None]
+
+    def test_publisher_waits_for_commit(self):
+        """Test events of a rolled back transaction are never published"""
+        broker = MemoryBroker()
+        db = TestingSessionLocal()
+        try:
+            with UnitOfWork(db):
+                ChangePublisher(db, broker).publish([("task.created", 1, {"id": 1})])
+                assert broker.published == 0
+            try:
+                with UnitOfWork(db):
+                    ChangePublisher(db, broker).publish([("task.created", 1, {"id": 2})])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        finally:
+            db.close()
+
+        assert [event.data for event in broker._buffer] == [{"id": 1}]
+
+    def test_redis_publish_does_not_block_the_caller(self):
+        """Test publishing hands the XADD round trip to a sender thread, in order and surviving failures"""
+        executing, release = threading.Event(), threading.Event()
+        sent = []
+
+        class SlowPipeline:
+            def __init__(self):
+                self.commands = []
+
+            def xadd(self, stream, fields, maxlen, approximate):
+                self.commands.append(fields["data"])
+
+            def execute(self):
+                executing.set()
+                release.wait(5)
+                if '"fail"' in self.commands[0]:
+                    raise ConnectionError("redis unreachable")
+                sent.extend(self.commands)
+
+        class SlowRedis:
+            def pipeline(self, transaction):
+                return SlowPipeline()
+
+        broker = RedisBroker(SlowRedis(), None)
+        broker.publish([("task.created", 1, {"id": "fail"})])
+        assert executing.wait(5)
+        broker.publish([("task.created", 1, {"id": 1}), ("task.created", 1, {"id": 2})])
+        broker.publish([("task.deleted", 1, {"id": 1})])
+
+        assert sent == []  # returned while Redis was still "busy"
+        release.set()
+        assert broker.flush(timeout=5)
+        assert sent == ['{"id": 1}', '{"id": 2}', '{"id": 1}']
+
+    def test_sse_encoding(self):
+        """Test events become id/event/data frames and heartbeats comments"""
+        broker = MemoryBroker()
+        broker.publish([("task.created", 1, {"id": 5})])
+
+        async def run():
+            async def events():
+                yield broker._buffer[0]
+                yield None
+            return [chunk async for chunk in sse_stream(events())]
+
+        retry, frame, heartbeat = asyncio.run(run())
+        assert retry.startswith(b"retry:")
+        assert frame.startswith(b"id: %s\nevent: task.created\ndata: {" % broker._buffer[0].id.encode())
+        assert heartbeat == b": keepalive\n\n"
+
+class TestChangeFeedRoutes:
+    """Integration tests for the change feed endpoints"""
+
+    def setup_method(self):
+        """Setup for each test"""
+        Base.metadata.create_all(bind=engine)
+        get_cache().clear()
+        self.client = TestClient(app)
+        self.user_id = self.client.post("/api/users/", json={"username": "testuser", "email": "test@example.com"}).json()["id"]
+
+    def teardown_method(self):
+        """Cleanup after each test"""
+        Base.metadata.drop_all(bind=engine)
+
+    def test_websocket_receives_task_writes(self):
+        """Test a subscriber sees its user's task writes as they commit"""
+        with self.client.websocket_connect(f"/api/tasks/ws?user_id={self.user_id}") as socket:
+            subscribed = socket.receive_json()
+            task_id = self.client.post("/api/tasks/", json={"title": "Task", "user_id": self.user_id}).json()["id"]
+            self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+            created, completed = socket.receive_json(), socket.receive_json()
+
+        assert subscribed["type"] == "subscribed"
+        assert created["type"] == "task.created"
+        assert parse_event_id(created["id"]) > parse_event_id(subscribed["id"])
+        assert created["data"]["title"] == "Task"
+        assert completed == {"id": completed["id"], "type": "task.completed", "user_id": self.user_id, "data": {"id": task_id}}
+
+    def test_stream_unknown_user_fails(self):
+        """Test subscribing to a missing user's changes is a 404"""
+        response = self.client.get("/api/tasks/stream?user_id=999")
+        assert response.status_code == 404
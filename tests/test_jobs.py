@@ -0,0 +1,231 @@
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base, get_db, get_read_db
+from jobs import handlers
+from jobs.handlers import HANDLERS
+from jobs.worker import JobWorkerPool
+from models.job import Job
+from models.task import Task
+from models.user import User
+from services.job_service import JOB_REBUILD_STATS, JobValidationError
+from main import app
+from cache import get_cache
+from config import get_settings
+
+# Test database setup
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+class TestBackgroundJobs:
+    """Integration tests for queuing jobs over the API and running them on a worker"""
+
+    def setup_method(self):
+        """Setup for each test"""
+        Base.metadata.create_all(bind=engine)
+        get_cache().clear()
+        self.client = TestClient(app)
+        self.user_id = self.client.post("/api/users/", json={"username": "testuser", "email": "test@example.com"}).json()["id"]
+
+    def teardown_method(self):
+        """Cleanup after each test"""
+        Base.metadata.drop_all(bind=engine)
+
+    def pool(self, handlers=HANDLERS, **kwargs):
+        return JobWorkerPool(TestingSessionLocal, handlers, **kwargs)
+
+    def job(self, job_id):
+        response = self.client.get(f"/api/jobs/{job_id}")
+        assert response.status_code == 200
+        return response.json()
+
+    def test_bulk_import_job(self):
+        """Test a queued import reports its progress and a BulkTaskResponse-shaped result"""
+        items = [{"title": "One", "user_id": self.user_id}, {"title": ""}, {"title": "Two", "user_id": self.user_id}]
+
+        queued = self.client.post("/api/tasks/bulk/jobs", json=items)
+        assert queued.status_code == 202
+        assert (queued.json()["status"], queued.json()["total"]) == ("queued", 2)
+
+        assert self.pool().run_once()
+        job = self.job(queued.json()["id"])
+
+        assert (job["status"], job["progress"], job["attempts"]) == ("succeeded", 2, 1)
+        assert (job["result"]["created"], job["result"]["failed"]) == (2, 1)
+        assert [item["index"] for item in job["result"]["results"]] == [0, 1, 2]
+        assert job["result"]["results"][1]["error"] is not None
+        assert len(self.client.get(f"/api/tasks/user/{self.user_id}").json()) == 2
+
+    def test_failed_attempts_are_retried_with_backoff(self):
+        """Test a failing job goes back on the queue for later and succeeds on a later attempt"""
+        calls = []
+
+        def flaky(context):
+            calls.append(context.attempt)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return {"ok": True}
+
+        job_id = self.client.post("/api/tasks/stats/rebuild").json()["id"]
+        pool = self.pool({JOB_REBUILD_STATS: flaky})
+        pool._backoff = lambda attempt: 60
+
+        assert pool.run_once()
+        job = self.job(job_id)
+        assert (job["status"], job["attempts"], job["error"]) == ("queued", 1, "RuntimeError: database is locked")
+        assert not pool.run_once()  # not due yet
+
+        with TestingSessionLocal() as db:
+            retry = db.get(Job, job_id)
+            assert (retry.run_after - retry.updated_at).total_seconds() >= 59
+            retry.run_after = retry.updated_at
+            db.commit()
+        assert pool.run_once()
+        job = self.job(job_id)
+        assert (job["status"], job["attempts"], job["result"]) == ("succeeded", 2, {"ok": True})
+        assert pool.stats()["retried"] == pool.stats()["succeeded"] == 1
+        assert calls == [1, 2]
+
+    def test_backoff_grows_and_is_capped(self):
+        """Test retry delays stay within the exponential bound and the cap"""
+        pool = self.pool(retry_base_seconds=2, retry_max_seconds=10)
+
+        assert all(0 <= pool._backoff(1) <= 2 for _ in range(50))
+        assert all(0 <= pool._backoff(3) <= 8 for _ in range(50))
+        assert all(0 <= pool._backoff(10) <= 10 for _ in range(50))
+
+    def test_validation_errors_fail_without_retry(self):
+        """Test a job that can never succeed fails on its first attempt"""
+        def invalid(context):
+            raise JobValidationError("Nothing to rebuild")
+
+        job_id = self.client.post("/api/tasks/stats/rebuild").json()["id"]
+        pool = self.pool({JOB_REBUILD_STATS: invalid}, retry_base_seconds=0)
+
+        assert pool.run_once()
+        assert not pool.run_once()
+        job = self.job(job_id)
+        assert (job["status"], job["error"], job["attempts"]) == ("failed", "Nothing to rebuild", 1)
+        assert job["finished_at"] is not None
+        assert pool.stats()["failed"] == 1
+
+    def test_delete_user_job(self):
+        """Test deleting a user runs in the background and removes their tasks with them"""
+        for i in range(3):
+            self.client.post("/api/tasks/", json={"title": f"Task {i}", "user_id": self.user_id})
+
+        queued = self.client.delete(f"/api/users/{self.user_id}")
+        assert queued.status_code == 202
+        assert self.client.get(f"/api/users/{self.user_id}").status_code == 200
+
+        self.pool().run_once()
+        job = self.job(queued.json()["id"])
+
+        assert (job["status"], job["result"]) == ("succeeded", {"deleted_tasks": 3})
+        assert self.client.get(f"/api/users/{self.user_id}").status_code == 404
+        assert self.client.get("/api/tasks/stats").json()["task_count"] == 0
+
+    def test_deleted_user_ids_and_validators_are_never_reused(self):
+        """Test the next signup gets a fresh ID, and a user recreated under an old ID gets a fresh ETag"""
+        self.client.post("/api/tasks/", json={"title": "Alice's", "user_id": self.user_id})
+        etag = self.client.get(f"/api/tasks/user/{self.user_id}").headers["ETag"]
+        self.client.delete(f"/api/users/{self.user_id}")
+        self.pool().run_once()
+
+        bob = self.client.post("/api/users/", json={"username": "bob", "email": "bob@example.com"}).json()["id"]
+        # Postgres and SQLite never hand the ID out again, but a restore or manual insert could
+        with TestingSessionLocal() as db:
+            db.execute(insert(User).values(id=self.user_id, username="mallory", email="mallory@example.com"))
+            db.commit()
+        self.client.post("/api/tasks/", json={"title": "Mallory's", "user_id": self.user_id})
+        revalidated = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": etag})
+
+        assert bob > self.user_id
+        assert revalidated.status_code == 200
+        assert [task["title"] for task in revalidated.json()] == ["Mallory's"]
+
+    def test_delete_unknown_user(self):
+        """Test no job is queued for a user that doesn't exist"""
+        response = self.client.delete("/api/users/999")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User not found"
+
+    def test_unknown_job(self):
+        """Test polling a job that doesn't exist"""
+        response = self.client.get("/api/jobs/999")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Job not found"
+
+    def test_retried_import_resumes_from_checkpoint(self, monkeypatch):
+        """Test a retry skips the chunks an earlier attempt committed, creating each task once"""
+        create_task_service = handlers.create_task_service
+        chunks = []
+
+        def failing_second_chunk(db):
+            chunks.append(db)
+            if len(chunks) == 2:
+                raise RuntimeError("connection lost")
+            return create_task_service(db)
+
+        monkeypatch.setattr(handlers, "BULK_CHUNK_SIZE", 2)
+        monkeypatch.setattr(handlers, "create_task_service", failing_second_chunk)
+        items = [{"title": f"Task {i}", "user_id": self.user_id} for i in range(5)]
+        job_id = self.client.post("/api/tasks/bulk/jobs", json=items).json()["id"]
+        pool = self.pool(retry_base_seconds=0)
+
+        pool.run_once()
+        # Checkpoints carry only the counters; per-item results went to their own rows
+        assert (self.job(job_id)["status"], self.job(job_id)["progress"]) == ("queued", 2)
+        assert self.job(job_id)["result"] == {"created": 2, "failed": 0}
+        pool.run_once()
+        job = self.job(job_id)
+
+        assert (job["status"], job["progress"], job["result"]["created"]) == ("succeeded", 5, 5)
+        assert [item["index"] for item in job["result"]["results"]] == [0, 1, 2, 3, 4]
+        with TestingSessionLocal() as db:
+            assert db.scalar(select(func.count()).select_from(Task)) == 5
+
+    def test_long_steps_keep_their_job_claimed(self):
+        """Test a step outlasting the stale timeout isn't claimed again while its worker heartbeats"""
+        job_id = self.client.post("/api/tasks/stats/rebuild").json()["id"]
+        other = self.pool(stale_seconds=0.3)
+        claimed_again = []
+
+        def slow(context):
+            time.sleep(0.6)
+            claimed_again.append(other.run_once())
+            return {"ok": True}
+
+        pool = self.pool({JOB_REBUILD_STATS: slow}, heartbeat_seconds=0.05, stale_seconds=0.3)
+
+        assert pool.run_once()
+        assert claimed_again == [False]
+        assert (self.job(job_id)["status"], self.job(job_id)["attempts"]) == ("succeeded", 1)
+
+    def test_bulk_job_size_is_bounded(self, monkeypatch):
+        """Test imports too large to queue are refused before anything is stored"""
+        monkeypatch.setattr(get_settings(), "bulk_max_items", 2)
+        monkeypatch.setattr(get_settings(), "bulk_max_bytes", 1000)
+        items = [{"title": f"Task {i}", "user_id": self.user_id} for i in range(3)]
+
+        too_many = self.client.post("/api/tasks/bulk/jobs", json=items)
+        too_large = self.client.post("/api/tasks/bulk/jobs", json=[{"title": "x" * 1000, "user_id": self.user_id}])
+
+        assert too_many.status_code == too_large.status_code == 413
+        assert too_many.json()["detail"] == "A bulk import is limited to 2 items"
+        with TestingSessionLocal() as db:
+            assert db.scalar(select(func.count()).select_from(Job)) == 0
@@ -0,0 +1,121 @@
+import threading
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from database.connection import Base
+from database.migrations import load_migrations, run_migrations, schema_migrations
+import models.task  # noqa: F401 - registers the models on Base.metadata
+import models.user  # noqa: F401
+import models.user_task_stats  # noqa: F401
+import models.task_archive  # noqa: F401
+import models.job  # noqa: F401
+from repositories.task_repository import TaskRepository
+
+def schema(engine):
+    """Tables, columns and index names of a database (migration bookkeeping excluded)"""
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table)),
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_migrations"
+    }
+
+class TestMigrations:
+    """Tests for the versioned migration runner"""
+    
+    def test_migrations_match_models(self, tmp_path):
+        """Test migrating an empty database yields the schema the models declare"""
+        migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+        declared = create_engine(f"sqlite:///{tmp_path / 'declared.db'}")
+        Base.metadata.create_all(declared)
+        
+        applied = run_migrations(migrated)
+        
+        assert applied == [migration.version for migration in load_migrations()]
+        assert schema(migrated) == schema(declared)
+    
+    def test_run_migrations_is_noop_when_current(self, tmp_path):
+        """Test a second run applies nothing and keeps data"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+        run_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (username, email) VALUES ('keep', 'keep@example.com')"))
+        
+        assert run_migrations(engine) == []
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM users")).scalar() == 1
+    
+    def test_concurrent_workers_apply_migrations_once(self, tmp_path):
+        """Test workers starting together don't race each other"""
+        url = f"sqlite:///{tmp_path / 'tasks.db'}"
+        results = []
+        def worker():
+            results.append(run_migrations(create_engine(url)))
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sorted(len(applied) for applied in results) == [0, 0, 0, len(load_migrations())]
+        with create_engine(url).connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(load_migrations())
+    
+    def test_task_ids_above_archived_ones_after_upgrade(self, tmp_path):
+        """Test tasks rebuilt for AUTOINCREMENT keep their rows and search, and new IDs skip archived ones"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+        earlier = [migration for migration in load_migrations() if migration.version < "0008"]
+        with engine.begin() as conn:
+            schema_migrations.create(conn)
+            for migration in earlier:
+                migration.module.upgrade(conn)
+                conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+            conn.execute(text("INSERT INTO users (id, username, email) VALUES (1, 'keep', 'keep@example.com')"))
+            conn.execute(text("INSERT INTO tasks (id, title, user_id) VALUES (1, 'Buy milk', 1)"))
+            conn.execute(text(
+                "INSERT INTO tasks_archive (id, title, is_completed, user_id, archived_at) "
+                "VALUES (7, 'Archived', 1, 1, CURRENT_TIMESTAMP)"
+            ))
+        
+        assert run_migrations(engine)[0] == "0008"
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO tasks (title, user_id) VALUES ('New', 1)"))
+            assert conn.execute(text("SELECT id, title FROM tasks ORDER BY id")).all() == [(1, "Buy milk"), (8, "New")]
+            assert conn.execute(text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH 'milk OR new'")).scalars().all() == [1, 8]
+    
+    def test_deleted_user_ids_are_not_reused_after_upgrade(self, tmp_path):
+        """Test users rebuilt for AUTOINCREMENT keep their rows and unique indexes, and IDs only go up"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+        run_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (username, email) VALUES ('alice', 'alice@example.com'), ('bob', 'bob@example.com')"))
+            conn.execute(text("DELETE FROM users WHERE username = 'bob'"))
+            conn.execute(text("INSERT INTO users (username, email) VALUES ('carol', 'carol@example.com')"))
+            
+            assert conn.execute(text("SELECT id, username FROM users ORDER BY id")).all() == [(1, "alice"), (3, "carol")]
+            assert {"ix_users_username", "ix_users_email"} <= {index["name"] for index in inspect(conn).get_indexes("users")}
+    
+    def test_legacy_timestamps_page_after_upgrade(self, tmp_path):
+        """Test tasks created by the old second-precision server default are all reached by keyset paging"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+        with engine.begin() as conn:
+            schema_migrations.create(conn)
+            for migration in load_migrations():
+                if migration.version < "0011":
+                    migration.module.upgrade(conn)
+                    conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+            conn.execute(text("INSERT INTO users (username, email) VALUES ('keep', 'keep@example.com')"))
+            for i in range(5):
+                conn.execute(text("INSERT INTO tasks (title, user_id, created_at) VALUES (:title, 1, '2024-01-01 10:00:00')"), {"title": f"Task {i}"})
+        
+        run_migrations(engine)
+        with Session(engine) as db:
+            repository, seen, after = TaskRepository(db), [], None
+            while page := repository.get_tasks_page(2, after=after):
+                seen += [task.id for task in page]
+                after = (page[-1].created_at, page[-1].id)
+        
+        assert seen == [1, 2, 3, 4, 5]
@@ -0,0 +1,94 @@
+import os
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base, get_db, get_read_db
+from database.instrumentation import RequestStats
+from main import app
+from cache import get_cache
+from config import get_settings
+from middleware.metrics import Metrics
+
+# Test database setup
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+def server_timing(response) -> dict:
+    """Server-Timing entries by name"""
+    entries = {}
+    for entry in response.headers["server-timing"].split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+class TestProfiling:
+    """Tests for request instrumentation, /metrics and opt-in profiling"""
+    
+    def setup_method(self):
+        """Setup for each test"""
+        Base.metadata.create_all(bind=engine)
+        get_cache().clear()
+        self.client = TestClient(app)
+        self.user_id = self.client.post(
+            "/api/users/", json={"username": "testuser", "email": "test@example.com"}
+        ).json()["id"]
+        for i in range(3):
+            self.client.post("/api/tasks/", json={"title": f"Task {i}", "user_id": self.user_id})
+    
+    def teardown_method(self):
+        """Cleanup after each test"""
+        Base.metadata.drop_all(bind=engine)
+    
+    def test_server_timing_reports_queries_rows_and_serialization(self):
+        """Test each response carries its SQL, hydration and serialization figures"""
+        response = self.client.get("/api/tasks/")
+        
+        timing = server_timing(response)
+        assert int(timing["db"]["desc"].strip('"').split()[0]) >= 1
+        assert timing["orm"]["desc"] == '"3 rows"'
+        assert float(timing["serialize"]["dur"]) > 0
+        assert float(timing["app"]["dur"]) >= float(timing["db"]["dur"])
+        assert not any(name.startswith("sql-") for name in timing)
+    
+    def test_metrics_endpoint_exposes_request_and_cache_counters(self):
+        """Test /metrics renders per-route counters in Prometheus format"""
+        self.client.get("/api/tasks/")
+        
+        body = self.client.get("/metrics").text
+        
+        assert 'http_requests_total{method="GET",route="/api/tasks/",status="200"}' in body
+        assert 'orm_rows_hydrated_total{route="/api/tasks/"}' in body
+        assert "# TYPE cache_hits_total counter" in body
+    
+    def test_profile_header_requires_token_and_writes_profile(self, monkeypatch, tmp_path):
+        """Test X-Profile only works with the configured token and saves a profile"""
+        monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+        assert "x-profile-file" not in self.client.get("/api/tasks/", headers={"X-Profile": "anything"}).headers
+        
+        monkeypatch.setattr(get_settings(), "profile_token", "s3cret")
+        response = self.client.get("/api/tasks/", headers={"X-Profile": "s3cret"})
+        
+        assert os.path.exists(tmp_path / response.headers["x-profile-file"])
+        assert "sql-1" in server_timing(response)
+    
+    def test_duration_histogram_is_cumulative(self):
+        """Test each bucket counts the requests at or under its bound"""
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.observe("GET", "/a", 200, 0.05, RequestStats())
+        
+        body = metrics.render()
+        
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/a",le="0.01"} 0' in body
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/a",le="0.1"} 1' in body
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/a",le="+Inf"} 1' in body
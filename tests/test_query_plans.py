@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import create_engine, delete, select, text, update
+from sqlalchemy.orm import Session
+from database.migrations import run_migrations
+from models.task import Task
+from models.user import User
+from repositories.task_repository import TASK_ROW_COLUMNS, TaskRepository
+from repositories.user_repository import UserRepository
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    """A migrated SQLite database with enough rows for the planner to prefer indexes"""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'tasks.db'}")
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (username, email) VALUES ('a', 'a@example.com'), ('b', 'b@example.com')"))
+        conn.execute(
+            text("INSERT INTO tasks (title, user_id, is_completed, created_at) VALUES ('Task', :user_id, :is_completed, CURRENT_TIMESTAMP)"),
+            [{"user_id": i % 2 + 1, "is_completed": i % 3 == 0} for i in range(500)],
+        )
+        conn.execute(text("ANALYZE"))
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+def plan(db, statement):
+    """EXPLAIN QUERY PLAN details of a statement, one line per step"""
+    sql = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return [row[3] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+def assert_no_scan(steps):
+    """Fail on full table scans and sorts the index order should have made unnecessary"""
+    assert not [step for step in steps if step.startswith("SCAN tasks") or "TEMP B-TREE" in step], steps
+
+class TestQueryPlans:
+    """The hot task queries must stay index lookups"""
+
+    @pytest.mark.parametrize("is_completed, index", [
+        (None, "ix_tasks_user_id_created_at_id_covering"),
+        (False, "ix_tasks_user_id_is_completed_created_at_id"),
+        (True, "ix_tasks_user_id_is_completed_created_at_id"),
+    ])
+    def test_user_task_pages_use_ordered_index(self, db, is_completed, index):
+        """Test a user's listing, filtered or not, walks an index in page order"""
+        after = (datetime.now(timezone.utc), 10)
+        statement = TaskRepository(db)._page_statement(select(*TASK_ROW_COLUMNS), 20, 1, is_completed, None, None, after)
+
+        steps = plan(db, statement)
+
+        assert_no_scan(steps)
+        assert any(step.startswith(f"SEARCH tasks USING INDEX {index} (user_id=?") for step in steps), steps
+
+    def test_user_task_counts_are_index_only(self, db):
+        """Test the users page counts tasks from covering indexes without reading task rows"""
+        statement = UserRepository(db)._task_counts_statement((User.id,), 20, None)
+
+        steps = plan(db, statement)
+
+        assert_no_scan(steps)
+        assert "SEARCH tasks USING COVERING INDEX ix_tasks_user_id_created_at_id_covering (user_id=?)" in steps
+        assert "SEARCH tasks USING COVERING INDEX ix_tasks_user_id_is_completed_created_at_id (user_id=? AND is_completed=?)" in steps
+        assert "SEARCH tasks_archive USING COVERING INDEX ix_tasks_archive_user_id_created_at_id (user_id=?)" in steps
+
+    @pytest.mark.parametrize("statement", [
+        select(Task).where(Task.id == 1, Task.user_id == 1),
+        update(Task).where(Task.id == 1, Task.user_id == 1, Task.is_completed == False).values(is_completed=True),
+        delete(Task).where(Task.id.in_([1, 2]), Task.user_id == 1, Task.is_completed == False),
+    ])
+    def test_single_task_access_uses_primary_key(self, db, statement):
+        """Test reads and guarded writes of a user's task go straight to the row"""
+        steps = plan(db, statement)
+
+        assert_no_scan(steps)
+        assert any("PRIMARY KEY" in step for step in steps), steps
+
+    def test_user_delete_cascade_finds_tasks_by_index(self, db):
+        """Test loading a user's tasks (as the User.tasks cascade does) is an index search"""
+        steps = plan(db, select(Task).where(Task.user_id == 1))
+
+        assert_no_scan(steps)
+        assert steps[0].startswith("SEARCH tasks USING INDEX"), steps
@@ -1,14 +1,20 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
-from database.connection import Base, get_db
+from database.connection import Base, get_db, get_read_db
+from repositories.stats_repository import StatsRepository
 from main import app
+from cache import get_cache
+from cache.backends import MemoryCache
+from config import get_settings
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 def override_get_db():
     try:
@@ -18,6 +24,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 class TestTaskRoutes:
     """Integration tests for Task API endpoints"""
@@ -25,6 +32,7 @@ class TestTaskRoutes:
     def setup_method(self):
         """Setup for each test"""
         Base.metadata.create_all(bind=engine)
+        get_cache().clear()
         self.client = TestClient(app)
         
         # Create a test user for task operations
@@ -98,3 +106,305 @@ class TestTaskRoutes:
         response = self.client.delete(f"/api/tasks/{task_id}?user_id={self.user_id}")
         assert response.status_code == 200
         assert "deleted successfully" in response.json()["message"]
+    
+    def test_get_all_tasks_paginates_with_cursor(self):
+        """Test keyset pagination walks every task exactly once"""
+        for i in range(5):
+            self.client.post("/api/tasks/", json={"title": f"Task {i}", "user_id": self.user_id})
+        
+        titles = []
+        response = self.client.get("/api/tasks/?limit=2")
+        while True:
+            assert response.status_code == 200
+            titles.extend(task["title"] for task in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            response = self.client.get(f"/api/tasks/?limit=2&cursor={cursor}")
+        
+        assert titles == [f"Task {i}" for i in range(5)]
+    
+    def test_get_user_tasks_filters_by_completion(self):
+        """Test filtering a user's tasks by completion state"""
+        first = self.client.post("/api/tasks/", json={"title": "Done", "user_id": self.user_id}).json()
+        self.client.post("/api/tasks/", json={"title": "Open", "user_id": self.user_id})
+        self.client.put(f"/api/tasks/{first['id']}/complete?user_id={self.user_id}")
+        
+        response = self.client.get(f"/api/tasks/user/{self.user_id}?is_completed=false")
+        assert response.status_code == 200
+        assert [task["title"] for task in response.json()] == ["Open"]
+        assert "X-Next-Cursor" not in response.headers
+    
+    def test_get_all_tasks_invalid_cursor_fails(self):
+        """Test that a tampered cursor is rejected"""
+        response = self.client.get("/api/tasks/?cursor=not-a-cursor")
+        assert response.status_code == 400
+        assert "Invalid cursor" in response.json()["detail"]
+    
+    def test_create_tasks_bulk_reports_per_item_errors(self):
+        """Test bulk creation keeps valid items and reports invalid ones"""
+        response = self.client.post(
+            "/api/tasks/bulk",
+            json=[
+                {"title": "First", "user_id": self.user_id},
+                {"title": "  ", "user_id": self.user_id},
+                {"title": "Orphan", "user_id": 999},
+                {"user_id": self.user_id},
+                {"title": "Second", "description": "Details", "user_id": self.user_id},
+            ],
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["failed"] == 3
+        errors = [result["error"] for result in data["results"]]
+        assert errors[0] is None and errors[4] is None
+        assert errors[1] == "Task title cannot be empty"
+        assert errors[2] == "User not found"
+        assert "title" in errors[3]
+        
+        titles = [task["title"] for task in self.client.get(f"/api/tasks/user/{self.user_id}").json()]
+        assert titles == ["First", "Second"]
+    
+    def test_create_tasks_bulk_accepts_ndjson(self):
+        """Test bulk creation from an NDJSON body"""
+        body = "\n".join([
+            json.dumps({"title": "First", "user_id": self.user_id}),
+            "{not json",
+            json.dumps({"title": "Second", "user_id": self.user_id}),
+        ])
+        response = self.client.post(
+            "/api/tasks/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["index"] for result in results] == [0, 1, 2]
+        assert results[1]["error"] == "Invalid JSON"
+        assert results[0]["id"] is not None and results[2]["id"] is not None
+    
+    @pytest.mark.parametrize("content_type", ["application/json", "application/x-ndjson"])
+    def test_create_tasks_bulk_is_bounded(self, monkeypatch, content_type):
+        """Test a body over the item or byte limit is refused before any task is created"""
+        monkeypatch.setattr(get_settings(), "bulk_max_items", 2)
+        monkeypatch.setattr(get_settings(), "bulk_max_bytes", 1000)
+        items = [{"title": f"Task {i}", "user_id": self.user_id} for i in range(3)]
+        
+        def post(items):
+            body = json.dumps(items) if content_type == "application/json" else "\n".join(map(json.dumps, items))
+            return self.client.post("/api/tasks/bulk", content=body, headers={"Content-Type": content_type})
+        
+        too_many = post(items)
+        too_large = post([{"title": "x" * 1000, "user_id": self.user_id}])
+        
+        assert too_many.status_code == too_large.status_code == 413
+        assert too_many.json()["detail"] == "A bulk import is limited to 2 items"
+        assert too_large.json()["detail"] == "Request body is limited to 1000 bytes"
+        assert self.client.get(f"/api/tasks/user/{self.user_id}").json() == []
+    
+    def test_complete_task_twice_fails(self):
+        """Test the guarded update refuses to complete a task twice"""
+        task_id = self.client.post("/api/tasks/", json={"title": "Test Task", "user_id": self.user_id}).json()["id"]
+        self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        
+        response = self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        assert response.status_code == 400
+        assert "already completed" in response.json()["detail"]
+    
+    def test_delete_completed_task_fails(self):
+        """Test the guarded delete keeps completed tasks"""
+        task_id = self.client.post("/api/tasks/", json={"title": "Test Task", "user_id": self.user_id}).json()["id"]
+        self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        
+        response = self.client.delete(f"/api/tasks/{task_id}?user_id={self.user_id}")
+        assert response.status_code == 400
+        assert "Cannot delete completed tasks" in response.json()["detail"]
+        assert len(self.client.get(f"/api/tasks/user/{self.user_id}").json()) == 1
+    
+    def test_write_statements_use_returning(self):
+        """Test create and complete are each a single task statement"""
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        # Warm the user lookup cache so only the write itself is measured
+        self.client.post("/api/tasks/", json={"title": "Warm", "user_id": self.user_id})
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            task_id = self.client.post("/api/tasks/", json={"title": "Test Task", "user_id": self.user_id}).json()["id"]
+            self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        
+        # Each write is one RETURNING statement plus one counter upsert
+        writes = [statement for statement in statements if "user_task_stats" not in statement]
+        assert len(writes) == 2
+        assert all("RETURNING" in statement for statement in writes)
+        assert len(statements) == 4
+    
+    def test_fast_json_list_matches_default_path(self, monkeypatch):
+        """Test the orjson column path returns exactly what the Pydantic path does"""
+        for i in range(3):
+            self.client.post("/api/tasks/", json={"title": f"Task {i}", "description": "d", "user_id": self.user_id})
+        default = self.client.get(f"/api/tasks/user/{self.user_id}?limit=2")
+        
+        monkeypatch.setattr(get_settings(), "fast_json", True)
+        fast = self.client.get(f"/api/tasks/user/{self.user_id}?limit=2")
+        fast_all = self.client.get("/api/tasks/?limit=2")
+        
+        assert fast.status_code == 200
+        assert fast.json() == default.json() == fast_all.json()
+        assert fast.headers["X-Next-Cursor"] == default.headers["X-Next-Cursor"]
+    
+    def test_export_streams_ndjson_and_csv(self):
+        """Test the export streams every matching task in either format"""
+        for i in range(3):
+            self.client.post("/api/tasks/", json={"title": f"Task {i}", "user_id": self.user_id})
+        task_id = self.client.get(f"/api/tasks/user/{self.user_id}").json()[0]["id"]
+        self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        
+        response = self.client.get(f"/api/tasks/export?user_id={self.user_id}&is_completed=false")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["title"] for row in rows] == ["Task 1", "Task 2"]
+        assert rows[0]["created_at"] is not None
+        
+        response = self.client.get("/api/tasks/export?format=csv")
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0] == "id,title,description,is_completed,user_id,created_at"
+        assert len(lines) == 4
+    
+    def test_export_unknown_user_fails(self):
+        """Test exporting tasks of a missing user fails before streaming"""
+        assert self.client.get("/api/tasks/export?user_id=999").status_code == 404
+        assert self.client.get("/api/tasks/export?format=xml").status_code == 422
+    
+    def test_search_ranks_matches_and_follows_writes(self):
+        """Test full-text search ranking, prefixes, user scope and index sync"""
+        other_id = self.client.post("/api/users/", json={"username": "other", "email": "o@example.com"}).json()["id"]
+        milk = self.client.post("/api/tasks/", json={"title": "Buy milk", "user_id": self.user_id}).json()["id"]
+        self.client.post("/api/tasks/", json={"title": "Shopping", "description": "milk and bread", "user_id": self.user_id})
+        self.client.post("/api/tasks/", json={"title": "Buy milk too", "user_id": other_id})
+        
+        titles = [task["title"] for task in self.client.get(f"/api/tasks/search?q=milk&user_id={self.user_id}").json()]
+        assert titles == ["Buy milk", "Shopping"]
+        assert len(self.client.get("/api/tasks/search?q=mi*").json()) == 3
+        assert self.client.get("/api/tasks/search?q=mi").json() == []
+        assert len(self.client.get("/api/tasks/search?q=milk&limit=1&offset=2").json()) == 1
+        
+        self.client.delete(f"/api/tasks/{milk}?user_id={self.user_id}")
+        titles = [task["title"] for task in self.client.get(f"/api/tasks/search?q=milk&user_id={self.user_id}").json()]
+        assert titles == ["Shopping"]
+        assert self.client.get("/api/tasks/search?q=%20").status_code == 400
+    
+    def test_search_without_full_text_index_falls_back_to_like(self, monkeypatch):
+        """Test databases without a search index still match every term, in title or description"""
+        self.client.post("/api/tasks/", json={"title": "Buy milk", "user_id": self.user_id})
+        self.client.post("/api/tasks/", json={"title": "Shopping", "description": "Milk and bread", "user_id": self.user_id})
+        self.client.post("/api/tasks/", json={"title": "snake_case", "user_id": self.user_id})
+        self.client.post("/api/tasks/", json={"title": "snakeXcase", "user_id": self.user_id})
+        monkeypatch.setattr(engine.dialect, "name", "mysql")
+        
+        def titles(query):
+            response = self.client.get("/api/tasks/search", params={"q": query})
+            assert response.status_code == 200
+            return [task["title"] for task in response.json()]
+        
+        assert titles("milk") == ["Buy milk", "Shopping"]
+        assert titles("milk bread") == ["Shopping"]
+        assert titles("snake_case") == ["snake_case"]
+    
+    def test_stats_follow_task_writes_and_rebuild_repairs_drift(self):
+        """Test the counters track create/bulk/complete/delete and rebuild recounts them"""
+        first = self.client.post("/api/tasks/", json={"title": "First", "user_id": self.user_id}).json()["id"]
+        second = self.client.post("/api/tasks/", json={"title": "Second", "user_id": self.user_id}).json()["id"]
+        self.client.post("/api/tasks/bulk", json=[{"title": "Bulk", "user_id": self.user_id}, {"title": "", "user_id": self.user_id}])
+        self.client.put(f"/api/tasks/{first}/complete?user_id={self.user_id}")
+        self.client.delete(f"/api/tasks/{second}?user_id={self.user_id}")
+        
+        expected = {"task_count": 2, "completed_count": 1, "open_count": 1}
+        assert self.client.get(f"/api/users/{self.user_id}/stats").json() == {"user_id": self.user_id, **expected}
+        assert self.client.get("/api/tasks/stats").json() == expected
+        assert self.client.get("/api/users/999/stats").status_code == 404
+        
+        db = TestingSessionLocal()
+        try:
+            db.execute(text("UPDATE user_task_stats SET task_count = 42"))
+            assert StatsRepository(db).rebuild() == 1
+            db.commit()
+        finally:
+            db.close()
+        assert self.client.get("/api/tasks/stats").json() == expected
+    
+    def test_batch_complete_and_delete_report_per_id_outcomes(self):
+        """Test batch endpoints apply ownership and completion rules per task"""
+        other_id = self.client.post("/api/users/", json={"username": "other", "email": "o@example.com"}).json()["id"]
+        mine = [self.client.post("/api/tasks/", json={"title": f"Mine {i}", "user_id": self.user_id}).json()["id"] for i in range(3)]
+        theirs = self.client.post("/api/tasks/", json={"title": "Theirs", "user_id": other_id}).json()["id"]
+        self.client.put(f"/api/tasks/{mine[0]}/complete?user_id={self.user_id}")
+        
+        response = self.client.post("/api/tasks/complete", json={"user_id": self.user_id, "task_ids": [mine[0], mine[1], theirs]})
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 1
+        assert [result["error"] for result in response.json()["results"]] == [
+            "Task is already completed", None, "Task not found or you don't have permission"
+        ]
+        
+        response = self.client.post("/api/tasks/delete", json={"user_id": self.user_id, "task_ids": mine + [999]})
+        assert [result["error"] for result in response.json()["results"]] == [
+            "Cannot delete completed tasks", "Cannot delete completed tasks", None,
+            "Task not found or you don't have permission",
+        ]
+        remaining = {task["id"] for task in self.client.get(f"/api/tasks/user/{self.user_id}").json()}
+        assert remaining == {mine[0], mine[1]}
+        assert self.client.get(f"/api/users/{self.user_id}/stats").json()["task_count"] == 2
+    
+    def test_user_tasks_conditional_get(self):
+        """Test an unchanged task list is a 304 after one lookup, and any write changes its ETag"""
+        task_id = self.client.post("/api/tasks/", json={"title": "Task", "user_id": self.user_id}).json()["id"]
+        first = self.client.get(f"/api/tasks/user/{self.user_id}")
+        etag = first.headers["ETag"]
+        
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            cached = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": etag})
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["ETag"] == etag
+        assert len(statements) == 1
+        
+        # Other filters are other representations
+        assert self.client.get(f"/api/tasks/user/{self.user_id}?limit=1", headers={"If-None-Match": etag}).status_code == 200
+        modified = self.client.get(
+            f"/api/tasks/user/{self.user_id}", headers={"If-Modified-Since": first.headers["Last-Modified"]}
+        )
+        assert modified.status_code == 304
+        
+        self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        changed = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert changed.json()[0]["is_completed"] == True
+        assert self.client.get("/api/tasks/user/999", headers={"If-None-Match": etag}).status_code == 404
+    
+    def test_user_tasks_not_stale_when_another_worker_writes(self, monkeypatch):
+        """Test a write in another process (which can't drop this one's cache) still shows up with its ETag"""
+        task_id = self.client.post("/api/tasks/", json={"title": "Task", "user_id": self.user_id}).json()["id"]
+        etag = self.client.get(f"/api/tasks/user/{self.user_id}").headers["ETag"]
+        
+        # The write runs with another worker's cache, so this process's cached page is never invalidated
+        monkeypatch.setattr("services.factories.get_cache", lambda: MemoryCache())
+        self.client.put(f"/api/tasks/{task_id}/complete?user_id={self.user_id}")
+        monkeypatch.undo()
+        fresh = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": etag})
+        
+        assert fresh.status_code == 200
+        assert fresh.json()[0]["is_completed"] == True
+        revalidated = self.client.get(f"/api/tasks/user/{self.user_id}", headers={"If-None-Match": fresh.headers["ETag"]})
+        assert revalidated.status_code == 304
@@ -1,8 +1,10 @@
 import pytest
+from datetime import datetime
 from unittest.mock import Mock
 from services.task_service import TaskService, TaskValidationError
 from models.task import Task
 from models.user import User
+from services.pagination import decode_cursor
 
 class TestTaskService:
     """Unit tests for TaskService (Business Logic Layer)"""
@@ -11,7 +13,8 @@ class TestTaskService:
         """Setup for each test"""
         self.mock_task_repository = Mock()
         self.mock_user_repository = Mock()
-        self.service = TaskService(self.mock_task_repository, self.mock_user_repository)
+        self.mock_stats_repository = Mock()
+        self.service = TaskService(self.mock_task_repository, self.mock_user_repository, self.mock_stats_repository)
     
     def test_create_task_success(self):
         """Test successful task creation"""
@@ -64,32 +67,139 @@ class TestTaskService:
     def test_complete_task_success(self):
         """Test successful task completion"""
         # Arrange
-        task = Task(id=1, title="Test Task", user_id=1, is_completed=False)
-        self.mock_task_repository.get_task_by_id_and_user.return_value = task
-        self.mock_task_repository.update_task.return_value = task
+        task = Task(id=1, title="Test Task", user_id=1, is_completed=True)
+        self.mock_task_repository.complete_task.return_value = task
         
         # Act
         result = self.service.complete_task(1, 1)
         
         # Assert
         assert result.is_completed == True
-        self.mock_task_repository.update_task.assert_called_once()
+        self.mock_task_repository.complete_task.assert_called_once_with(1, 1)
+        self.mock_task_repository.get_task_by_id_and_user.assert_not_called()
     
     def test_complete_task_not_owner_raises_error(self):
         """Test completing task not owned by user raises error"""
         # Arrange
+        self.mock_task_repository.complete_task.return_value = None
         self.mock_task_repository.get_task_by_id_and_user.return_value = None
+        self.mock_task_repository.get_archived_task.return_value = None
         
         # Act & Assert
         with pytest.raises(TaskValidationError, match="Task not found or you don't have permission"):
             self.service.complete_task(1, 999)
     
+    def test_complete_task_already_completed_raises_error(self):
+        """Test completing a completed task raises error"""
+        # Arrange
+        self.mock_task_repository.complete_task.return_value = None
+        self.mock_task_repository.get_task_by_id_and_user.return_value = Task(id=1, user_id=1, is_completed=True)
+        
+        # Act & Assert
+        with pytest.raises(TaskValidationError, match="Task is already completed"):
+            self.service.complete_task(1, 1)
+    
     def test_delete_completed_task_raises_error(self):
         """Test that deleting completed task raises error"""
         # Arrange
         task = Task(id=1, title="Test Task", user_id=1, is_completed=True)
+        self.mock_task_repository.delete_open_task.return_value = False
         self.mock_task_repository.get_task_by_id_and_user.return_value = task
         
         # Act & Assert
         with pytest.raises(TaskValidationError, match="Cannot delete completed tasks"):
             self.service.delete_task(1, 1)
+    
+    def test_list_tasks_returns_next_cursor_when_more_rows(self):
+        """Test that a full page yields a cursor for the next one"""
+        # Arrange
+        tasks = [Task(id=i, title=f"Task {i}", user_id=1, created_at=datetime(2025, 6, 1)) for i in range(1, 4)]
+        self.mock_task_repository.get_tasks_page.return_value = tasks
+        
+        # Act
+        result, next_cursor = self.service.list_tasks(limit=2)
+        
+        # Assert
+        assert [task.id for task in result] == [1, 2]
+        assert decode_cursor(next_cursor, datetime, int) == (datetime(2025, 6, 1), 2)
+        self.mock_task_repository.get_tasks_page.assert_called_once_with(
+            3, user_id=None, is_completed=None, created_after=None, created_before=None, after=None, include_archived=False,
+            version=None,
+        )
+    
+    def test_list_user_tasks_user_not_found_raises_error(self):
+        """Test that listing tasks of a missing user raises validation error"""
+        # Arrange
+        self.mock_user_repository.get_user_by_id.return_value = None
+        
+        # Act & Assert
+        with pytest.raises(TaskValidationError, match="User not found"):
+            self.service.list_user_tasks(999)
+    
+    def test_create_tasks_bulk_checks_users_once(self):
+        """Test bulk creation validates all users with one lookup"""
+        # Arrange
+        self.mock_user_repository.get_existing_user_ids.return_value = {1}
+        self.mock_task_repository.create_tasks_bulk.return_value = [10, 11]
+        
+        # Act
+        results = self.service.create_tasks_bulk([("A", 1, None), ("B", 2, None), ("", 1, None), (" C ", 1, "d")])
+        
+        # Assert
+        assert results == [(10, None), (None, "User not found"), (None, "Task title cannot be empty"), (11, None)]
+        self.mock_user_repository.get_existing_user_ids.assert_called_once()
+        self.mock_task_repository.create_tasks_bulk.assert_called_once_with([
+            {"title": "A", "description": None, "user_id": 1},
+            {"title": "C", "description": "d", "user_id": 1},
+        ])
+    
+    def test_search_tasks_keeps_only_words_and_prefixes(self):
+        """Test search strips query syntax down to (term, is_prefix) pairs"""
+        # Arrange
+        self.mock_task_repository.search_tasks.return_value = []
+        
+        # Act
+        self.service.search_tasks('buy "mil* OR -x', limit=10)
+        
+        # Assert
+        self.mock_task_repository.search_tasks.assert_called_once_with(
+            [("buy", False), ("mil", True), ("OR", False), ("x", False)], 10, 0, user_id=None
+        )
+    
+    def test_search_tasks_empty_query_raises_error(self):
+        """Test that a query without words raises validation error"""
+        with pytest.raises(TaskValidationError, match="Search query cannot be empty"):
+            self.service.search_tasks(" *- ")
+    
+    def test_task_writes_update_stats(self):
+        """Test create, complete and delete each apply their counter deltas"""
+        # Arrange
+        self.mock_user_repository.get_user_by_id.return_value = User(id=1, username="testuser", email="test@example.com")
+        self.mock_task_repository.delete_open_task.return_value = True
+        
+        # Act
+        self.service.create_task("Test Task", 1)
+        self.service.complete_task(10, 1)
+        self.service.delete_task(11, 1)
+        
+        # Assert
+        assert [c.args[0] for c in self.mock_stats_repository.apply_deltas.call_args_list] == [
+            {1: (1, 0)}, {1: (0, 1)}, {1: (-1, 0)}
+        ]
+    
+    def test_complete_tasks_explains_each_skipped_id(self):
+        """Test batch completion reports per-ID outcomes and updates stats once"""
+        # Arrange
+        self.mock_task_repository.complete_tasks.return_value = [1, 3]
+        self.mock_task_repository.get_completion_states.return_value = {2: True}
+        
+        # Act
+        results = self.service.complete_tasks([1, 2, 3, 1, 4], user_id=7)
+        
+        # Assert
+        assert results == [
+            (1, None), (2, "Task is already completed"), (3, None), (4, "Task not found or you don't have permission")
+        ]
+        self.mock_task_repository.complete_tasks.assert_called_once_with([1, 2, 3, 4], 7)
+        self.mock_task_repository.get_completion_states.assert_called_once_with([2, 4], 7)
+        self.mock_stats_repository.apply_deltas.assert_called_once_with({7: (0, 2)})
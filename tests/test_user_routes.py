@@ -1,14 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, event, insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
-from database.connection import Base, get_db
+from database.connection import Base, get_db, get_read_db
+from models.user import User
 from main import app
+from cache import get_cache
+from config import get_settings
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 def override_get_db():
     try:
@@ -18,6 +22,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 class TestUserRoutes:
     """Integration tests for User API endpoints"""
@@ -25,6 +30,7 @@ class TestUserRoutes:
     def setup_method(self):
         """Setup for each test"""
         Base.metadata.create_all(bind=engine)
+        get_cache().clear()
         self.client = TestClient(app)
     
     def teardown_method(self):
@@ -54,7 +60,25 @@ class TestUserRoutes:
         )
         assert response.status_code == 400
         assert "Username already exists" in response.json()["detail"]
-    
+
+    def test_create_user_relies_on_unique_indexes(self):
+        """Test signup is a single INSERT, and a clash is reported from the unique index"""
+        statements = []
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(Engine, "before_cursor_execute", count_statement)
+        try:
+            created = self.client.post("/api/users/", json={"username": "testuser", "email": "test@example.com"})
+        finally:
+            event.remove(Engine, "before_cursor_execute", count_statement)
+        duplicate = self.client.post("/api/users/", json={"username": "other", "email": "test@example.com"})
+
+        assert created.status_code == 200
+        assert [statement.split()[0] for statement in statements if not statement.startswith(("SAVEPOINT", "RELEASE"))] == ["INSERT"]
+        assert duplicate.status_code == 400
+        assert "Email already exists" in duplicate.json()["detail"]
+        assert self.client.get("/api/users/").json()[0]["username"] == "testuser"
+
     def test_get_all_users(self):
         """Test getting all users"""
         # Create a user first
@@ -67,3 +91,85 @@ class TestUserRoutes:
         assert len(data) == 1
         assert data[0]["username"] == "testuser"
         assert data[0]["task_count"] == 0
+    
+    def test_get_all_users_counts_tasks_in_constant_queries(self):
+        """Test task counts are aggregated without one query per user"""
+        for i in range(3):
+            user_id = self.client.post(
+                "/api/users/", json={"username": f"user{i}", "email": f"user{i}@example.com"}
+            ).json()["id"]
+            for j in range(i):
+                task_id = self.client.post("/api/tasks/", json={"title": f"Task {j}", "user_id": user_id}).json()["id"]
+            if i:
+                self.client.put(f"/api/tasks/{task_id}/complete?user_id={user_id}")
+        
+        statements = []
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(Engine, "before_cursor_execute", count_statement)
+        try:
+            response = self.client.get("/api/users/")
+        finally:
+            event.remove(Engine, "before_cursor_execute", count_statement)
+        
+        assert response.status_code == 200
+        counts = [(user["task_count"], user["completed_count"], user["open_count"]) for user in response.json()]
+        assert counts == [(0, 0, 0), (1, 1, 0), (2, 1, 1)]
+        # The page's version stamp, then the page itself
+        assert len(statements) == 2
+    
+    def test_get_all_users_paginates_with_cursor(self):
+        """Test paging through users with the next-page cursor"""
+        for i in range(3):
+            self.client.post("/api/users/", json={"username": f"user{i}", "email": f"user{i}@example.com"})
+        
+        first = self.client.get("/api/users/?limit=2")
+        second = self.client.get(f"/api/users/?limit=2&cursor={first.headers['X-Next-Cursor']}")
+        
+        assert [user["username"] for user in first.json()] == ["user0", "user1"]
+        assert [user["username"] for user in second.json()] == ["user2"]
+        assert "X-Next-Cursor" not in second.headers
+    
+    def test_fast_json_list_matches_default_path(self, monkeypatch):
+        """Test the orjson column path returns exactly what the Pydantic path does"""
+        user_id = self.client.post("/api/users/", json={"username": "testuser", "email": "test@example.com"}).json()["id"]
+        self.client.post("/api/tasks/", json={"title": "Task", "user_id": user_id})
+        default = self.client.get("/api/users/")
+        
+        monkeypatch.setattr(get_settings(), "fast_json", True)
+        fast = self.client.get("/api/users/")
+        
+        assert fast.status_code == 200
+        assert fast.json() == default.json()
+    
+    def test_conditional_get_of_users(self):
+        """Test user reads answer 304 until the user or their task counts change"""
+        user_id = self.client.post("/api/users/", json={"username": "testuser", "email": "test@example.com"}).json()["id"]
+        page = self.client.get("/api/users/")
+        user = self.client.get(f"/api/users/{user_id}")
+        
+        assert self.client.get("/api/users/", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+        assert self.client.get(f"/api/users/{user_id}", headers={"If-None-Match": user.headers["ETag"]}).status_code == 304
+        
+        self.client.post("/api/tasks/", json={"title": "Task", "user_id": user_id})
+        changed = self.client.get("/api/users/", headers={"If-None-Match": page.headers["ETag"]})
+        assert changed.status_code == 200
+        assert changed.json()[0]["task_count"] == 1
+        
+        self.client.post("/api/users/", json={"username": "other", "email": "other@example.com"})
+        assert self.client.get("/api/users/", headers={"If-None-Match": changed.headers["ETag"]}).status_code == 200
+    
+    def test_users_page_changes_when_a_user_is_replaced(self):
+        """Test the page's ETag changes when another user takes a deleted user's place (equal ID sums)"""
+        self.client.post("/api/users/", json={"username": "bob", "email": "bob@example.com"})
+        alice = self.client.post("/api/users/", json={"username": "alice", "email": "alice@example.com"}).json()["id"]
+        page = self.client.get("/api/users/")
+        with TestingSessionLocal() as db:
+            db.execute(delete(User).where(User.id == alice))
+            db.execute(insert(User).values(id=alice, username="mallory", email="mallory@example.com"))
+            db.commit()
+        
+        revalidated = self.client.get("/api/users/", headers={"If-None-Match": page.headers["ETag"]})
+        
+        assert revalidated.status_code == 200
+        assert [user["username"] for user in revalidated.json()] == ["bob", "mallory"]
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import Mock
+from sqlalchemy.exc import IntegrityError
 from services.user_service import UserService, UserValidationError
 from models.user import User
 
@@ -9,20 +10,20 @@ class TestUserService:
     def setup_method(self):
         """Setup for each test"""
         self.mock_repository = Mock()
-        self.service = UserService(self.mock_repository)
+        self.mock_stats_repository = Mock()
+        self.service = UserService(self.mock_repository, self.mock_stats_repository)
     
     def test_create_user_success(self):
         """Test successful user creation"""
         # Arrange
-        self.mock_repository.get_user_by_username.return_value = None
-        self.mock_repository.get_user_by_email.return_value = None
         self.mock_repository.create_user.return_value = User(id=1, username="testuser", email="test@example.com")
         
         # Act
         result = self.service.create_user("testuser", "test@example.com")
         
-        # Assert
+        # Assert: uniqueness is left to the INSERT, no lookups first
         self.mock_repository.create_user.assert_called_once_with("testuser", "test@example.com")
+        self.mock_repository.get_taken_fields.assert_not_called()
         assert result.username == "testuser"
     
     def test_create_user_empty_username_raises_error(self):
@@ -33,7 +34,8 @@ class TestUserService:
     def test_create_user_duplicate_username_raises_error(self):
         """Test that duplicate username raises validation error"""
         # Arrange
-        self.mock_repository.get_user_by_username.return_value = User(id=1, username="existing")
+        self.mock_repository.create_user.side_effect = IntegrityError("INSERT", {}, Exception("UNIQUE"))
+        self.mock_repository.get_taken_fields.return_value = {"username", "email"}
         
         # Act & Assert
         with pytest.raises(UserValidationError, match="Username already exists"):
@@ -42,8 +44,8 @@ class TestUserService:
     def test_create_user_duplicate_email_raises_error(self):
         """Test that duplicate email raises validation error"""
         # Arrange
-        self.mock_repository.get_user_by_username.return_value = None
-        self.mock_repository.get_user_by_email.return_value = User(id=1, email="existing@example.com")
+        self.mock_repository.create_user.side_effect = IntegrityError("INSERT", {}, Exception("UNIQUE"))
+        self.mock_repository.get_taken_fields.return_value = {"email"}
         
         # Act & Assert
         with pytest.raises(UserValidationError, match="Email already exists"):